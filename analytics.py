@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from config import Config
+from database import QuotaReservation, apply_rollup_increments, get_rollups
+
+logger = logging.getLogger(__name__)
+
+# --- उपयोग विश्लेषण ---
+# इवेंट (डाउनलोड, प्रीमियम अनुदान, सीमा समाप्ति, भुगतान) केवल स्मृति में एक काउंटर बढ़ाते हैं।
+# फ़्लश पर हर घंटे और हर दिन का एक रोलअप दस्तावेज़ $inc से अपडेट होता है, इसलिए /stats की
+# लागत उपयोगकर्ताओं की संख्या पर नहीं, केवल दिनों/घंटों की संख्या पर निर्भर है।
+# फ़ील्ड नाम बिंदु से समूहित हैं, जैसे "downloads.free" -> counts.downloads.free
+
+
+class AnalyticsRecorder:
+    def __init__(self, flush_interval_seconds: float):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending = {} # {घंटे की शुरुआत: Counter({field: n})}
+        self._task = None
+        self._flush_lock = None
+        # काउंटर
+        self.events = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def record(self, field: str, amount: int = 1, when: datetime | None = None):
+        hour = (when or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        bucket = self._pending.get(hour)
+        if bucket is None:
+            bucket = self._pending[hour] = Counter()
+        bucket[field] += amount
+        self.events += 1
+
+    # --- डोमेन इवेंट ---
+
+    def record_download(self, reservation: QuotaReservation, source: str):
+        # source: upload / cache / hash (file_id कैश से भेजा गया)
+        self.record(f"downloads.{reservation.credit}")
+        self.record(f"sources.{source}")
+        remaining = reservation.free_remaining if reservation.credit == "free" else reservation.premium_remaining
+        if remaining == 0:
+            self.record(f"exhausted.{reservation.credit}")
+        elif remaining <= Config.ANALYTICS_NEAR_QUOTA_THRESHOLD:
+            self.record(f"near_quota.{reservation.credit}")
+
+    def record_grant(self, files_count: int, source: str):
+        # source: manual / bulk / payment
+        self.record(f"grants.{source}")
+        self.record("granted_downloads", files_count)
+
+    # --- फ़्लश ---
+
+    def _increments(self, batch: dict) -> dict:
+        increments = {}
+        for hour, fields in batch.items():
+            day = hour.replace(hour=0)
+            for key in (("hour", hour), ("day", day)):
+                increments.setdefault(key, Counter()).update(fields)
+        return increments
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                written = await apply_rollup_increments(self._increments(batch))
+            except PyMongoError as e:
+                self.flush_errors += 1
+                # विफल बैच वापस जोड़ें; अगला फ़्लश फिर प्रयास करेगा
+                for hour, fields in batch.items():
+                    self._pending.setdefault(hour, Counter()).update(fields)
+                logger.error(f"विश्लेषण रोलअप फ़्लश करने में त्रुटि: {e}")
+                raise
+            self.flushes += 1
+            return written
+
+    async def _run_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e: # लूप को कभी न रुकने दें; अगला अंतराल फिर प्रयास करेगा
+                logger.error(f"विश्लेषण फ़्लश लूप में त्रुटि: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run_loop(), name="analytics-flush")
+
+    async def stop(self):
+        # शटडाउन पर बचे हुए काउंटर अंतिम बार फ़्लश करें
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except PyMongoError:
+            pass # त्रुटि पहले ही लॉग हो चुकी है
+
+    def stats(self) -> dict:
+        return {
+            "pending_hours": len(self._pending),
+            "events": self.events,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
+
+
+analytics = AnalyticsRecorder(flush_interval_seconds=Config.ANALYTICS_FLUSH_INTERVAL_SECONDS)
+
+
+# --- /stats रिपोर्ट ---
+
+def _count(counts: dict, path: str) -> int:
+    value = counts
+    for part in path.split("."):
+        value = value.get(part, {}) if isinstance(value, dict) else {}
+    return value if isinstance(value, int) else 0
+
+
+def _sum(rollups: list[dict], path: str) -> int:
+    return sum(_count(rollup.get("counts", {}), path) for rollup in rollups)
+
+
+async def build_stats_report(days: int = 7) -> str:
+    await analytics.flush() # अभी तक न लिखे गए इवेंट भी रिपोर्ट में आएं
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    daily = await get_rollups("day", today - timedelta(days=days - 1))
+    hourly = await get_rollups("hour", now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23))
+
+    lines = ["📊 **उपयोग आँकड़े** (UTC)", ""]
+    lines.append(
+        f"**पिछले 24 घंटे:** {_sum(hourly, 'downloads.free') + _sum(hourly, 'downloads.premium')} डाउनलोड "
+        f"(मुफ़्त {_sum(hourly, 'downloads.free')}, प्रीमियम {_sum(hourly, 'downloads.premium')})"
+    )
+    lines.append("")
+    lines.append(f"**पिछले {days} दिन** (डाउनलोड: मुफ़्त/प्रीमियम, कैश, सीमा समाप्त):")
+    for rollup in daily:
+        counts = rollup.get("counts", {})
+        free = _count(counts, "downloads.free")
+        premium = _count(counts, "downloads.premium")
+        cached = _count(counts, "sources.cache") + _count(counts, "sources.hash")
+        exhausted = _count(counts, "exhausted.free") + _count(counts, "exhausted.premium")
+        lines.append(f"`{rollup['start']:%m-%d}`  {free + premium} ({free}/{premium}), कैश {cached}, समाप्त {exhausted}")
+    if not daily:
+        lines.append("अभी कोई डेटा नहीं।")
+    lines.append("")
+    lines.append(
+        f"**सीमा के करीब** ({days} दिन): मुफ़्त {_sum(daily, 'near_quota.free')}, "
+        f"प्रीमियम {_sum(daily, 'near_quota.premium')}"
+    )
+    lines.append(
+        f"**सीमा समाप्त** ({days} दिन): मुफ़्त {_sum(daily, 'exhausted.free')}, "
+        f"प्रीमियम {_sum(daily, 'exhausted.premium')}"
+    )
+    lines.append(
+        f"**प्रीमियम अनुदान** ({days} दिन): {_sum(daily, 'grants.manual') + _sum(daily, 'grants.bulk') + _sum(daily, 'grants.payment')} "
+        f"({_sum(daily, 'granted_downloads')} डाउनलोड)"
+    )
+    lines.append(
+        f"**UTR भुगतान** ({days} दिन): प्राप्त {_sum(daily, 'payments.submitted')}, "
+        f"स्वीकृत {_sum(daily, 'payments.approved')}, अस्वीकृत {_sum(daily, 'payments.rejected')}"
+    )
+    lines.append(
+        f"**सीमा पर रोके गए अनुरोध** ({days} दिन): {_sum(daily, 'denied')}, "
+        f"**विफल डाउनलोड (क्रेडिट वापस):** {_sum(daily, 'refunds')}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,234 @@
+"""download_file (स्ट्रीमिंग डाउनलोड इंजन) की जाँच, उसी प्रक्रिया में चलते स्थानीय aiohttp सर्वर पर।
+
+सर्वर यादृच्छिक बाइट्स देता है; हर परिदृश्य का व्यवहार पथ से तय होता है:
+  ranges     Range समर्थन: फ़ाइल --segments सेगमेंट्स में आती है, हर सेगमेंट os.pwrite से अपने ऑफ़सेट पर
+  noranges   Range अनदेखा (हमेशा 200 और पूरी फ़ाइल): एकल स्ट्रीम पर वापसी
+  too_large  Range जाँच में आकार MAX_DOWNLOAD_SIZE_BYTES से बड़ा: जाँच के बाद कोई डेटा अनुरोध नहीं
+  chunked    Content-Length के बिना, सीमा से बड़ी स्ट्रीम: सीमा स्ट्रीम के बीच में लागू
+  broken     सेगमेंट अनुरोध बीच में टूटते हैं और पुनः प्रयास भी विफल: अधूरी फ़ाइल और स्पूल आरक्षण साफ़
+अंत में throughput_stats की बाइट्स/सेकंड जाँची जाती है। हर जाँच का परिणाम JSON में छपता है और
+कोई जाँच विफल हो तो निकास कोड 1 है।
+
+उदाहरण:
+    python benchmarks/download_engine.py --size-mb 8 --segments 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+MB = 1024 * 1024
+
+
+def configure_environment(args, download_dir: str):
+    os.environ["DOWNLOAD_DIR"] = download_dir
+    os.environ["DOWNLOAD_SEGMENTS"] = str(args.segments)
+    os.environ["DOWNLOAD_MIN_SEGMENT_BYTES"] = str(MB)
+    os.environ["DOWNLOAD_CHUNK_SIZE_BYTES"] = str(256 * 1024)
+    os.environ["MAX_DOWNLOAD_SIZE_BYTES"] = str(args.max_mb * MB)
+    os.environ["DOWNLOAD_MAX_RETRIES"] = "1"
+    os.environ["DOWNLOAD_RETRY_BASE_DELAY_SECONDS"] = "0.01"
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ["METRICS_ENABLED"] = "false"
+
+
+class StandInServer:
+    def __init__(self, payload: bytes, large_size: int):
+        self.payload = payload
+        self.large_size = large_size
+        self.requests = [] # (पथ, Range हेडर)
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        mode = request.match_info["mode"]
+        range_header = request.headers.get("Range")
+        self.requests.append((mode, range_header))
+        size = self.large_size if mode in ("too_large", "chunked") else len(self.payload)
+        headers = {"Content-Type": "video/mp4", "Content-Disposition": f'attachment; filename="{mode}.mp4"'}
+
+        if mode in ("ranges", "too_large", "broken") and range_header:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response = web.StreamResponse(status=206, headers=headers)
+            response.content_length = end - start + 1
+        else:
+            start, end = 0, size - 1
+            response = web.StreamResponse(status=200, headers=headers)
+            if mode != "chunked":
+                response.content_length = size
+        await response.prepare(request)
+
+        # broken: जाँच (bytes=0-0) के बाद हर सेगमेंट 256 KB पर कटता है
+        cut_at = start + 256 * 1024 if mode == "broken" and end > start else None
+        position = start
+        try:
+            while position <= end:
+                chunk_end = min(position + 64 * 1024, end + 1)
+                if cut_at is not None and position >= cut_at:
+                    request.transport.close()
+                    return response
+                data = self.payload[position:chunk_end] if position < len(self.payload) else bytes(chunk_end - position)
+                await response.write(data)
+                position = chunk_end
+            await response.write_eof()
+        except ConnectionError:
+            pass # क्लाइंट ने जल्दी बंद किया (जाँच या आकार सीमा), अपेक्षित
+        return response
+
+
+async def run(args) -> dict:
+    download_dir = tempfile.mkdtemp(prefix="engine-bench-")
+    configure_environment(args, download_dir)
+    import aiohttp
+    from aiohttp import web
+    import downloaders
+    from downloaders import DownloadError, DownloadTooLargeError
+    from spool import SpoolManager
+
+    payload = random.Random(args.seed).randbytes(args.size_mb * MB)
+    expected = hashlib.sha256(payload).hexdigest()
+    server = StandInServer(payload, large_size=(args.max_mb + 4) * MB)
+    app = web.Application()
+    app.router.add_get("/{mode}", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    # os.pwrite पर नज़र: हर लेखन का (ऑफ़सेट, आकार); downloaders उसे os मॉड्यूल से ही बुलाता है
+    writes = []
+    real_pwrite = os.pwrite
+
+    def recording_pwrite(fd, data, offset):
+        writes.append((offset, len(data)))
+        return real_pwrite(fd, data, offset)
+
+    os.pwrite = recording_pwrite
+
+    def sha256(path: str) -> str:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def leftovers() -> list:
+        return sorted(
+            os.path.join(root, name)[len(download_dir) + 1:]
+            for root, _, names in os.walk(download_dir) for name in names
+        )
+
+    checks = {}
+    details = {}
+    baseline = dict(downloaders.throughput_stats)
+    try:
+        # ranges: N सेगमेंट, हर सेगमेंट अपने ऑफ़सेट पर
+        server.requests.clear()
+        writes.clear()
+        path, stats = await downloaders.download_file(f"{base}/ranges", download_dir)
+        plan = downloaders._plan_segments(len(payload), args.segments)
+        segment_ranges = sorted(r for _, r in server.requests if r and r != "bytes=0-0")
+        first_write_offsets = {offset for offset, _ in writes}
+        checks["ranges_content_matches"] = sha256(path) == expected
+        checks["ranges_uses_n_segments"] = stats.segments == len(plan) == args.segments
+        checks["ranges_requests_one_range_per_segment"] = segment_ranges == sorted(
+            f"bytes={segment.start}-{segment.end}" for segment in plan
+        )
+        checks["ranges_pwrite_at_each_segment_offset"] = all(segment.start in first_write_offsets for segment in plan)
+        checks["ranges_pwrite_covers_file_once"] = sum(size for _, size in writes) == len(payload)
+        details["ranges"] = {"segments": stats.segments, "pwrite_calls": len(writes),
+                             "bytes_per_second": round(stats.bytes_per_second)}
+        ranges_stats = stats
+        os.remove(path)
+
+        # noranges: सर्वर Range अनदेखा करता है -> एकल स्ट्रीम
+        server.requests.clear()
+        writes.clear()
+        path, stats = await downloaders.download_file(f"{base}/noranges", download_dir)
+        checks["noranges_content_matches"] = sha256(path) == expected
+        checks["noranges_single_stream"] = stats.segments == 1 and len(server.requests) == 2 # जाँच + एक GET
+        checks["noranges_sequential_offsets"] = [offset for offset, _ in writes] == sorted(offset for offset, _ in writes)
+        noranges_stats = stats
+        os.remove(path)
+
+        # too_large: जाँच से ही अस्वीकार, कोई डेटा अनुरोध नहीं
+        server.requests.clear()
+        try:
+            await downloaders.download_file(f"{base}/too_large", download_dir)
+            checks["too_large_rejected_from_probe"] = False
+        except DownloadTooLargeError:
+            checks["too_large_rejected_from_probe"] = len(server.requests) == 1
+        checks["too_large_no_file_left"] = leftovers() == []
+
+        # chunked: आकार पहले से पता नहीं, सीमा स्ट्रीम के बीच में
+        server.requests.clear()
+        writes.clear()
+        try:
+            await downloaders.download_file(f"{base}/chunked", download_dir)
+            checks["chunked_rejected_mid_stream"] = False
+        except DownloadTooLargeError:
+            written = sum(size for _, size in writes)
+            checks["chunked_rejected_mid_stream"] = 0 < written <= args.max_mb * MB
+            details["chunked"] = {"bytes_written_before_abort": written}
+        checks["chunked_partial_file_removed"] = leftovers() == []
+
+        # broken: हर प्रयास बीच में टूटता है; अधूरी फ़ाइल और आरक्षण साफ़ होने चाहिए
+        spool = SpoolManager(download_dir, budget_bytes=64 * MB, default_ttl_seconds=3600, partial_ttl_seconds=3600)
+        try:
+            await downloaders.download_file(f"{base}/broken", download_dir, spool=spool)
+            checks["broken_raises"] = False
+        except (DownloadError, aiohttp.ClientError): # पुनः प्रयास समाप्त होने पर मूल नेटवर्क त्रुटि ऊपर आती है
+            checks["broken_raises"] = True
+        spool_stats = spool.stats()
+        checks["broken_partial_file_removed"] = leftovers() == []
+        checks["broken_spool_reservation_released"] = spool_stats["reserved_bytes"] == 0 and spool_stats["files"] == 0
+
+        # throughput_stats: केवल सफल डाउनलोड गिने जाते हैं
+        delta = {key: downloaders.throughput_stats[key] - baseline[key] for key in ("downloads", "bytes", "seconds")}
+        checks["throughput_counts_successful_downloads"] = delta["downloads"] == 2 and delta["bytes"] == 2 * len(payload)
+        checks["throughput_bytes_per_second_reported"] = (
+            delta["seconds"] > 0
+            and abs(delta["seconds"] - ranges_stats.seconds - noranges_stats.seconds) < 1e-6
+            and ranges_stats.bytes_per_second == ranges_stats.bytes_downloaded / ranges_stats.seconds > 0
+        )
+        details["throughput_stats"] = {
+            "downloads": delta["downloads"],
+            "bytes": delta["bytes"],
+            "bytes_per_second": round(delta["bytes"] / delta["seconds"]) if delta["seconds"] else 0,
+        }
+    finally:
+        os.pwrite = real_pwrite
+        await runner.cleanup()
+    return {"passed": all(checks.values()), "checks": checks, "details": details}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=8, help="सामान्य परीक्षण फ़ाइल का आकार")
+    parser.add_argument("--segments", type=int, default=4, help="DOWNLOAD_SEGMENTS")
+    parser.add_argument("--max-mb", type=int, default=12, help="MAX_DOWNLOAD_SIZE_BYTES (MB), --size-mb से बड़ा")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON परिणाम इस फ़ाइल में भी लिखें")
+    args = parser.parse_args()
+    if args.max_mb <= args.size_mb:
+        parser.error("--max-mb को --size-mb से बड़ा होना चाहिए")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""main.py के असली हैंडलर्स पर लोड टेस्ट: नकली Telegram Bot API और इन-मेमोरी/लोकल Mongo।
+
+हर सिंथेटिक उपयोगकर्ता (Poisson आगमन, --rate उपयोगकर्ता/सेकंड) एक फ़्लो चलाता है और हर
+कदम का जवाब आने के बाद ही अगला अपडेट भेजता है:
+  download  /start → मेनू → terabox_download → लिंक → अपलोड (फ़ाइल भेजे जाने तक)
+  utr       /start → premium_version → i_have_paid → UTR नंबर
+
+अपडेट application.update_queue में डाले जाते हैं, इसलिए PerUserUpdateProcessor, दर सीमक,
+शेड्यूलर, स्पूल और database._run सब वैसे ही चलते हैं जैसे प्रोडक्शन में। केवल ये नकली हैं:
+  - Telegram: BaseRequest जो हर API कॉल रिकॉर्ड करके बना-बनाया जवाब देता है (--api-latency-ms)
+  - Terabox डाउनलोड: --download-ms बाद --file-size-kb की फ़ाइल DOWNLOAD_DIR में
+  - Mongo: mongomock (--mongo memory) या असली सर्वर (--mongo-uri); दोनों में --mongo-latency-ms
+    हर ऑपरेशन के थ्रेड में जोड़ा जाता है (नेटवर्क राउंड ट्रिप जैसा)
+
+उदाहरण:
+    python benchmarks/loadtest.py --users 200 --rate 20 --mongo-latency-ms 5 --output before.json
+    python benchmarks/loadtest.py --env MAX_CONCURRENT_DOWNLOADS=8 --env TG_PRIVATE_CHAT_BURST=10
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+FLOWS = {
+    "download": [("start", "command", "/start"), ("menu_terabox", "callback", "terabox_download"),
+                 ("link", "text", None)],
+    "utr": [("start", "command", "/start"), ("premium", "callback", "premium_version"),
+            ("paid", "callback", "i_have_paid"), ("utr", "text", None)],
+}
+MEDIA_ENDPOINTS = {"sendDocument": "document", "sendVideo": "video", "sendAudio": "audio", "sendPhoto": "photo"}
+BOT_USER = {"id": 999000, "is_bot": True, "first_name": "LoadTestBot", "username": "loadtest_bot"}
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: list) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values, default=0) * 1000, 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LatencyExecutor(ThreadPoolExecutor):
+    # database._run का थ्रेड पूल: हर ऑपरेशन से पहले थ्रेड को latency तक रोकता है।
+    # lock दिया जाए तो ऑपरेशन (देरी नहीं) क्रम से चलते हैं; mongomock समानांतर लेखन में सुरक्षित नहीं है
+    def __init__(self, latency_seconds: float, lock=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_seconds = latency_seconds
+        self.lock = lock
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self.latency_seconds > 0 or self.lock is not None:
+            inner = fn
+
+            def fn(*a, **k):
+                if self.latency_seconds > 0:
+                    time.sleep(self.latency_seconds)
+                if self.lock is None:
+                    return inner(*a, **k)
+                with self.lock:
+                    return inner(*a, **k)
+        return super().submit(fn, *args, **kwargs)
+
+
+def make_fake_request_class():
+    from telegram.request import BaseRequest
+
+    class FakeTelegramRequest(BaseRequest):
+        # Bot API सर्वर की जगह: कॉल्स गिनता है, फ़ाइल अपलोड को multipart तक एन्कोड करवाता है
+        def __init__(self, latency_seconds: float):
+            self.latency_seconds = latency_seconds
+            self.calls = {}
+            self.upload_waiters = {} # {chat_id: asyncio.Event}
+            self._message_ids = itertools.count(1)
+            self._file_ids = itertools.count(1)
+
+        async def initialize(self) -> None:
+            pass
+
+        async def shutdown(self) -> None:
+            pass
+
+        def _message(self, chat_id, endpoint: str) -> dict:
+            message = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+                "from": BOT_USER,
+            }
+            media = MEDIA_ENDPOINTS.get(endpoint)
+            if media:
+                file_id = f"FAKE{next(self._file_ids)}"
+                item = {"file_id": file_id, "file_unique_id": file_id}
+                if media == "photo":
+                    message["photo"] = [dict(item, width=1, height=1)]
+                elif media == "video":
+                    message["video"] = dict(item, width=1, height=1, duration=1)
+                elif media == "audio":
+                    message["audio"] = dict(item, duration=1)
+                else:
+                    message["document"] = item
+            else:
+                message["text"] = "ok"
+            return message
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                             connect_timeout=None, pool_timeout=None):
+            endpoint = url.rsplit("/", 1)[-1]
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            params = {}
+            if request_data is not None:
+                if request_data.contains_files:
+                    request_data.multipart_data # असली क्लाइंट की तरह फ़ाइल बाइट्स पढ़ें/एन्कोड करें
+                params = request_data.json_parameters
+            if self.latency_seconds > 0:
+                await asyncio.sleep(self.latency_seconds)
+
+            chat_id = int(params["chat_id"]) if "chat_id" in params else None
+            if endpoint == "getMe":
+                result = BOT_USER
+            elif endpoint == "getChatMember":
+                result = {"status": "member", "user": {"id": int(params["user_id"]), "is_bot": False, "first_name": "u"}}
+            elif endpoint.startswith(("send", "copy", "forward")) and chat_id is not None:
+                result = self._message(chat_id, endpoint)
+                if endpoint in MEDIA_ENDPOINTS and chat_id in self.upload_waiters:
+                    self.upload_waiters[chat_id].set()
+            elif endpoint.startswith("edit") and chat_id is not None:
+                result = self._message(chat_id, endpoint)
+            else:
+                result = True
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    return FakeTelegramRequest
+
+
+def make_update(bot, update_id: int, user_id: int, kind: str, payload: str):
+    from telegram import Update
+
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    chat = {"id": user_id, "type": "private"}
+    now = int(time.time())
+    if kind == "callback":
+        data = {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": payload,
+            "message": {"message_id": update_id, "date": now, "chat": chat, "from": BOT_USER, "text": "menu"},
+        }}
+    else:
+        message = {"message_id": update_id, "date": now, "chat": chat, "from": user, "text": payload}
+        if kind == "command":
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(payload.split()[0])}]
+        data = {"update_id": update_id, "message": message}
+    return Update.de_json(data, bot)
+
+
+def configure_environment(args, download_dir: str):
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:LOADTEST")
+    os.environ.setdefault("MONGO_URI", args.mongo_uri or "mongodb://loadtest.invalid")
+    os.environ["MONGO_DB_NAME"] = args.mongo_db
+    os.environ["DOWNLOAD_DIR"] = download_dir
+    os.environ["METRICS_ENABLED"] = "false"
+    os.environ.setdefault("REQUIRED_CHANNEL_ID", "-1001000000001")
+    os.environ.setdefault("ADMIN_CHANNEL_ID", "-1001000000002")
+    # download_terabox नकली है, रिज़ॉल्वर को कभी नहीं बुलाता; केवल "डाउनलोड कॉन्फ़िगर नहीं" जाँच पार करने के लिए
+    os.environ.setdefault("RESOLVER_API_URL", "http://resolver.invalid/resolve")
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+
+def install_memory_mongo():
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("--mongo memory के लिए mongomock चाहिए (pip install mongomock), या --mongo-uri से लोकल Mongo दें।")
+    import database
+
+    database.MongoClient = mongomock.MongoClient
+    # mongomock अपडेट पाइपलाइन में $unset चरण नहीं जानता; समान अर्थ वाला $project बहिष्करण दें
+    original = database._consume_credit_pipeline
+    database._consume_credit_pipeline = lambda platform: [
+        {"$project": {field: 0 for field in ([stage["$unset"]] if isinstance(stage["$unset"], str) else stage["$unset"])}}
+        if "$unset" in stage else stage
+        for stage in original(platform)
+    ]
+
+
+def mongo_operation_counts() -> dict:
+    import metrics
+    return {values[0]: child.count for values, child in metrics.mongo_duration._children.items()}
+
+
+async def run(args) -> dict:
+    download_dir = tempfile.mkdtemp(prefix="loadtest-downloads-")
+    configure_environment(args, download_dir)
+    if args.mongo == "memory":
+        install_memory_mongo()
+
+    from telegram.ext import TypeHandler
+    from telegram import Update
+
+    import database
+    import main
+    import metrics
+    from config import Config
+    from spool import download_spool
+
+    logging.getLogger().setLevel(args.log_level)
+    database._executor = LatencyExecutor(
+        args.mongo_latency_ms / 1000,
+        lock=threading.Lock() if args.mongo == "memory" else None,
+        max_workers=Config.MONGO_EXECUTOR_WORKERS,
+        thread_name_prefix="mongo",
+    )
+
+    rng = random.Random(args.seed)
+    popular_payload = os.urandom(args.file_size_kb * 1024)
+
+    async def fake_download(url: str, progress=None) -> str | None:
+        # 1 MB के ब्लॉकों जैसी प्रगति कॉल्स, जैसे असली स्ट्रीमिंग डाउनलोड में (संपादन throttled)
+        total = args.file_size_kb * 1024
+        steps = 20
+        for step in range(1, steps + 1):
+            await asyncio.sleep(args.download_ms / 1000 / steps)
+            if progress is not None:
+                progress(total * step // steps, total)
+        popular = url.endswith("popular")
+        file_path = os.path.join(Config.DOWNLOAD_DIR, f"{hashlib.sha1(url.encode()).hexdigest()[:16]}-{time.monotonic_ns()}.mp4")
+        data = popular_payload if popular else os.urandom(args.file_size_kb * 1024)
+        await asyncio.to_thread(lambda: open(file_path, "wb").write(data))
+        download_spool.add_file(file_path)
+        return file_path
+
+    main.download_terabox = fake_download
+
+    request = make_fake_request_class()(args.api_latency_ms / 1000)
+    application = main.build_application(Config.TELEGRAM_BOT_TOKEN, request=request)
+    waiters = {} # {update_id: asyncio.Event}
+
+    async def mark_done(update: Update, context):
+        event = waiters.pop(update.update_id, None)
+        if event is not None:
+            event.set()
+
+    application.add_handler(TypeHandler(Update, mark_done), group=99) # हर अपडेट के सभी हैंडलर्स के बाद
+
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    await database._ensure_database()
+
+    step_latencies = {}
+    upload_latencies = []
+    timeouts = 0
+    completed_flows = {kind: 0 for kind in FLOWS}
+    update_ids = itertools.count(1)
+    processed_updates = 0
+
+    async def send(user_id: int, kind: str, payload: str) -> float | None:
+        nonlocal timeouts, processed_updates
+        update_id = next(update_ids)
+        event = waiters[update_id] = asyncio.Event()
+        started = time.perf_counter()
+        await application.update_queue.put(make_update(application.bot, update_id, user_id, kind, payload))
+        try:
+            await asyncio.wait_for(event.wait(), args.step_timeout)
+        except asyncio.TimeoutError:
+            waiters.pop(update_id, None)
+            timeouts += 1
+            return None
+        processed_updates += 1
+        return time.perf_counter() - started
+
+    async def user_flow(user_id: int, flow: str):
+        nonlocal timeouts
+        for step, kind, payload in FLOWS[flow]:
+            if payload is None:
+                if flow == "utr":
+                    payload = str(rng.randint(10 ** 11, 10 ** 12 - 1))
+                elif rng.random() < args.popular_ratio:
+                    payload = "https://terabox.com/s/1popular"
+                else:
+                    payload = f"https://terabox.com/s/1user{user_id}x{rng.randint(0, 10 ** 9)}"
+            uploaded = None
+            if step == "link":
+                uploaded = request.upload_waiters[user_id] = asyncio.Event()
+            started = time.perf_counter()
+            latency = await send(user_id, kind, payload)
+            if latency is None:
+                return
+            step_latencies.setdefault(f"{flow}.{step}", []).append(latency)
+            if uploaded is not None:
+                try:
+                    await asyncio.wait_for(uploaded.wait(), args.step_timeout)
+                except asyncio.TimeoutError:
+                    timeouts += 1
+                    return
+                finally:
+                    request.upload_waiters.pop(user_id, None)
+                upload_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(rng.expovariate(1000 / args.think_ms) if args.think_ms > 0 else 0)
+        completed_flows[flow] += 1
+
+    ops_before = mongo_operation_counts()
+    calls_before = dict(request.calls)
+    started = time.perf_counter()
+    tasks = []
+    for index in range(args.users):
+        user_id = 100000 + index
+        flow = "utr" if rng.random() < args.utr_ratio else "download"
+        tasks.append(asyncio.create_task(user_flow(user_id, flow)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+
+    ops_after = mongo_operation_counts()
+    mongo_ops = {op: ops_after.get(op, 0) - ops_before.get(op, 0) for op in ops_after}
+    mongo_ops = {op: count for op, count in sorted(mongo_ops.items()) if count}
+    api_calls = {endpoint: count - calls_before.get(endpoint, 0) for endpoint, count in sorted(request.calls.items())
+                 if count > calls_before.get(endpoint, 0)}
+    handler_errors = {values[0]: child.value for values, child in metrics.handler_errors._children.items() if child.value}
+
+    await application.stop()
+    await application.shutdown()
+    await application.post_shutdown(application)
+
+    total_mongo_ops = sum(mongo_ops.values())
+    return {
+        "wall_seconds": round(wall, 3),
+        "users": args.users,
+        "completed_flows": completed_flows,
+        "updates_processed": processed_updates,
+        "throughput_updates_per_second": round(processed_updates / wall, 2) if wall else 0.0,
+        "throughput_flows_per_second": round(sum(completed_flows.values()) / wall, 2) if wall else 0.0,
+        "timeouts": timeouts,
+        "handler_errors": handler_errors,
+        "latency": {step: summarize(values) for step, values in sorted(step_latencies.items())},
+        "upload_latency": summarize(upload_latencies),
+        "mongo_ops_per_update": round(total_mongo_ops / processed_updates, 3) if processed_updates else 0.0,
+        "mongo_ops": mongo_ops,
+        "telegram_api_calls": api_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="कुल सिंथेटिक उपयोगकर्ता")
+    parser.add_argument("--rate", type=float, default=10.0, help="नए उपयोगकर्ता प्रति सेकंड (Poisson)")
+    parser.add_argument("--utr-ratio", type=float, default=0.2, help="UTR फ़्लो चलाने वाले उपयोगकर्ताओं का अनुपात")
+    parser.add_argument("--popular-ratio", type=float, default=0.3, help="एक ही लोकप्रिय लिंक भेजने वालों का अनुपात")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="कदमों के बीच औसत सोचने का समय")
+    parser.add_argument("--mongo", choices=("memory", "uri"), default="memory", help="memory = mongomock")
+    parser.add_argument("--mongo-uri", help="लोकल Mongo (जैसे mongodb://localhost:27017); --mongo uri के साथ")
+    parser.add_argument("--mongo-db", default="loadtest_bot_db", help="Mongo डेटाबेस नाम (असली सर्वर पर अलग रखें)")
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0, help="हर Mongo ऑपरेशन पर जोड़ी गई देरी")
+    parser.add_argument("--api-latency-ms", type=float, default=30.0, help="हर नकली Bot API कॉल की देरी")
+    parser.add_argument("--download-ms", type=float, default=500.0, help="नकली Terabox डाउनलोड का समय")
+    parser.add_argument("--file-size-kb", type=int, default=256, help="नकली डाउनलोड फ़ाइल का आकार")
+    parser.add_argument("--step-timeout", type=float, default=120.0, help="एक कदम के जवाब की अधिकतम प्रतीक्षा")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Config ओवरराइड (दोहराया जा सकता है)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="JSON परिणाम इस फ़ाइल में भी लिखें")
+    args = parser.parse_args()
+    if args.mongo == "uri" and not args.mongo_uri:
+        parser.error("--mongo uri के लिए --mongo-uri दें")
+
+    results = asyncio.run(run(args))
+    report = {"benchmark": "loadtest", "commit": git_commit(), "params": vars(args), "results": results}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
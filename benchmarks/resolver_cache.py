@@ -0,0 +1,186 @@
+"""डायरेक्ट लिंक रिज़ॉल्वर: कैश, एकल-उड़ान (single-flight), समवर्तिता सीमा और समाप्ति से पहले रिफ़्रेश।
+
+एक स्थानीय aiohttp सेवा असली रिज़ॉल्वर की जगह लेती है: हर अनुरोध पर --latency-ms की देरी के बाद
+--expires-in सेकंड मान्य हस्ताक्षरित लिंक लौटाती है, और एक साथ चल रहे अनुरोधों का अधिकतम गिनती है।
+दो परिदृश्य:
+  burst    --requests समानांतर रिज़ॉल्व --shares शेयरों पर (लोकप्रिय शेयर अधिक बार); अपेक्षा: हर शेयर
+           के लिए एक ही ऊपरी अनुरोध और ऊपरी समवर्तिता कभी RESOLVER_CONCURRENCY से अधिक नहीं
+  steady   --duration सेकंड तक लगातार रिज़ॉल्व, लिंक बीच में कई बार समाप्त होते हैं; अपेक्षा: कोई
+           लौटाया गया लिंक RESOLVER_MIN_VALIDITY_SECONDS से कम मान्य नहीं, और गर्म होने के बाद
+           कॉलर लगभग कभी ऊपरी अनुरोध की प्रतीक्षा नहीं करते (पृष्ठभूमि रिफ़्रेश)
+
+उदाहरण:
+    python benchmarks/resolver_cache.py --requests 2000 --shares 50 --latency-ms 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+class StandInResolver:
+    # असली रिज़ॉल्वर सेवा जैसा व्यवहार: धीमा, और हर जवाब सीमित समय के लिए मान्य
+    def __init__(self, latency: float, expires_in: float):
+        self.latency = latency
+        self.expires_in = expires_in
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        share_url = request.query["url"]
+        signature = f"{self.requests:08d}"
+        return web.json_response({
+            "direct_link": f"https://d.example/file?src={share_url}&sign={signature}",
+            "expires_in": self.expires_in,
+            "file_name": "video.mp4",
+        })
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_summary(values: list) -> dict:
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(max(values, default=0.0) * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ["METRICS_ENABLED"] = "false"
+    from aiohttp import web
+    from resolver import LinkResolver
+
+    server = StandInResolver(args.latency_ms / 1000, args.expires_in)
+    app = web.Application()
+    app.router.add_get("/resolve", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    def new_resolver() -> LinkResolver:
+        return LinkResolver(
+            api_url=f"http://127.0.0.1:{port}/resolve", api_key="", timeout_seconds=30,
+            concurrency=args.concurrency, cache_size=10000,
+            min_validity_seconds=args.min_validity, refresh_ahead_seconds=args.refresh_ahead,
+        )
+
+    rng = random.Random(args.seed)
+    # लोकप्रिय शेयर अधिक बार (Zipf जैसा)
+    weights = [1 / (rank + 1) for rank in range(args.shares)]
+    results = {}
+    try:
+        # burst: सब एक साथ, ठंडा कैश
+        resolver = new_resolver()
+        shares = rng.choices(range(args.shares), weights=weights, k=args.requests)
+
+        async def timed(share: int) -> float:
+            started = time.perf_counter()
+            await resolver.resolve(f"terabox:s{share}", f"https://www.terabox.com/s/1s{share}")
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed(share) for share in shares))
+        results["burst"] = {
+            "requests": args.requests,
+            "distinct_shares": len(set(shares)),
+            "upstream_requests": server.requests,
+            "upstream_max_concurrency": server.max_active,
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "latency": latency_summary(latencies),
+            "resolver": resolver.stats(),
+        }
+        await resolver.stop()
+
+        # steady: लिंक बार-बार समाप्त होते हैं; रिफ़्रेश पृष्ठभूमि में होना चाहिए
+        server.requests = server.max_active = 0
+        resolver = new_resolver()
+        steady_shares = min(args.shares, 10)
+        too_close_to_expiry = 0
+        slow_calls = 0
+        calls = 0
+        latencies = []
+        deadline = time.monotonic() + args.duration
+        for share in range(steady_shares): # गर्म करें
+            await resolver.resolve(f"terabox:s{share}", f"https://www.terabox.com/s/1s{share}")
+        while time.monotonic() < deadline:
+            share = rng.randrange(steady_shares)
+            started = time.perf_counter()
+            link = await resolver.resolve(f"terabox:s{share}", f"https://www.terabox.com/s/1s{share}")
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            calls += 1
+            if link.validity() < args.min_validity:
+                too_close_to_expiry += 1
+            if elapsed >= server.latency / 2:
+                slow_calls += 1
+            await asyncio.sleep(args.interval_ms / 1000)
+        results["steady"] = {
+            "calls": calls,
+            "upstream_requests": server.requests,
+            "links_below_min_validity": too_close_to_expiry,
+            "calls_waiting_on_upstream": slow_calls,
+            "latency": latency_summary(latencies),
+            "resolver": resolver.stats(),
+        }
+        await resolver.stop()
+    finally:
+        await runner.cleanup()
+    return {
+        "latency_ms": args.latency_ms,
+        "expires_in": args.expires_in,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="burst: समानांतर रिज़ॉल्व")
+    parser.add_argument("--shares", type=int, default=50, help="अलग-अलग शेयर")
+    parser.add_argument("--latency-ms", type=float, default=300, help="स्थानीय रिज़ॉल्वर की देरी")
+    parser.add_argument("--expires-in", type=float, default=3.0, help="डायरेक्ट लिंक की वैधता (सेकंड)")
+    parser.add_argument("--concurrency", type=int, default=4, help="RESOLVER_CONCURRENCY")
+    parser.add_argument("--min-validity", type=float, default=0.5, help="RESOLVER_MIN_VALIDITY_SECONDS")
+    parser.add_argument("--refresh-ahead", type=float, default=1.5, help="RESOLVER_REFRESH_AHEAD_SECONDS")
+    parser.add_argument("--duration", type=float, default=10.0, help="steady: अवधि (सेकंड)")
+    parser.add_argument("--interval-ms", type=float, default=5, help="steady: कॉल के बीच का अंतराल")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON परिणाम इस फ़ाइल में भी लिखें")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""download_file का पुनः प्रयास और फिर से शुरू होना, एक स्थानीय HTTP सर्वर पर जो स्ट्रीम बीच में तोड़ता है।
+
+सर्वर (aiohttp, 127.0.0.1) यादृच्छिक बाइट्स की एक फ़ाइल Range/ETag के साथ देता है और हर
+प्रतिक्रिया को --drop-probability की संभावना से --drop-after-kb के बाद बीच में काट देता है।
+तीन परिदृश्य चलते हैं और हर परिणाम SHA-256 से जाँचा जाता है:
+  flaky     टूटते कनेक्शन: सेगमेंट अपनी प्रगति से आगे jittered backoff के साथ जारी रहते हैं
+  outage    पहला प्रयास --outage-after-mb के बाद सर्वर बंद (503) होने से विफल; अधूरी फ़ाइल
+            चेकपॉइंट के साथ रहती है और उसी resume_key का दूसरा प्रयास वहीं से जारी रहता है
+  restart   outage जैसा, पर दूसरे प्रयास से पहले नया SpoolManager स्टार्टअप स्कैन चलाता है
+            (प्रक्रिया रीस्टार्ट जैसा)
+
+उदाहरण:
+    python benchmarks/resume_download.py --size-mb 64 --drop-probability 0.5
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def configure_environment(args, download_dir: str):
+    os.environ["DOWNLOAD_DIR"] = download_dir
+    os.environ["DOWNLOAD_SEGMENTS"] = str(args.segments)
+    os.environ["DOWNLOAD_MIN_SEGMENT_BYTES"] = str(1024 * 1024)
+    os.environ["DOWNLOAD_CHUNK_SIZE_BYTES"] = str(64 * 1024)
+    os.environ["DOWNLOAD_MAX_RETRIES"] = str(args.max_retries)
+    os.environ["DOWNLOAD_RETRY_BASE_DELAY_SECONDS"] = str(args.retry_base_seconds)
+    os.environ["DOWNLOAD_CHECKPOINT_INTERVAL_SECONDS"] = "0.2"
+
+
+class FlakyServer:
+    # Range समर्थन वाला फ़ाइल सर्वर जो कनेक्शन बीच में काट सकता है या पूरी तरह बंद (503) हो सकता है
+    def __init__(self, payload: bytes, drop_probability: float, drop_after: int, seed: int):
+        self.payload = payload
+        self.etag = '"' + hashlib.sha256(payload).hexdigest()[:16] + '"'
+        self.drop_probability = drop_probability
+        self.drop_after = drop_after
+        self.rng = random.Random(seed)
+        self.outage_after = None # कुल भेजे गए बाइट्स जिसके बाद हर अनुरोध 503
+        self.bytes_sent = 0
+        self.requests = 0
+        self.drops = 0
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        if self.outage_after is not None and self.bytes_sent >= self.outage_after:
+            return web.Response(status=503)
+        size = len(self.payload)
+        start, end = 0, size - 1
+        status = 200
+        range_header = request.headers.get("Range")
+        if range_header:
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+            status = 206
+        headers = {"ETag": self.etag, "Content-Type": "video/mp4", "Accept-Ranges": "bytes",
+                   "Content-Disposition": 'attachment; filename="sample.mp4"'}
+        if status == 206:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = end - start + 1
+        await response.prepare(request)
+        drop_at = self.drop_after if end - start > self.drop_after and self.rng.random() < self.drop_probability else None
+        position = start
+        while position <= end:
+            chunk_end = min(position + 64 * 1024, end + 1)
+            if drop_at is not None and position - start >= drop_at:
+                self.drops += 1
+                request.transport.close() # स्ट्रीम बीच में काटें
+                return response
+            if self.outage_after is not None and self.bytes_sent >= self.outage_after:
+                request.transport.close()
+                return response
+            await response.write(self.payload[position:chunk_end])
+            self.bytes_sent += chunk_end - position
+            position = chunk_end
+        await response.write_eof()
+        return response
+
+
+async def run(args) -> dict:
+    download_dir = tempfile.mkdtemp(prefix="resume-bench-")
+    configure_environment(args, download_dir)
+    from aiohttp import web
+    import downloaders
+    from spool import SpoolManager
+
+    payload = random.Random(args.seed).randbytes(args.size_mb * 1024 * 1024)
+    expected = hashlib.sha256(payload).hexdigest()
+    server = FlakyServer(payload, args.drop_probability, args.drop_after_kb * 1024, args.seed)
+    app = web.Application()
+    app.router.add_get("/file", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/file"
+
+    def new_spool():
+        return SpoolManager(download_dir, budget_bytes=10 * len(payload), default_ttl_seconds=3600, partial_ttl_seconds=3600)
+
+    def verify(path: str) -> bool:
+        with open(path, "rb") as f:
+            ok = hashlib.sha256(f.read()).hexdigest() == expected
+        os.remove(path)
+        return ok
+
+    results = {}
+    try:
+        # flaky: टूटते कनेक्शन, एक ही कॉल में पूरा होना चाहिए
+        server.bytes_sent = server.requests = server.drops = 0
+        retries_before = downloaders.throughput_stats["retries"]
+        started = time.perf_counter()
+        path, _ = await downloaders.download_file(url, download_dir, spool=new_spool(), resume_key="bench:flaky")
+        results["flaky"] = {
+            "ok": verify(path),
+            "seconds": round(time.perf_counter() - started, 3),
+            "requests": server.requests,
+            "drops": server.drops,
+            "retries": downloaders.throughput_stats["retries"] - retries_before,
+            "bytes_sent_ratio": round(server.bytes_sent / len(payload), 3),
+        }
+
+        for scenario in ("outage", "restart"):
+            server.drop_probability = 0.0
+            server.bytes_sent = server.requests = server.drops = 0
+            server.outage_after = args.outage_after_mb * 1024 * 1024
+            spool = new_spool()
+            key = f"bench:{scenario}"
+            try:
+                await downloaders.download_file(url, download_dir, spool=spool, resume_key=key)
+                first_failed = False
+            except Exception:
+                first_failed = True
+            first_bytes = server.bytes_sent
+            server.outage_after = None
+            server.bytes_sent = 0
+            if scenario == "restart":
+                spool = new_spool()
+                spool.scan_orphans() # स्टार्टअप स्कैन: ताज़ा अधूरी फ़ाइल रखी जाती है
+            path, stats = await downloaders.download_file(url, download_dir, spool=spool, resume_key=key)
+            results[scenario] = {
+                "ok": verify(path),
+                "first_attempt_failed": first_failed,
+                "first_attempt_bytes": first_bytes,
+                "second_attempt_bytes": server.bytes_sent,
+                # Range प्रोब के 1 बाइट को छोड़कर, बिना resume के यह 1.0 होता
+                "second_attempt_ratio": round(server.bytes_sent / len(payload), 3),
+                "partials_kept_on_scan": spool.partials_kept,
+            }
+    finally:
+        await runner.cleanup()
+    return {"size_bytes": len(payload), "segments": args.segments, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=32, help="परीक्षण फ़ाइल का आकार")
+    parser.add_argument("--segments", type=int, default=4, help="DOWNLOAD_SEGMENTS")
+    parser.add_argument("--drop-probability", type=float, default=0.5, help="flaky: प्रतिक्रिया कटने की संभावना")
+    parser.add_argument("--drop-after-kb", type=int, default=512, help="flaky: इतने KB बाद कनेक्शन काटें")
+    parser.add_argument("--outage-after-mb", type=int, default=12, help="outage: इतने MB बाद सर्वर बंद")
+    parser.add_argument("--max-retries", type=int, default=8, help="DOWNLOAD_MAX_RETRIES")
+    parser.add_argument("--retry-base-seconds", type=float, default=0.05, help="DOWNLOAD_RETRY_BASE_DELAY_SECONDS")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON परिणाम इस फ़ाइल में भी लिखें")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""हल्के कमांड्स की हैंडलर लेटेंसी (p50/p99) जब भारी डाउनलोड अपडेट्स साथ चल रहे हों।
+
+Application के अपडेट फ़ेचर की तरह अपडेट्स को कतार से लेकर update processor को देता है और
+दो मोड की तुलना करता है:
+  sequential  - concurrent_updates के बिना (पुराना व्यवहार, हर अपडेट बारी-बारी से)
+  per_user    - PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES)
+
+हल्की लेटेंसी दो समूहों में भी छपती है: अन्य उपयोगकर्ताओं के अपडेट (other_users) और भारी
+उपयोगकर्ताओं के अपने हल्के अपडेट (own_heavy_users)। per_user मोड में दूसरा समूह जानबूझकर उसी
+उपयोगकर्ता के भारी अपडेट के पीछे कतार में रहता है (क्रम बनाए रखने के लिए), इसलिए कुल p99 की लंबी
+पूँछ उसी से आती है; other_users का p99 दिखाता है कि भारी अपडेट दूसरों को नहीं रोकते।
+
+उदाहरण:
+    python benchmarks/update_concurrency.py --heavy-users 5 --heavy-seconds 3 --light-rate 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Chat, Message, Update, User
+
+from update_processor import PerUserUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    user = User(id=user_id, first_name=f"user{user_id}", is_bot=False)
+    chat = Chat(id=user_id, type=Chat.PRIVATE)
+    message = Message(message_id=update_id, date=datetime.utcnow(), chat=chat, from_user=user, text=text)
+    return Update(update_id=update_id, message=message)
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(mode: str, args) -> dict:
+    processor = PerUserUpdateProcessor(args.max_concurrent if mode == "per_user" else 1)
+    queue = asyncio.Queue()
+    light_latencies = []
+    light_by_group = {"other_users": [], "own_heavy_users": []}
+    seen = {} # {user_id: अंतिम प्रोसेस हुआ अनुक्रम}
+    order_violations = 0
+    tasks = []
+
+    async def handler(update: Update, arrived_at: float, seq: int, heavy: bool):
+        nonlocal order_violations
+        user_id = update.effective_user.id
+        if seen.get(user_id, -1) > seq:
+            order_violations += 1
+        seen[user_id] = seq
+        await asyncio.sleep(args.heavy_seconds if heavy else args.light_seconds)
+        if not heavy:
+            latency = time.perf_counter() - arrived_at
+            light_latencies.append(latency)
+            group = "own_heavy_users" if user_id <= args.heavy_users else "other_users"
+            light_by_group[group].append(latency)
+
+    async def fetcher():
+        # Application.__update_fetcher जैसा: समवर्ती मोड में टास्क बनाएं, अन्यथा प्रतीक्षा करें
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            update, arrived_at, seq, heavy = item
+            coroutine = handler(update, arrived_at, seq, heavy)
+            if mode == "per_user":
+                tasks.append(asyncio.create_task(processor.process_update(update, coroutine)))
+            else:
+                await processor.process_update(update, coroutine)
+
+    fetch_task = asyncio.create_task(fetcher())
+    rng = random.Random(args.seed)
+    update_id = 0
+    per_user_seq = {}
+
+    def submit(user_id: int, heavy: bool):
+        nonlocal update_id
+        update_id += 1
+        seq = per_user_seq.get(user_id, 0)
+        per_user_seq[user_id] = seq + 1
+        text = "https://terabox.com/s/1example" if heavy else "/start"
+        queue.put_nowait((make_update(update_id, user_id, text), time.perf_counter(), seq, heavy))
+
+    started = time.perf_counter()
+    for user_id in range(1, args.heavy_users + 1):
+        submit(user_id, heavy=True)
+    deadline = started + args.duration
+    while time.perf_counter() < deadline:
+        # भारी उपयोगकर्ताओं में से कोई भी हल्का कमांड भी भेज सकता है (क्रम जाँचने के लिए)
+        user_id = rng.randint(1, args.heavy_users + args.light_users)
+        submit(user_id, heavy=False)
+        await asyncio.sleep(rng.expovariate(args.light_rate))
+    queue.put_nowait(None)
+    await fetch_task
+    await asyncio.gather(*tasks)
+
+    return {
+        "mode": mode,
+        "light_updates": len(light_latencies),
+        "light_p50_ms": round(percentile(light_latencies, 50) * 1000, 2),
+        "light_p99_ms": round(percentile(light_latencies, 99) * 1000, 2),
+        "light_max_ms": round(max(light_latencies, default=0) * 1000, 2),
+        "light_by_group": {
+            group: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for group, values in light_by_group.items()
+        },
+        "order_violations": order_violations,
+        "wall_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy-users", type=int, default=5, help="एक साथ भारी डाउनलोड भेजने वाले उपयोगकर्ता")
+    parser.add_argument("--heavy-seconds", type=float, default=3.0, help="एक भारी अपडेट का समय")
+    parser.add_argument("--light-users", type=int, default=200, help="हल्के कमांड भेजने वाले अन्य उपयोगकर्ता")
+    parser.add_argument("--light-seconds", type=float, default=0.005, help="एक हल्के अपडेट का समय")
+    parser.add_argument("--light-rate", type=float, default=50.0, help="हल्के अपडेट प्रति सेकंड")
+    parser.add_argument("--duration", type=float, default=5.0, help="हल्के अपडेट भेजने की अवधि (सेकंड)")
+    parser.add_argument("--max-concurrent", type=int, default=64, help="per_user मोड की समवर्ती सीमा")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_mode(mode, args)) for mode in ("sequential", "per_user")]
+    print(json.dumps({"benchmark": "update_concurrency", "params": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""webhook.make_webhook_app की जाँच, aiohttp के टेस्ट क्लाइंट और असली PTB Application के साथ।
+
+Application का Bot API एक नकली BaseRequest से चलता है (नेटवर्क नहीं), और group 99 में एक TypeHandler
+हर संसाधित अपडेट का प्रकार रिकॉर्ड करता है। हैंडलर जानबूझकर --handler-delay-ms धीमा है, ताकि दिखे
+कि वेबहुक जवाब प्रोसेसिंग की प्रतीक्षा नहीं करता। जाँचें:
+  secret      X-Telegram-Bot-Api-Secret-Token के बिना या ग़लत टोकन पर 403, कुछ भी कतार में नहीं
+  single      एकल अपडेट: तेज़ 200 और हैंडलर तक पहुँचता है
+  batch       अपडेट्स की JSON सूची: 200 और सभी हैंडलर तक पहुँचते हैं
+  malformed   ख़राब JSON / गैर-ऑब्जेक्ट पेलोड पर 400, सूची में गैर-ऑब्जेक्ट आइटम छोड़े जाते हैं,
+              और सर्वर उसके बाद भी अपडेट स्वीकार करता है
+  allowed     main.ALLOWED_UPDATES के बाहर के प्रकार (edited_message, channel_post, ...) हैंडलर तक नहीं
+हर जाँच का परिणाम JSON में छपता है और कोई जाँच विफल हो तो निकास कोड 1 है।
+
+उदाहरण:
+    python benchmarks/webhook_app.py --handler-delay-ms 500
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SECRET = "benchmark-secret"
+PATH = "/telegram"
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+
+
+def configure_environment():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ["METRICS_ENABLED"] = "false"
+
+
+def make_fake_request_class():
+    from telegram.request import BaseRequest
+
+    class FakeRequest(BaseRequest):
+        # केवल Application.initialize का getMe; बाकी हर कॉल पर सामान्य "ok"
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                             connect_timeout=None, pool_timeout=None):
+            result = BOT_USER if url.endswith("/getMe") else True
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    return FakeRequest
+
+
+class UpdateFactory:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def make(self, kind: str) -> dict:
+        update_id = next(self._ids)
+        user = {"id": 1000 + update_id, "is_bot": False, "first_name": "user"}
+        message = {"message_id": update_id, "date": int(time.time()), "chat": {"id": user["id"], "type": "private"},
+                   "from": user, "text": "https://terabox.com/s/1abcdef"}
+        if kind == "callback_query":
+            body = {"id": str(update_id), "from": user, "chat_instance": "1", "data": "terabox_download",
+                    "message": message}
+        elif kind == "channel_post":
+            body = {**message, "chat": {"id": -100, "type": "channel"}}
+            body.pop("from")
+        elif kind == "poll":
+            body = {"id": str(update_id), "question": "?", "options": [], "total_voter_count": 0, "is_closed": False,
+                    "is_anonymous": True, "type": "regular", "allows_multiple_answers": False}
+        else: # message, edited_message
+            body = message if kind == "message" else {**message, "edit_date": int(time.time())}
+        return {"update_id": update_id, kind: body}
+
+
+async def run(args) -> dict:
+    configure_environment()
+    from aiohttp.test_utils import TestClient, TestServer
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder, TypeHandler
+    import webhook
+    from main import ALLOWED_UPDATES
+
+    handled = [] # (update_id, प्रकार) संसाधित क्रम में
+    handled_changed = asyncio.Event()
+
+    async def record(update: Update, context):
+        await asyncio.sleep(args.handler_delay_ms / 1000)
+        kind = next(key for key in update.to_dict() if key != "update_id")
+        handled.append((update.update_id, kind))
+        handled_changed.set()
+
+    async def wait_for_handled(count: int) -> bool:
+        deadline = time.monotonic() + args.timeout
+        while len(handled) < count:
+            handled_changed.clear()
+            try:
+                await asyncio.wait_for(handled_changed.wait(), deadline - time.monotonic())
+            except (asyncio.TimeoutError, ValueError):
+                return False
+        return True
+
+    application = ApplicationBuilder().token(os.environ["TELEGRAM_BOT_TOKEN"]) \
+        .request(make_fake_request_class()()).updater(None).build()
+    application.add_handler(TypeHandler(Update, record), group=99)
+    await application.initialize()
+    await application.start()
+
+    client = TestClient(TestServer(webhook.make_webhook_app(application, PATH, SECRET, ALLOWED_UPDATES)))
+    await client.start_server()
+    updates = UpdateFactory()
+
+    async def post(body, secret: str | None = SECRET) -> tuple[int, float]:
+        headers = {"Content-Type": "application/json"}
+        if secret is not None:
+            headers[webhook.SECRET_TOKEN_HEADER] = secret
+        data = body if isinstance(body, (str, bytes)) else json.dumps(body)
+        started = time.perf_counter()
+        response = await client.post(PATH, data=data, headers=headers)
+        await response.release()
+        return response.status, time.perf_counter() - started
+
+    async def settled(count: int) -> bool:
+        # count तक पहुँचें और उसके बाद कुछ भी अतिरिक्त न आए
+        reached = await wait_for_handled(count)
+        await asyncio.sleep(args.handler_delay_ms / 1000 + 0.2)
+        return reached and len(handled) == count
+
+    checks = {}
+    details = {}
+    fast_limit = args.handler_delay_ms / 1000 / 2
+    try:
+        # secret: टोकन के बिना और ग़लत टोकन
+        missing_status, _ = await post(updates.make("message"), secret=None)
+        wrong_status, _ = await post(updates.make("message"), secret="wrong-" + SECRET)
+        checks["secret_missing_403"] = missing_status == 403
+        checks["secret_wrong_403"] = wrong_status == 403
+        checks["secret_rejected_not_queued"] = await settled(0)
+
+        # single: जवाब हैंडलर के पूरा होने से पहले
+        single = updates.make("message")
+        status, latency = await post(single)
+        checks["single_200"] = status == 200
+        checks["single_fast_response"] = latency < fast_limit
+        checks["single_reaches_handler"] = await settled(1) and handled[-1] == (single["update_id"], "message")
+        details["single_response_ms"] = round(latency * 1000, 1)
+
+        # batch: सूची के सभी अपडेट, क्रम में
+        batch = [updates.make("message"), updates.make("callback_query"), updates.make("message")]
+        status, latency = await post(batch)
+        checks["batch_200"] = status == 200
+        checks["batch_fast_response"] = latency < fast_limit
+        checks["batch_all_reach_handler"] = await settled(4) and handled[-3:] == [
+            (item["update_id"], next(key for key in item if key != "update_id")) for item in batch
+        ]
+        details["batch_response_ms"] = round(latency * 1000, 1)
+
+        # malformed: ख़राब JSON और गैर-ऑब्जेक्ट पेलोड अस्वीकार; सूची में केवल वैध ऑब्जेक्ट
+        statuses = [(await post(body))[0] for body in ("{not json", b"\xff\xfe", "42", '"text"', "null")]
+        checks["malformed_payload_400"] = statuses == [400] * len(statuses)
+        valid = updates.make("message")
+        status, _ = await post([1, "x", None, [valid], {"update_id": "nope", "message": 5}, valid])
+        checks["malformed_items_skipped"] = status == 200 and await settled(5) and handled[-1] == (valid["update_id"], "message")
+        details["malformed_statuses"] = statuses
+        health = await client.get("/healthz")
+        after = updates.make("message")
+        status, _ = await post(after)
+        checks["malformed_server_still_serving"] = health.status == 200 and status == 200 and await settled(6)
+        await health.release()
+
+        # allowed: अनुमत सूची के बाहर के प्रकार हैंडलर तक नहीं पहुँचते
+        mixed = [updates.make(kind) for kind in ("edited_message", "message", "channel_post", "poll", "callback_query")]
+        status, _ = await post(mixed)
+        before = len(handled)
+        reached = await settled(before + 2)
+        kinds = [kind for _, kind in handled[before:]]
+        checks["allowed_200"] = status == 200
+        checks["allowed_only_allowed_types_handled"] = reached and kinds == ["message", "callback_query"]
+        checks["allowed_all_handled_types_allowed"] = all(kind in ALLOWED_UPDATES for _, kind in handled)
+        details["allowed_updates"] = list(ALLOWED_UPDATES)
+        details["handled"] = len(handled)
+    finally:
+        await client.close()
+        await application.stop()
+        await application.shutdown()
+    return {"passed": all(checks.values()), "checks": checks, "details": details}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handler-delay-ms", type=int, default=500, help="हर अपडेट पर हैंडलर की देरी")
+    parser.add_argument("--timeout", type=float, default=10.0, help="हैंडलर तक पहुँचने की अधिकतम प्रतीक्षा (सेकंड)")
+    parser.add_argument("--output", help="JSON परिणाम इस फ़ाइल में भी लिखें")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from pymongo.errors import PyMongoError
+from telegram.error import BadRequest, Forbidden, TelegramError
+
+from config import Config
+from database import (
+    checkpoint_broadcast,
+    claim_broadcast,
+    count_broadcast_recipients,
+    create_broadcast,
+    fetch_broadcast_recipients,
+    finish_broadcast,
+    mark_users_blocked,
+    release_broadcasts,
+)
+from rate_limiter import TokenBucket
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# BadRequest के ये संदेश भी स्थायी हैं: ऐसे उपयोगकर्ता को आगे के प्रसारणों से हटाएं
+_GONE_USER_ERRORS = ("chat not found", "user is deactivated", "peer_id_invalid")
+
+_STATUS_LABELS = {
+    "running": "⏳ जारी",
+    "completed": "✅ पूरा",
+    "cancelled": "🛑 रद्द",
+}
+
+
+def format_progress(doc: dict, total: int, rate: float) -> str:
+    done = doc["sent"] + doc["blocked"] + doc["failed"]
+    lines = [
+        f"📣 **प्रसारण** — {_STATUS_LABELS.get(doc['status'], doc['status'])}",
+        f"प्रगति: {done}/{max(total, done)}",
+        f"✅ भेजे गए: {doc['sent']}",
+        f"🚫 ब्लॉक/निष्क्रिय: {doc['blocked']}",
+        f"⚠️ विफल: {doc['failed']}",
+    ]
+    if doc["status"] == "running" and rate > 0:
+        remaining = max(total - done, 0)
+        lines.append(f"गति: {rate:.1f}/s, शेष समय: ~{int(remaining / rate // 60)} मिनट")
+    return "\n".join(lines)
+
+
+class Broadcaster:
+    # एडमिन प्रसारण: उपयोगकर्ता Mongo से पन्नों में आते हैं (पूरी सूची कभी स्मृति में नहीं),
+    # हर पन्ना concurrency सीमा और अलग टोकन बकेट (messages_per_second, वैश्विक Telegram सीमा से कम
+    # ताकि सामान्य जवाबों के लिए जगह बचे) से भेजा जाता है, फिर प्रगति चेकपॉइंट होती है।
+    # प्रक्रिया रुकने पर लीज़ समाप्त होते ही (यही या कोई और रेप्लिका) अंतिम चेकपॉइंट से आगे बढ़ती है;
+    # अंतिम पन्ने के कुछ उपयोगकर्ताओं को संदेश दोबारा मिल सकता है।
+    def __init__(self, page_size: int, concurrency: int, messages_per_second: float,
+                 lease_seconds: float, progress_interval_seconds: float, poll_interval_seconds: float):
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.messages_per_second = messages_per_second
+        self.lease_seconds = lease_seconds
+        self.progress_interval_seconds = progress_interval_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._bucket = TokenBucket(messages_per_second, messages_per_second)
+        self._bot = None
+        self._task = None
+        self._wakeup = None
+        # काउंटर
+        self.broadcasts = 0
+        self.sent = 0
+        self.blocked = 0
+        self.failed = 0
+
+    async def create(self, created_by: int, status_chat_id: int, status_message_id: int, *,
+                     text: str | None = None, from_chat_id: int | None = None, message_id: int | None = None):
+        # text: सादा पाठ; या from_chat_id/message_id: वह संदेश copy_message से (मीडिया/फ़ॉर्मेटिंग सहित)
+        broadcast_id = await create_broadcast({
+            "created_by": created_by,
+            "status_chat_id": status_chat_id,
+            "status_message_id": status_message_id,
+            "text": text,
+            "from_chat_id": from_chat_id,
+            "message_id": message_id,
+            "total": await count_broadcast_recipients(),
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return broadcast_id
+
+    # --- भेजना ---
+
+    async def _send(self, doc: dict, user_id: int) -> str:
+        await asyncio.sleep(self._bucket.reserve())
+        try:
+            if doc.get("message_id") is not None:
+                await self._bot.copy_message(chat_id=user_id, from_chat_id=doc["from_chat_id"], message_id=doc["message_id"])
+            else:
+                await self._bot.send_message(chat_id=user_id, text=doc["text"])
+        except Forbidden: # बॉट ब्लॉक किया गया या खाता हटाया गया
+            return "blocked"
+        except BadRequest as e:
+            if any(error in str(e).lower() for error in _GONE_USER_ERRORS):
+                return "blocked"
+            logger.warning(f"प्रसारण: उपयोगकर्ता {user_id} को भेजने में त्रुटि: {e}")
+            return "failed"
+        except TelegramError as e: # RetryAfter यहाँ तभी आता है जब दर सीमक के पुनः प्रयास भी समाप्त हो गए
+            logger.warning(f"प्रसारण: उपयोगकर्ता {user_id} को भेजने में त्रुटि: {e}")
+            return "failed"
+        return "sent"
+
+    async def _send_page(self, doc: dict, user_ids: list[int]) -> list[str]:
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def send(user_id: int) -> str:
+            async with slots:
+                return await self._send(doc, user_id)
+
+        return await asyncio.gather(*(send(user_id) for user_id in user_ids))
+
+    async def _show_progress(self, doc: dict, rate: float):
+        try:
+            await self._bot.edit_message_text(
+                chat_id=doc["status_chat_id"],
+                message_id=doc["status_message_id"],
+                text=format_progress(doc, doc.get("total", 0), rate),
+                parse_mode='Markdown',
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"प्रसारण स्थिति संदेश अपडेट नहीं हो सका: {e}")
+        except TelegramError as e:
+            logger.warning(f"प्रसारण स्थिति संदेश अपडेट नहीं हो सका: {e}")
+
+    async def _run_broadcast(self, doc: dict):
+        broadcast_id = doc["_id"]
+        logger.info(f"प्रसारण {broadcast_id} चल रहा है (चेकपॉइंट: {doc.get('last_user_id')})।")
+        started = time.monotonic()
+        done_at_start = doc["sent"] + doc["blocked"] + doc["failed"]
+        last_progress = 0.0
+        while True:
+            user_ids = await fetch_broadcast_recipients(doc.get("last_user_id"), self.page_size)
+            if not user_ids:
+                await finish_broadcast(broadcast_id, self.owner, "completed")
+                doc["status"] = "completed"
+                logger.info(f"प्रसारण {broadcast_id} पूरा: {doc['sent']} भेजे, {doc['blocked']} ब्लॉक, {doc['failed']} विफल।")
+                break
+
+            results = await self._send_page(doc, user_ids)
+            blocked_ids = [user_id for user_id, result in zip(user_ids, results) if result == "blocked"]
+            if blocked_ids:
+                await mark_users_blocked(blocked_ids)
+            counts = {result: results.count(result) for result in ("sent", "blocked", "failed")}
+            self.sent += counts["sent"]
+            self.blocked += counts["blocked"]
+            self.failed += counts["failed"]
+            for result, count in counts.items():
+                metrics.broadcast_messages.labels(result).inc(count)
+
+            doc = await checkpoint_broadcast(
+                broadcast_id, self.owner, user_ids[-1], counts["sent"], counts["blocked"], counts["failed"],
+                self.lease_seconds,
+            )
+            if doc is None:
+                logger.warning(f"प्रसारण {broadcast_id} की लीज़ खो गई, यह रनर रुक रहा है।")
+                return
+            if doc["status"] != "running": # /broadcast_cancel
+                logger.info(f"प्रसारण {broadcast_id} रद्द किया गया।")
+                break
+
+            now = time.monotonic()
+            if now - last_progress >= self.progress_interval_seconds:
+                last_progress = now
+                done = doc["sent"] + doc["blocked"] + doc["failed"] - done_at_start
+                await self._show_progress(doc, done / max(now - started, 1e-6))
+        await self._show_progress(doc, 0.0)
+
+    async def _run_loop(self):
+        while True:
+            try:
+                doc = await claim_broadcast(self.owner, self.lease_seconds)
+                if doc is not None:
+                    self.broadcasts += 1
+                    await self._run_broadcast(doc)
+                    continue # कतार में अगला प्रसारण
+            except PyMongoError as e:
+                logger.error(f"प्रसारण में DB त्रुटि (लीज़ समाप्त होने पर फिर से शुरू होगा): {e}")
+            self._wakeup.clear()
+            try:
+                # कोई और रेप्लिका बीच में रुकी हो तो उसका प्रसारण यहाँ से उठाया जाता है
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot):
+        # स्टार्टअप पर पहली जाँच तुरंत: रीस्टार्ट से पहले अधूरा रहा प्रसारण फिर से शुरू होता है
+        if self._task is None:
+            self._bot = bot
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run_loop(), name="broadcaster")
+
+    async def stop(self):
+        # अधूरा पन्ना फिर से भेजा जाएगा; चेकपॉइंट हर पन्ने के बाद सहेजा जाता है
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await release_broadcasts(self.owner)
+            except PyMongoError as e:
+                logger.error(f"प्रसारण लीज़ छोड़ने में त्रुटि: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "broadcasts": self.broadcasts,
+            "sent": self.sent,
+            "blocked": self.blocked,
+            "failed": self.failed,
+        }
+
+
+broadcaster = Broadcaster(
+    page_size=Config.BROADCAST_PAGE_SIZE,
+    concurrency=Config.BROADCAST_CONCURRENCY,
+    messages_per_second=Config.BROADCAST_MESSAGES_PER_SECOND,
+    lease_seconds=Config.BROADCAST_LEASE_SECONDS,
+    progress_interval_seconds=Config.BROADCAST_PROGRESS_INTERVAL_SECONDS,
+    poll_interval_seconds=Config.BROADCAST_POLL_INTERVAL_SECONDS,
+)
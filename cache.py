@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# --- इन-प्रोसेस LRU + TTL कैश ---
+# आकार सीमा पार होने पर सबसे कम हाल में उपयोग की गई प्रविष्टि हटाई जाती है;
+# समाप्त (expired) प्रविष्टियाँ पढ़ते समय हटाई जाती हैं।
+
+_MISSING = object()
+
+class LRUTTLCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # {key: (expires_at, value)}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        if self.max_size <= 0:
+            return # कैश अक्षम
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def items(self) -> list:
+        # समाप्त न हुई (key, value) जोड़ियाँ; LRU क्रम नहीं बदलता
+        now = time.monotonic()
+        return [(key, value) for key, (expires_at, value) in self._entries.items() if expires_at > now]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# --- समान कुंजी के समानांतर अनुरोधों को एक में मिलाना ---
+# पहला कॉलर वास्तविक काम शुरू करता है; बाकी उसी परिणाम (या अपवाद) की प्रतीक्षा करते हैं।
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {} # {key: asyncio.Task}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            self.shared += 1
+        # shield: किसी एक प्रतीक्षक के रद्द होने से सबके लिए अनुरोध रद्द न हो
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception() # "exception was never retrieved" चेतावनी से बचें
+
+    def __len__(self) -> int:
+        return len(self._inflight)
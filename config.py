@@ -40,6 +40,9 @@ class Config:
     # Your UPI ID for payments
     UPI_ID = os.environ.get("UPI_ID")
 
+    # डाउनलोड की गई फ़ाइलों के लिए अस्थायी निर्देशिका
+    DOWNLOAD_DIR = os.environ.get("DOWNLOAD_DIR", "downloads")
+
     # File Deletion Delay (in minutes)
     FILE_DELETE_DELAY_MINUTES = int(os.environ.get("FILE_DELETE_DELAY_MINUTES", 3))
 
@@ -51,3 +54,201 @@ class Config:
     # Default: 2 days (2 * 24 * 60 * 60)
     PREMIUM_EXHAUSTED_TTL_SECONDS = int(os.environ.get("PREMIUM_EXHAUSTED_TTL_SECONDS", 2 * 24 * 60 * 60))
 
+
+    # --- MongoDB कनेक्शन पूल, टाइमआउट और रीट्राई सेटिंग्स ---
+    # pymongo कनेक्शन पूल का अधिकतम/न्यूनतम आकार
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+
+    # टाइमआउट (मिलीसेकंड में)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 10000))
+
+    # ड्राइवर-स्तर की रीट्राई (retryable reads/writes)
+    MONGO_RETRY_WRITES = os.environ.get("MONGO_RETRY_WRITES", "true").lower() == "true"
+    MONGO_RETRY_READS = os.environ.get("MONGO_RETRY_READS", "true").lower() == "true"
+
+    # सिंक्रोनस pymongo कॉल्स इस आकार के थ्रेड पूल में चलती हैं ताकि इवेंट लूप ब्लॉक न हो
+    # इसे MONGO_MAX_POOL_SIZE से बड़ा रखने का कोई फ़ायदा नहीं है
+    MONGO_EXECUTOR_WORKERS = int(os.environ.get("MONGO_EXECUTOR_WORKERS", 16))
+
+    # नेटवर्क त्रुटियों (AutoReconnect/NetworkTimeout) पर idempotent ऑपरेशन्स के लिए अतिरिक्त प्रयास
+    MONGO_OP_RETRIES = int(os.environ.get("MONGO_OP_RETRIES", 2))
+    # पहले रीट्राई से पहले प्रतीक्षा (सेकंड), हर प्रयास पर दोगुनी होती है
+    MONGO_OP_RETRY_BACKOFF_SECONDS = float(os.environ.get("MONGO_OP_RETRY_BACKOFF_SECONDS", 0.2))
+
+    # last_activity write-behind बफ़र: इतने सेकंड पर या इतने लंबित उपयोगकर्ताओं पर फ़्लश करें
+    ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.environ.get("ACTIVITY_FLUSH_INTERVAL_SECONDS", 30))
+    ACTIVITY_FLUSH_MAX_PENDING = int(os.environ.get("ACTIVITY_FLUSH_MAX_PENDING", 500))
+
+    # users दस्तावेज़ों का इन-प्रोसेस LRU+TTL कैश (0 = अक्षम)
+    USER_CACHE_MAX_SIZE = int(os.environ.get("USER_CACHE_MAX_SIZE", 10000))
+    USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 60))
+
+    # चैनल सदस्यता कैश: सकारात्मक परिणाम लंबे समय तक, नकारात्मक थोड़े समय तक (सेकंड)
+    MEMBERSHIP_POSITIVE_TTL_SECONDS = float(os.environ.get("MEMBERSHIP_POSITIVE_TTL_SECONDS", 3600))
+    MEMBERSHIP_NEGATIVE_TTL_SECONDS = float(os.environ.get("MEMBERSHIP_NEGATIVE_TTL_SECONDS", 10))
+    MEMBERSHIP_CACHE_MAX_SIZE = int(os.environ.get("MEMBERSHIP_CACHE_MAX_SIZE", 50000))
+
+    # --- डाउनलोड इंजन ---
+    # समानांतर HTTP Range सेगमेंट्स की संख्या और डिस्क पर लिखने का ब्लॉक आकार
+    DOWNLOAD_SEGMENTS = int(os.environ.get("DOWNLOAD_SEGMENTS", 4))
+    DOWNLOAD_CHUNK_SIZE_BYTES = int(os.environ.get("DOWNLOAD_CHUNK_SIZE_BYTES", 1024 * 1024))
+    # इससे छोटे हिस्सों में फ़ाइल को नहीं बाँटा जाता
+    DOWNLOAD_MIN_SEGMENT_BYTES = int(os.environ.get("DOWNLOAD_MIN_SEGMENT_BYTES", 8 * 1024 * 1024))
+    # अधिकतम फ़ाइल आकार (बाइट्स); स्ट्रीमिंग के दौरान भी लागू
+    MAX_DOWNLOAD_SIZE_BYTES = int(os.environ.get("MAX_DOWNLOAD_SIZE_BYTES", 2000 * 1024 * 1024))
+    DOWNLOAD_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("DOWNLOAD_CONNECT_TIMEOUT_SECONDS", 15))
+    DOWNLOAD_READ_TIMEOUT_SECONDS = float(os.environ.get("DOWNLOAD_READ_TIMEOUT_SECONDS", 60))
+    # कनेक्शन टूटने/5xx पर प्रति सेगमेंट पुनः प्रयास; प्रतीक्षा full-jitter घातांकीय (आधार, अधिकतम सेकंड)
+    DOWNLOAD_MAX_RETRIES = int(os.environ.get("DOWNLOAD_MAX_RETRIES", 4))
+    DOWNLOAD_RETRY_BASE_DELAY_SECONDS = float(os.environ.get("DOWNLOAD_RETRY_BASE_DELAY_SECONDS", 1))
+    DOWNLOAD_RETRY_MAX_DELAY_SECONDS = float(os.environ.get("DOWNLOAD_RETRY_MAX_DELAY_SECONDS", 30))
+    # अधूरे डाउनलोड की प्रगति (.part.json) इस अंतराल पर सहेजी जाती है
+    DOWNLOAD_CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get("DOWNLOAD_CHECKPOINT_INTERVAL_SECONDS", 5))
+
+    # --- डाउनलोड शेड्यूलर ---
+    # एक साथ चलने वाले कुल डाउनलोड, प्रति उपयोगकर्ता चल रहे डाउनलोड, और प्रति उपयोगकर्ता कतार सीमा
+    MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", 3))
+    MAX_DOWNLOADS_PER_USER = int(os.environ.get("MAX_DOWNLOADS_PER_USER", 1))
+    MAX_QUEUED_DOWNLOADS_PER_USER = int(os.environ.get("MAX_QUEUED_DOWNLOADS_PER_USER", 3))
+    # एक संदेश में अधिकतम Terabox लिंक; हर लिंक अलग जॉब बनता है और अलग क्रेडिट खर्च करता है
+    MAX_LINKS_PER_MESSAGE = int(os.environ.get("MAX_LINKS_PER_MESSAGE", 10))
+
+    # --- Telegram file_id कैश (दोहराए गए लिंक के लिए) ---
+    # प्रविष्टि की आयु (सेकंड) और अधिकतम प्रविष्टियाँ (LRU)
+    FILE_ID_CACHE_TTL_SECONDS = int(os.environ.get("FILE_ID_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+    FILE_ID_CACHE_MAX_ENTRIES = int(os.environ.get("FILE_ID_CACHE_MAX_ENTRIES", 20000))
+
+    # --- डाउनलोड निर्देशिका (स्पूल) ---
+    # DOWNLOAD_DIR का कुल बाइट बजट; पार होने पर सबसे पुरानी भेजी गई फ़ाइलें पहले हटती हैं
+    DOWNLOAD_DIR_BUDGET_BYTES = int(os.environ.get("DOWNLOAD_DIR_BUDGET_BYTES", 5 * 1024 * 1024 * 1024))
+    # सुरक्षा जाल: कोई फ़ाइल इससे अधिक समय (सेकंड) तक नहीं रहती, भले उसका हटाना शेड्यूल न हुआ हो
+    SPOOL_MAX_FILE_AGE_SECONDS = int(os.environ.get("SPOOL_MAX_FILE_AGE_SECONDS", 60 * 60))
+    # विफल डाउनलोड की अधूरी फ़ाइल इतने समय तक रखी जाती है ताकि उसी लिंक का अगला अनुरोध वहीं से जारी रहे
+    PARTIAL_DOWNLOAD_MAX_AGE_SECONDS = int(os.environ.get("PARTIAL_DOWNLOAD_MAX_AGE_SECONDS", 60 * 60))
+
+    # एक साथ प्रोसेस होने वाले अपडेट्स की अधिकतम संख्या (एक ही उपयोगकर्ता के अपडेट फिर भी क्रम में चलते हैं)
+    MAX_CONCURRENT_UPDATES = int(os.environ.get("MAX_CONCURRENT_UPDATES", 64))
+
+    # --- बातचीत स्थिति स्टोर ---
+    # "memory" (एकल प्रक्रिया) या "mongo" (कई रेप्लिका के बीच साझा)
+    STATE_STORE_BACKEND = os.environ.get("STATE_STORE_BACKEND", "memory").lower()
+    # बिना जवाब के स्थिति कितनी देर (सेकंड) रहे, और अधिकतम प्रविष्टियाँ
+    STATE_TTL_SECONDS = float(os.environ.get("STATE_TTL_SECONDS", 30 * 60))
+    STATE_MAX_ENTRIES = int(os.environ.get("STATE_MAX_ENTRIES", 100000))
+
+    # --- अपडेट प्राप्त करने का मोड ---
+    # "polling" (डिफ़ॉल्ट) या "webhook" (HTTP सर्वर; कई इंस्टेंस लोड बैलेंसर के पीछे चल सकते हैं)
+    BOT_MODE = os.environ.get("BOT_MODE", "polling").lower()
+    # सार्वजनिक बेस URL (जैसे https://mybot.koyeb.app) और वह पथ जिस पर Telegram अपडेट POST करेगा
+    WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+    WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+    # Telegram हर अनुरोध के X-Telegram-Bot-Api-Secret-Token हेडर में यह भेजता है (A-Z, a-z, 0-9, _, -)
+    WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")
+    WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+    # प्लेटफ़ॉर्म (Procfile web: डाइनो) PORT देता है
+    PORT = int(os.environ.get("PORT", 8080))
+    # Telegram की ओर से एक साथ खुले HTTPS कनेक्शन्स (1-100)
+    WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", 40))
+
+    # --- आउटबाउंड Telegram दर सीमा ---
+    # पूरे बॉट के लिए संदेश/सेकंड (Telegram की सीमा लगभग 30)
+    TG_GLOBAL_MESSAGES_PER_SECOND = float(os.environ.get("TG_GLOBAL_MESSAGES_PER_SECOND", 25))
+    # एक निजी चैट में संदेश/सेकंड और छोटा बर्स्ट (जैसे "डाउनलोड शुरू" + फ़ाइल + कोटा संदेश)
+    TG_PRIVATE_CHAT_MESSAGES_PER_SECOND = float(os.environ.get("TG_PRIVATE_CHAT_MESSAGES_PER_SECOND", 1))
+    TG_PRIVATE_CHAT_BURST = float(os.environ.get("TG_PRIVATE_CHAT_BURST", 3))
+    # समूह/चैनल में संदेश/मिनट (Telegram की सीमा 20)
+    TG_GROUP_MESSAGES_PER_MINUTE = float(os.environ.get("TG_GROUP_MESSAGES_PER_MINUTE", 20))
+    TG_GROUP_BURST = float(os.environ.get("TG_GROUP_BURST", 3))
+    # 429 (RetryAfter) पर अधिकतम पुनः प्रयास
+    TG_MAX_RETRIES = int(os.environ.get("TG_MAX_RETRIES", 3))
+    # कितनी चैट्स के बकेट स्मृति में रखें
+    TG_RATE_LIMIT_MAX_CHATS = int(os.environ.get("TG_RATE_LIMIT_MAX_CHATS", 50000))
+
+    # --- अपलोड ---
+    # स्थानीय telegram-bot-api सर्वर (--local मोड), जैसे http://localhost:8081/bot और http://localhost:8081/file/bot
+    # सेट होने पर फ़ाइलें पथ से भेजी जाती हैं और 2000 MB तक की सीमा मिलती है; सर्वर को DOWNLOAD_DIR दिखना चाहिए
+    BOT_API_BASE_URL = os.environ.get("BOT_API_BASE_URL")
+    BOT_API_BASE_FILE_URL = os.environ.get("BOT_API_BASE_FILE_URL")
+    BOT_API_LOCAL_MODE = os.environ.get("BOT_API_LOCAL_MODE", "true" if BOT_API_BASE_URL else "false").lower() == "true"
+    # अपलोड सीमा से बड़ी फ़ाइलें इस आकार के भागों में भेजी जाती हैं (0 = सीमा से 1 MB कम)
+    UPLOAD_PART_SIZE_BYTES = int(os.environ.get("UPLOAD_PART_SIZE_BYTES", 0))
+    # बड़े अपलोड के लिए read/write टाइमआउट (सेकंड)
+    UPLOAD_TIMEOUT_SECONDS = float(os.environ.get("UPLOAD_TIMEOUT_SECONDS", 600))
+
+    # --- मेट्रिक्स ---
+    # Prometheus-शैली /metrics एंडपॉइंट (डिफ़ॉल्ट रूप से केवल लोकलहोस्ट पर)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_LISTEN = os.environ.get("METRICS_LISTEN", "127.0.0.1")
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", 9100))
+
+    # --- स्थायी विलंबित जॉब (फ़ाइल हटाने की सूचना, कोटा रिमाइंडर) ---
+    # पोल अंतराल, एक बैच में जॉब्स, और लीज़ अवधि (इसके बाद अधूरा जॉब कोई और ले सकता है)
+    JOB_POLL_INTERVAL_SECONDS = float(os.environ.get("JOB_POLL_INTERVAL_SECONDS", 5))
+    JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", 100))
+    JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 120))
+    # विफल जॉब: अधिकतम प्रयास और पहले पुनः प्रयास से पहले प्रतीक्षा (हर बार दोगुनी)
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get("JOB_RETRY_BACKOFF_SECONDS", 30))
+    # एक बैच के भीतर एक साथ चलने वाले जॉब
+    JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", 16))
+    # किसी दूसरे होस्ट की स्थानीय फ़ाइल वाला जॉब इतनी देर बकाया रहने पर कोई भी रेप्लिका ले सकती है
+    JOB_FOREIGN_HOST_GRACE_SECONDS = float(os.environ.get("JOB_FOREIGN_HOST_GRACE_SECONDS", 120))
+    # मुफ़्त सीमा समाप्त होने के इतने घंटे बाद प्रीमियम रिमाइंडर (0 = बंद)
+    QUOTA_REMINDER_DELAY_HOURS = float(os.environ.get("QUOTA_REMINDER_DELAY_HOURS", 24))
+
+    # --- बल्क प्रीमियम (/add_premium_bulk) ---
+    # एक कमांड में अधिकतम पंक्तियाँ, और एक साथ भेजी जाने वाली सूचनाएँ (दर सीमा outbound_limiter लागू करता है)
+    BULK_PREMIUM_MAX_LINES = int(os.environ.get("BULK_PREMIUM_MAX_LINES", 5000))
+    BULK_NOTIFY_CONCURRENCY = int(os.environ.get("BULK_NOTIFY_CONCURRENCY", 20))
+
+    # --- UTR भुगतान डाइजेस्ट ---
+    # नए लंबित भुगतान इस अंतराल पर एक संदेश में एडमिन चैनल पर भेजे जाते हैं
+    PAYMENT_DIGEST_INTERVAL_SECONDS = float(os.environ.get("PAYMENT_DIGEST_INTERVAL_SECONDS", 300))
+    # एक डाइजेस्ट में अधिकतम भुगतान (हर भुगतान की एक बटन पंक्ति)
+    PAYMENT_DIGEST_MAX_ITEMS = int(os.environ.get("PAYMENT_DIGEST_MAX_ITEMS", 20))
+    # डाइजेस्ट भेजते समय भुगतानों पर दावा; भेजना अटक जाए तो इसके बाद कोई और रेप्लिका भेजेगी
+    PAYMENT_DIGEST_LEASE_SECONDS = float(os.environ.get("PAYMENT_DIGEST_LEASE_SECONDS", 60))
+
+    # --- प्रसारण (/broadcast) ---
+    # एक पन्ने में उपयोगकर्ता (हर पन्ने के बाद चेकपॉइंट), एक साथ भेजे जाने वाले संदेश और प्रसारण की दर
+    # (TG_GLOBAL_MESSAGES_PER_SECOND से कम रखें ताकि सामान्य जवाबों के लिए जगह बचे)
+    BROADCAST_PAGE_SIZE = int(os.environ.get("BROADCAST_PAGE_SIZE", 100))
+    BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", 20))
+    BROADCAST_MESSAGES_PER_SECOND = float(os.environ.get("BROADCAST_MESSAGES_PER_SECOND", 20))
+    # रनर की लीज़ (हर पन्ने पर बढ़ती है); प्रक्रिया रुकने पर इसके बाद कोई और आगे बढ़ाएगा
+    BROADCAST_LEASE_SECONDS = float(os.environ.get("BROADCAST_LEASE_SECONDS", 120))
+    BROADCAST_PROGRESS_INTERVAL_SECONDS = float(os.environ.get("BROADCAST_PROGRESS_INTERVAL_SECONDS", 5))
+    BROADCAST_POLL_INTERVAL_SECONDS = float(os.environ.get("BROADCAST_POLL_INTERVAL_SECONDS", 60))
+
+    # --- उपयोग विश्लेषण (/stats) ---
+    # इवेंट स्मृति में जोड़े जाते हैं और इस अंतराल पर रोलअप दस्तावेज़ों में एक bulk_write से लिखे जाते हैं
+    ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.environ.get("ANALYTICS_FLUSH_INTERVAL_SECONDS", 30))
+    # घंटेवार रोलअप कितने दिन रखें (दैनिक रोलअप हमेशा रहते हैं)
+    ANALYTICS_HOURLY_RETENTION_DAYS = int(os.environ.get("ANALYTICS_HOURLY_RETENTION_DAYS", 14))
+    # किसी डाउनलोड के बाद इतने या कम मुफ़्त/प्रीमियम डाउनलोड बचें तो "सीमा के करीब" गिना जाता है
+    ANALYTICS_NEAR_QUOTA_THRESHOLD = int(os.environ.get("ANALYTICS_NEAR_QUOTA_THRESHOLD", 1))
+
+    # --- डायरेक्ट लिंक रिज़ॉल्वर ---
+    # शेयर लिंक -> हस्ताक्षरित डायरेक्ट लिंक देने वाली HTTP सेवा (GET ?url=<शेयर लिंक>, JSON जवाब)।
+    # डाउनलोड के लिए ज़रूरी: Terabox शेयर लिंक एक HTML पेज है, फ़ाइल नहीं। खाली हो तो बॉट स्टार्टअप
+    # पर त्रुटि लॉग करता है और लिंक संदेशों पर कोई कोटा खर्च किए बिना बताता है कि डाउनलोड बंद हैं
+    RESOLVER_API_URL = os.environ.get("RESOLVER_API_URL", "")
+    RESOLVER_API_KEY = os.environ.get("RESOLVER_API_KEY", "")
+    RESOLVER_TIMEOUT_SECONDS = float(os.environ.get("RESOLVER_TIMEOUT_SECONDS", 20))
+    # सेवा दर-सीमित है: एक साथ अधिकतम इतने रिज़ॉल्व अनुरोध
+    RESOLVER_CONCURRENCY = int(os.environ.get("RESOLVER_CONCURRENCY", 4))
+    RESOLVER_CACHE_MAX_SIZE = int(os.environ.get("RESOLVER_CACHE_MAX_SIZE", 5000))
+    # जवाब में समाप्ति न हो तो लिंक इतने सेकंड मान्य माना जाता है
+    RESOLVER_DEFAULT_TTL_SECONDS = float(os.environ.get("RESOLVER_DEFAULT_TTL_SECONDS", 30 * 60))
+    # समाप्ति से इतना पहले कैश किया गया लिंक उपयोग नहीं होता (डाउनलोड शुरू होने का समय)
+    RESOLVER_MIN_VALIDITY_SECONDS = float(os.environ.get("RESOLVER_MIN_VALIDITY_SECONDS", 60))
+    # समाप्ति से इतना पहले कैश हिट पर पृष्ठभूमि में नया लिंक ले लिया जाता है
+    RESOLVER_REFRESH_AHEAD_SECONDS = float(os.environ.get("RESOLVER_REFRESH_AHEAD_SECONDS", 5 * 60))
+
+    # --- डाउनलोड प्रगति (स्टेटस संदेश) ---
+    # स्टेटस संदेश अधिकतम इस अंतराल पर संपादित होता है, और केवल तब जब प्रतिशत इतना बदला हो
+    PROGRESS_UPDATE_INTERVAL_SECONDS = float(os.environ.get("PROGRESS_UPDATE_INTERVAL_SECONDS", 3))
+    PROGRESS_MIN_STEP_PERCENT = float(os.environ.get("PROGRESS_MIN_STEP_PERCENT", 2))
@@ -1,22 +1,94 @@
+import asyncio
+import functools
 import logging
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, PyMongoError
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, DuplicateKeyError, PyMongoError
 from datetime import datetime, timedelta
 from config import Config
+from cache import LRUTTLCache
+import metrics
 
 logger = logging.getLogger(__name__)
 
 client = None
 db = None
 users_collection = None
+file_cache_collection = None
+user_states_collection = None
+scheduled_jobs_collection = None
+payments_collection = None
+broadcasts_collection = None
+analytics_collection = None
+
+# pymongo सिंक्रोनस है; सभी DB कॉल्स इस समर्पित थ्रेड पूल में चलती हैं ताकि
+# python-telegram-bot का इवेंट लूप Atlas राउंड ट्रिप के दौरान ब्लॉक न हो
+_executor = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=Config.MONGO_EXECUTOR_WORKERS,
+            thread_name_prefix="mongo"
+        )
+    return _executor
+
+def _operation_name(func) -> str:
+    # "users.find_one" जैसा नाम; कलेक्शन मेथड न हो तो फ़ंक्शन का नाम
+    collection = getattr(func, "__self__", None)
+    name = getattr(func, "__name__", "unknown")
+    return f"{collection.name}.{name}" if hasattr(collection, "name") else name
+
+async def _run(func, *args, retry: bool = True, op: str | None = None, **kwargs):
+    # func को थ्रेड पूल में चलाएं। retry=True केवल idempotent ऑपरेशन्स के लिए दें;
+    # $inc जैसे लेखन के लिए ड्राइवर की अपनी retryWrites पर्याप्त है
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    op = op or _operation_name(func)
+    attempts = Config.MONGO_OP_RETRIES + 1 if retry else 1
+    started = time.perf_counter()
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                return await loop.run_in_executor(_get_executor(), call)
+            except AutoReconnect as e: # NetworkTimeout और ServerSelectionTimeoutError भी शामिल हैं
+                if attempt >= attempts:
+                    raise
+                metrics.mongo_retries.labels(op).inc()
+                delay = Config.MONGO_OP_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+                logger.warning(f"MongoDB नेटवर्क त्रुटि (प्रयास {attempt}/{attempts}), {delay:.2f}s बाद पुनः प्रयास: {e}")
+                await asyncio.sleep(delay)
+    except Exception as e:
+        metrics.mongo_errors.labels(op, type(e).__name__).inc()
+        raise
+    finally:
+        metrics.mongo_duration.labels(op).observe(time.perf_counter() - started)
+
+async def _ensure_database():
+    if users_collection is None:
+        # आरंभिकरण भी ब्लॉकिंग है, इसलिए इसे भी थ्रेड पूल में चलाएं
+        await _run(initialize_database, retry=False)
 
 def initialize_database():
-    global client, db, users_collection
+    global client, db, users_collection, file_cache_collection, user_states_collection, scheduled_jobs_collection, payments_collection, broadcasts_collection, analytics_collection
     if not Config.MONGO_URI:
         raise ValueError("MONGO_URI कॉन्फिग में सेट नहीं है। कृपया इसे Koyeb पर्यावरण चर में सेट करें।")
 
     try:
-        client = MongoClient(Config.MONGO_URI)
+        client = MongoClient(
+            Config.MONGO_URI,
+            maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+            retryWrites=Config.MONGO_RETRY_WRITES,
+            retryReads=Config.MONGO_RETRY_READS,
+        )
         db = client[Config.MONGO_DB_NAME]
         users_collection = db["users"]
         logger.info("MongoDB से सफलतापूर्वक कनेक्ट किया गया।")
@@ -40,6 +112,59 @@ def initialize_database():
             )
             logger.info("premium_limit_exhausted_at के लिए TTL इंडेक्स बनाया गया।")
 
+        # Telegram file_id कैश: पुरानी प्रविष्टियाँ TTL से, अतिरिक्त प्रविष्टियाँ last_used_at (LRU) से हटती हैं
+        file_cache_collection = db["file_cache"]
+        file_cache_indexes = file_cache_collection.index_information()
+        if "file_cache_created_at_ttl" not in file_cache_indexes:
+            file_cache_collection.create_index(
+                "created_at",
+                expireAfterSeconds=Config.FILE_ID_CACHE_TTL_SECONDS,
+                name="file_cache_created_at_ttl"
+            )
+            logger.info("file_cache के लिए TTL इंडेक्स बनाया गया।")
+        if "file_cache_last_used_at" not in file_cache_indexes:
+            file_cache_collection.create_index("last_used_at", name="file_cache_last_used_at")
+        if "file_cache_content_hash" not in file_cache_indexes:
+            file_cache_collection.create_index("content_hash", name="file_cache_content_hash", sparse=True)
+
+        # साझा बातचीत स्थिति (STATE_STORE_BACKEND=mongo): expires_at पर पहुँचते ही TTL से हटती है
+        user_states_collection = db["user_states"]
+        user_states_indexes = user_states_collection.index_information()
+        if "user_states_expires_at_ttl" not in user_states_indexes:
+            user_states_collection.create_index("expires_at", expireAfterSeconds=0, name="user_states_expires_at_ttl")
+        if "user_states_updated_at" not in user_states_indexes:
+            user_states_collection.create_index("updated_at", name="user_states_updated_at")
+
+        # स्थायी विलंबित जॉब (फ़ाइल हटाने की सूचना, कोटा रिमाइंडर): पोलर due_at से देय जॉब लेता है
+        scheduled_jobs_collection = db["scheduled_jobs"]
+        if "scheduled_jobs_due_at" not in scheduled_jobs_collection.index_information():
+            scheduled_jobs_collection.create_index("due_at", name="scheduled_jobs_due_at")
+
+        # UTR भुगतान: utr पर अद्वितीय इंडेक्स से एक ही UTR दोबारा दर्ज नहीं हो सकता;
+        # डाइजेस्ट लंबित और अभी तक न भेजे गए भुगतान status/digested_at से खोजता है
+        payments_collection = db["payments"]
+        payments_indexes = payments_collection.index_information()
+        if "payments_utr_unique" not in payments_indexes:
+            payments_collection.create_index("utr", unique=True, name="payments_utr_unique")
+        if "payments_status_digested" not in payments_indexes:
+            payments_collection.create_index(
+                [("status", 1), ("digested_at", 1), ("submitted_at", 1)], name="payments_status_digested"
+            )
+
+        # प्रसारण: प्रगति (last_user_id चेकपॉइंट) यहीं रहती है ताकि रीस्टार्ट के बाद वहीं से आगे बढ़े
+        broadcasts_collection = db["broadcasts"]
+        if "broadcasts_status_created_at" not in broadcasts_collection.index_information():
+            broadcasts_collection.create_index([("status", 1), ("created_at", 1)], name="broadcasts_status_created_at")
+
+        # उपयोग विश्लेषण: प्रति घंटा/दिन एक रोलअप दस्तावेज़ ($inc upsert)। /stats केवल इन्हें
+        # (period, start) इंडेक्स से पढ़ता है; घंटेवार दस्तावेज़ expires_at पर TTL से हटते हैं
+        analytics_collection = db["analytics_rollups"]
+        analytics_indexes = analytics_collection.index_information()
+        if "analytics_period_start" not in analytics_indexes:
+            analytics_collection.create_index([("period", 1), ("start", 1)], name="analytics_period_start")
+        if "analytics_expires_at_ttl" not in analytics_indexes:
+            analytics_collection.create_index("expires_at", expireAfterSeconds=0, name="analytics_expires_at_ttl", sparse=True)
+
     except ConnectionFailure as e:
         logger.critical(f"MongoDB कनेक्शन विफल रहा: {e}")
         raise
@@ -50,11 +175,30 @@ def initialize_database():
         logger.critical(f"DB आरंभिकरण के दौरान अप्रत्याशित त्रुटि: {e}")
         raise
 
+# --- users दस्तावेज़ों का इन-प्रोसेस कैश ---
+# एक ही इंटरैक्शन में get_user_data कई बार बुलाया जाता है; लेखन पथ (reserve/refund/add_premium)
+# अपडेटेड दस्तावेज़ से कैश को ताज़ा करते हैं ताकि कोटा गणना कभी पुरानी न दिखे।
+user_cache = LRUTTLCache(
+    max_size=Config.USER_CACHE_MAX_SIZE,
+    ttl_seconds=Config.USER_CACHE_TTL_SECONDS,
+)
+
+def _cache_user(user_data: dict | None, user_id: int):
+    if user_data:
+        user_cache.set(user_id, user_data)
+    else:
+        user_cache.pop(user_id)
+
 async def get_user_data(user_id: int) -> dict:
-    if users_collection is None:
-        initialize_database() # सुनिश्चित करें कि DB आरंभ हो चुका है
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    await _ensure_database() # सुनिश्चित करें कि DB आरंभ हो चुका है
     
-    user_data = users_collection.find_one({"_id": user_id})
+    user_data = await _run(users_collection.find_one, {"_id": user_id})
+    if user_data:
+        user_cache.set(user_id, user_data)
     if not user_data:
         # यदि नहीं मिलता है तो एक नई उपयोगकर्ता प्रविष्टि बनाएं
         default_user_data = {
@@ -65,101 +209,763 @@ async def get_user_data(user_id: int) -> dict:
             # "instagram": {"free_count": 0, "premium_count": 0}, # हटा दिया गया
             "premium_limit_exhausted_at": None,
         }
-        users_collection.insert_one(default_user_data)
+        try:
+            await _run(users_collection.insert_one, default_user_data, retry=False)
+        except DuplicateKeyError:
+            # समानांतर अनुरोध ने इसी बीच दस्तावेज़ बना दिया
+            user_data = await _run(users_collection.find_one, {"_id": user_id})
+            _cache_user(user_data, user_id)
+            return user_data
+        user_cache.set(user_id, default_user_data)
         return default_user_data
     return user_data
 
+# --- last_activity के लिए write-behind बफ़र ---
+# last_activity केवल 18-दिन के TTL इंडेक्स के लिए है, इसलिए हर इवेंट पर लिखने की ज़रूरत नहीं।
+# प्रति उपयोगकर्ता केवल नवीनतम समय रखा जाता है और एक unordered bulk_write में फ़्लश होता है।
+
+# लगातार फ़्लश विफलताओं पर प्रतीक्षा flush_interval_seconds के अधिकतम इतने गुना तक बढ़ती है
+_FLUSH_MAX_BACKOFF_FACTOR = 16
+
+class ActivityBuffer:
+    def __init__(self, flush_interval_seconds: float, max_pending: int):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self._pending = {} # {user_id: datetime}
+        self._wakeup = None
+        self._task = None
+        self._flush_lock = None
+        self._stopped = False
+        # फ़्लश काउंटर
+        self.flushes = 0
+        self.flushed_users = 0
+        self.flush_errors = 0
+        self.last_flush_size = 0
+        self.max_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def record(self, user_id: int, when: datetime | None = None):
+        when = when or datetime.utcnow()
+        previous = self._pending.get(user_id)
+        if previous is None or when > previous:
+            self._pending[user_id] = when
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set() # आकार सीमा पूरी: तुरंत फ़्लश करें
+
+    def start(self):
+        if self._task is None and not self._stopped:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run_loop(), name="activity-buffer-flush")
+
+    async def _run_loop(self):
+        failures = 0
+        while True:
+            if failures:
+                # लगातार विफलता (जैसे Mongo बंद): आकार सीमा की wakeup अनदेखी करें और बढ़ते अंतराल तक रुकें,
+                # वरना भरा बफ़र हर विफलता के तुरंत बाद फिर फ़्लश करवाता रहेगा
+                await asyncio.sleep(self.flush_interval_seconds * min(2 ** (failures - 1), _FLUSH_MAX_BACKOFF_FACTOR))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                failures = 0
+            except Exception as e: # लूप को कभी न रुकने दें; अगला अंतराल फिर प्रयास करेगा
+                failures += 1
+                logger.error(f"last_activity बफ़र फ़्लश लूप में त्रुटि ({failures} लगातार): {e}")
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            await _ensure_database()
+            requests = [
+                # $max: पुराना/देरी से आया फ़्लश कभी नए समय को पीछे न करे
+                # blocked_at हटाएं: बॉट से फिर बात करने वाला उपयोगकर्ता अब ब्लॉक नहीं है (प्रसारण फिर मिलेंगे)
+                UpdateOne({"_id": user_id}, {"$max": {"last_activity": when}, "$unset": {"blocked_at": ""}}, upsert=True)
+                for user_id, when in batch.items()
+            ]
+            started = time.perf_counter()
+            try:
+                await _run(users_collection.bulk_write, requests, ordered=False)
+            except PyMongoError as e:
+                self.flush_errors += 1
+                # विफल बैच को सीधे वापस मर्ज करें (record() नहीं, ताकि आकार सीमा की wakeup न हो),
+                # बीच में आए नए समय को प्राथमिकता दें
+                for user_id, when in batch.items():
+                    previous = self._pending.get(user_id)
+                    if previous is None or when > previous:
+                        self._pending[user_id] = when
+                logger.error(f"{len(batch)} उपयोगकर्ताओं की last_activity फ़्लश करने में त्रुटि: {e}")
+                raise
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.flushed_users += len(batch)
+            self.last_flush_size = len(batch)
+            self.max_flush_size = max(self.max_flush_size, len(batch))
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self.total_flush_seconds += elapsed
+            logger.debug(f"{len(batch)} उपयोगकर्ताओं की last_activity {elapsed * 1000:.1f}ms में फ़्लश की गई।")
+            return len(batch)
+
+    async def stop(self):
+        # शटडाउन पर लूप रोकें और बचे हुए समय अंतिम बार फ़्लश करें
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except PyMongoError:
+            pass # त्रुटि पहले ही लॉग हो चुकी है
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_users": self.flushed_users,
+            "flush_errors": self.flush_errors,
+            "last_flush_size": self.last_flush_size,
+            "max_flush_size": self.max_flush_size,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "avg_flush_seconds": self.total_flush_seconds / self.flushes if self.flushes else 0.0,
+        }
+
+activity_buffer = ActivityBuffer(
+    flush_interval_seconds=Config.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+    max_pending=Config.ACTIVITY_FLUSH_MAX_PENDING,
+)
+
 async def update_user_activity(user_id: int):
-    if users_collection is None:
-        initialize_database()
-    
-    users_collection.update_one(
-        {"_id": user_id},
-        {"$set": {"last_activity": datetime.utcnow()}},
-        upsert=True # यदि दस्तावेज़ मौजूद नहीं है तो उसे बनाता है
+    # DB पर तुरंत नहीं लिखता; बफ़र अंतराल या आकार सीमा पर एक साथ फ़्लश करता है
+    activity_buffer.start()
+    activity_buffer.record(user_id)
+
+# --- कोटा: एक ही एटॉमिक राउंड ट्रिप में जांच + खपत ---
+
+@dataclass
+class QuotaReservation:
+    # डाउनलोड के दौरान रोका गया एक क्रेडिट। commit_download या refund_download से इसे निपटाएं।
+    user_id: int
+    platform: str
+    credit: str # "free" या "premium"
+    free_count: int
+    premium_count: int
+    state: str = "held" # held / committed / refunded
+
+    @property
+    def free_remaining(self) -> int:
+        return max(Config.FREE_LIMITS.get(self.platform, 0) - self.free_count, 0)
+
+    @property
+    def premium_remaining(self) -> int:
+        return max(self.premium_count, 0)
+
+def _quota_available_filter(user_id: int, platform: str) -> dict:
+    # केवल तभी मेल खाता है जब उपयोगकर्ता के पास मुफ़्त या प्रीमियम क्रेडिट बचा हो
+    limit = Config.FREE_LIMITS.get(platform, 0)
+    conditions = [{f"{platform}.premium_count": {"$gt": 0}}]
+    if limit > 0:
+        conditions.append({f"{platform}.free_count": {"$lt": limit}})
+        conditions.append({f"{platform}.free_count": {"$exists": False}}) # नया उपयोगकर्ता
+    return {"_id": user_id, "$or": conditions}
+
+def _consume_credit_pipeline(platform: str) -> list:
+    # पाइपलाइन अपडेट: पहले मुफ़्त क्रेडिट, फिर प्रीमियम; उसी लेखन में premium_limit_exhausted_at भी
+    limit = Config.FREE_LIMITS.get(platform, 0)
+    free = {"$ifNull": [f"${platform}.free_count", 0]}
+    premium = {"$ifNull": [f"${platform}.premium_count", 0]}
+    use_free = {"$eq": ["$_credit", "free"]}
+    return [
+        # पहले तय करें कि कौन-सा क्रेडिट खर्च होगा, ताकि अगले चरण पुराने मानों पर निर्भर न रहें
+        {"$set": {"_credit": {"$cond": [{"$lt": [free, limit]}, "free", "premium"]}}},
+        {"$set": {
+            f"{platform}.free_count": {"$cond": [use_free, {"$add": [free, 1]}, free]},
+            f"{platform}.premium_count": {"$cond": [use_free, premium, {"$subtract": [premium, 1]}]},
+            f"{platform}.last_credit": "$_credit",
+            "last_activity": {"$ifNull": ["$last_activity", "$$NOW"]}, # upsert किए गए नए उपयोगकर्ता के लिए TTL
+        }},
+        {"$set": {
+            "premium_limit_exhausted_at": {"$cond": [
+                {"$and": [
+                    {"$gte": [f"${platform}.free_count", limit]},
+                    {"$lte": [f"${platform}.premium_count", 0]},
+                ]},
+                "$$NOW",
+                None,
+            ]},
+        }},
+        {"$unset": "_credit"},
+    ]
+
+async def _consume_credit(user_id: int, platform: str, upsert: bool) -> dict | None:
+    # क्रेडिट बचा हो तो खर्च करके नया दस्तावेज़ लौटाता है, वरना None (upsert के बिना)
+    return await _run(
+        users_collection.find_one_and_update,
+        _quota_available_filter(user_id, platform),
+        _consume_credit_pipeline(platform),
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER,
+        retry=False
     )
 
-async def increment_user_downloads(user_id: int, platform: str):
-    if users_collection is None:
-        initialize_database()
-    
-    user_data = await get_user_data(user_id) # नवीनतम डेटा प्राप्त करें
-    
-    # पहले मुफ़्त सीमाएँ जांचें
-    current_free_count = user_data.get(platform, {}).get("free_count", 0)
-    current_premium_count = user_data.get(platform, {}).get("premium_count", 0)
-
-    update_fields = {}
-
-    if current_free_count < Config.FREE_LIMITS.get(platform, 0):
-        # मुफ़्त डाउनलोड का उपयोग करें
-        update_fields[f"{platform}.free_count"] = current_free_count + 1
-        logger.info(f"उपयोगकर्ता {user_id} ने {platform} मुफ़्त डाउनलोड का उपयोग किया। नई गणना: {current_free_count + 1}")
-    elif current_premium_count > 0:
-        # प्रीमियम डाउनलोड का उपयोग करें
-        update_fields[f"{platform}.premium_count"] = current_premium_count - 1
-        logger.info(f"उपयोगकर्ता {user_id} ने {platform} प्रीमियम डाउनलोड का उपयोग किया। शेष: {current_premium_count - 1}")
-    else:
-        # यह तब नहीं होना चाहिए जब इस फ़ंक्शन को कॉल करने से पहले सीमा जांच की जाती है
-        logger.warning(f"उपयोगकर्ता {user_id} के लिए प्लेटफ़ॉर्म {platform} पर इंक्रीमेंट को कॉल किया गया लेकिन कोई सीमा नहीं बची।")
-        return # यदि कोई सीमा नहीं है तो कोई बदलाव नहीं
+async def reserve_download(user_id: int, platform: str) -> QuotaReservation | None:
+    # कोटा जांचें और एक क्रेडिट एटॉमिक रूप से खर्च करें। कोई क्रेडिट न बचे तो None।
+    # एक ही उपयोगकर्ता के समानांतर अनुरोध कभी सीमा से अधिक खर्च नहीं कर सकते।
+    await _ensure_database()
 
-    # यदि इस डाउनलोड के बाद सभी सीमाएं समाप्त हो गई हैं तो premium_limit_exhausted_at सेट/रीसेट करें
-    # यह लॉजिक मानता है कि उपयोगकर्ता के डेटा को premium_limit_exhausted_at के आधार पर हटाने के लिए
-    # सभी प्लेटफ़ॉर्मों पर सभी प्रीमियम सीमाएँ समाप्त होनी चाहिए
-    updated_user_data = users_collection.find_one_and_update(
-        {"_id": user_id},
-        {"$set": update_fields},
-        return_document=True # अपडेटेड दस्तावेज़ लौटाएं
+    # नया उपयोगकर्ता पहले अनुरोध पर ही बन जाता है, पर केवल तब जब मुफ़्त सीमा हो: बिना सीमा के
+    # upsert प्रीमियम शाखा में जाकर premium_count -1 कर देता
+    upsert = Config.FREE_LIMITS.get(platform, 0) > 0
+    try:
+        updated_user_data = await _consume_credit(user_id, platform, upsert)
+    except DuplicateKeyError:
+        # $or फ़िल्टर पर सर्वर upsert दोबारा नहीं चलाता: दस्तावेज़ मौजूद है पर फ़िल्टर से मेल नहीं खाया,
+        # या समानांतर अनुरोध ने इसी बीच उसे बनाया। एक बार बिना upsert के फिर से प्रयास करें।
+        updated_user_data = await _consume_credit(user_id, platform, upsert=False)
+
+    if updated_user_data is None:
+        user_cache.pop(user_id) # कैश में क्रेडिट दिख रहा हो तो वह पुराना है
+        logger.info(f"उपयोगकर्ता {user_id} के पास {platform} पर कोई डाउनलोड सीमा नहीं बची।")
+        return None
+
+    _cache_user(updated_user_data, user_id)
+    platform_data = updated_user_data.get(platform, {})
+    reservation = QuotaReservation(
+        user_id=user_id,
+        platform=platform,
+        credit=platform_data.get("last_credit", "free"),
+        free_count=platform_data.get("free_count", 0),
+        premium_count=platform_data.get("premium_count", 0),
     )
-    
-    # जांचें कि क्या सभी मुफ़्त और सभी प्रीमियम सीमाएँ सभी प्लेटफ़ॉर्मों के लिए समाप्त हो गई हैं
-    all_limits_exhausted = True
-    # अब केवल 'terabox' को लूप में शामिल करें
-    if (updated_user_data.get("terabox", {}).get("free_count", 0) >= Config.FREE_LIMITS.get("terabox", 0) and
-        updated_user_data.get("terabox", {}).get("premium_count", 0) <= 0):
-        pass # Terabox सीमा समाप्त
-    else:
-        all_limits_exhausted = False # Terabox सीमा समाप्त नहीं हुई
-    
-    # पुराने लूप को हटा दिया गया था:
-    # for p in Config.FREE_LIMITS.keys():
-    #     p_free_count = updated_user_data.get(p, {}).get("free_count", 0)
-    #     p_premium_count = updated_user_data.get(p, {}).get("premium_count", 0)
-    #     if p_free_count < Config.FREE_LIMITS.get(p, 0) or p_premium_count > 0:
-    #         all_limits_exhausted = False
-    #         break
-
-    if all_limits_exhausted:
-        users_collection.update_one(
-            {"_id": user_id},
-            {"$set": {"premium_limit_exhausted_at": datetime.utcnow()}}
-        )
+    logger.info(
+        f"उपयोगकर्ता {user_id} के लिए {platform} {reservation.credit} क्रेडिट आरक्षित किया गया। "
+        f"मुफ़्त गणना: {reservation.free_count}, प्रीमियम शेष: {reservation.premium_count}"
+    )
+    if updated_user_data.get("premium_limit_exhausted_at"):
         logger.info(f"उपयोगकर्ता {user_id} ने सभी मुफ़्त और प्रीमियम सीमाएँ समाप्त कर दी हैं। हटाने के लिए चिह्नित किया गया।")
-    else:
-        # यदि उनके पास अभी भी प्रीमियम है, तो सुनिश्चित करें कि exhausted_at शून्य है
-        users_collection.update_one(
-            {"_id": user_id},
-            {"$set": {"premium_limit_exhausted_at": None}}
-        )
+    return reservation
+
+async def commit_download(reservation: QuotaReservation) -> QuotaReservation:
+    # क्रेडिट reserve_download में ही खर्च हो चुका है; commit केवल इसे अंतिम बनाता है (कोई DB कॉल नहीं)
+    if reservation.state == "held":
+        reservation.state = "committed"
+    return reservation
+
+async def refund_download(reservation: QuotaReservation) -> QuotaReservation:
+    # आरक्षित क्रेडिट वापस करें (जैसे Telegram पर भेजना विफल होने पर)
+    if reservation.state != "held":
+        return reservation
+    await _ensure_database()
+
+    field = f"{reservation.platform}.{reservation.credit}_count"
+    delta = -1 if reservation.credit == "free" else 1
+    updated_user_data = await _run(
+        users_collection.find_one_and_update,
+        {"_id": reservation.user_id},
+        {"$inc": {field: delta},
+         "$set": {"premium_limit_exhausted_at": None}}, # अब कम से कम एक क्रेडिट उपलब्ध है
+        return_document=ReturnDocument.AFTER,
+        retry=False
+    )
+    reservation.state = "refunded"
+    _cache_user(updated_user_data, reservation.user_id)
+    if updated_user_data:
+        platform_data = updated_user_data.get(reservation.platform, {})
+        reservation.free_count = platform_data.get("free_count", 0)
+        reservation.premium_count = platform_data.get("premium_count", 0)
+    logger.info(f"उपयोगकर्ता {reservation.user_id} का {reservation.platform} {reservation.credit} क्रेडिट वापस किया गया।")
+    return reservation
+
+async def increment_user_downloads(user_id: int, platform: str) -> QuotaReservation | None:
+    # एक राउंड ट्रिप में क्रेडिट खर्च करें और नई गणनाएँ लौटाएं (कोई सीमा न बचे तो None)
+    reservation = await reserve_download(user_id, platform)
+    if reservation is None:
+        logger.warning(f"उपयोगकर्ता {user_id} के लिए प्लेटफ़ॉर्म {platform} पर इंक्रीमेंट को कॉल किया गया लेकिन कोई सीमा नहीं बची।")
+        return None
+    return await commit_download(reservation)
 
 
 async def add_premium_downloads(user_id: int, platform: str, count: int):
-    if users_collection is None:
-        initialize_database()
+    await _ensure_database()
     
-    users_collection.update_one(
+    updated_user_data = await _run(
+        users_collection.find_one_and_update,
         {"_id": user_id},
         {"$inc": {f"{platform}.premium_count": count},
          "$set": {"premium_limit_exhausted_at": None}}, # समाप्त स्थिति रीसेट करें
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER, # कैश को नई गणना से ताज़ा करें
+        retry=False
     )
+    _cache_user(updated_user_data, user_id)
     logger.info(f"उपयोगकर्ता {user_id} के लिए {platform} पर {count} प्रीमियम डाउनलोड जोड़े गए।")
 
+async def add_premium_downloads_bulk(grants: list[tuple[int, str, int]]) -> tuple[dict, dict]:
+    # कई उपयोगकर्ताओं को एक साथ प्रीमियम: एक bulk_write और नई गणना के लिए एक find।
+    # लौटाता है ({grants में index: नया premium_count}, {index: त्रुटि}); ordered=False के कारण
+    # एक विफल लेखन बाकी को नहीं रोकता
+    await _ensure_database()
+    if not grants:
+        return {}, {}
+    requests = [
+        UpdateOne(
+            {"_id": user_id},
+            {"$inc": {f"{platform}.premium_count": count},
+             "$set": {"premium_limit_exhausted_at": None}},
+            upsert=True
+        )
+        for user_id, platform, count in grants
+    ]
+    failed = {}
+    try:
+        await _run(users_collection.bulk_write, requests, ordered=False, retry=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "लेखन विफल") for error in e.details.get("writeErrors", [])}
+    user_ids = list({user_id for user_id, _, _ in grants})
+    documents = await _run(lambda: list(users_collection.find({"_id": {"$in": user_ids}})), op="users.find_many")
+    by_id = {doc["_id"]: doc for doc in documents}
+    for user_id in user_ids:
+        _cache_user(by_id.get(user_id), user_id)
+    logger.info(f"{len(user_ids)} उपयोगकर्ताओं के लिए {len(grants) - len(failed)} प्रीमियम अनुदान एक साथ लागू किए गए।")
+    counts = {
+        index: by_id.get(user_id, {}).get(platform, {}).get("premium_count", 0)
+        for index, (user_id, platform, _) in enumerate(grants)
+        if index not in failed
+    }
+    return counts, failed
+
 async def get_platform_premium_limit(user_id: int, platform: str) -> int:
-    if users_collection is None:
-        initialize_database()
+    await _ensure_database()
     
     user_data = await get_user_data(user_id)
     return user_data.get(platform, {}).get("premium_count", 0)
 
+# --- Telegram file_id कैश ---
+# लोकप्रिय लिंक के लिए पहले सफल अपलोड का file_id सहेजा जाता है; बाद के अनुरोधों पर
+# बिना डाउनलोड/अपलोड के वही file_id दोबारा भेजा जाता है। कुंजी: सामान्यीकृत शेयर ID,
+# साथ में content_hash ताकि अलग लिंक पर वही सामग्री भी पहचानी जा सके।
+file_cache_stats = {"hits": 0, "hash_hits": 0, "misses": 0, "stores": 0, "trimmed": 0}
+
+def file_cache_hit_rate() -> float:
+    lookups = file_cache_stats["hits"] + file_cache_stats["misses"]
+    return file_cache_stats["hits"] / lookups if lookups else 0.0
+
+async def get_cached_file(share_key: str) -> dict | None:
+    # एक ही राउंड ट्रिप में खोजें और last_used_at (LRU) ताज़ा करें
+    await _ensure_database()
+    entry = await _run(
+        file_cache_collection.find_one_and_update,
+        {"_id": share_key},
+        {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"hits": 1}},
+        return_document=ReturnDocument.AFTER,
+        retry=False
+    )
+    if entry:
+        file_cache_stats["hits"] += 1
+    else:
+        file_cache_stats["misses"] += 1
+    return entry
+
+async def get_cached_file_by_hash(content_hash: str) -> dict | None:
+    await _ensure_database()
+    entry = await _run(file_cache_collection.find_one, {"content_hash": content_hash})
+    if entry:
+        file_cache_stats["hash_hits"] += 1
+    return entry
+
+async def save_cached_file(share_key: str, content_hash: str | None, file_id: str, media_type: str, file_name: str):
+    await _ensure_database()
+    now = datetime.utcnow()
+    await _run(
+        file_cache_collection.update_one,
+        {"_id": share_key},
+        {"$set": {
+            "content_hash": content_hash,
+            "file_id": file_id,
+            "media_type": media_type,
+            "file_name": file_name,
+            "last_used_at": now,
+        },
+         "$setOnInsert": {"created_at": now, "hits": 0}},
+        upsert=True
+    )
+    file_cache_stats["stores"] += 1
+    await _trim_file_cache()
+
+async def delete_cached_file(share_key: str):
+    # file_id अमान्य हो गया हो (जैसे Telegram ने अस्वीकार किया) तो प्रविष्टि हटाएं
+    await _ensure_database()
+    await _run(file_cache_collection.delete_one, {"_id": share_key})
+
+async def _trim_file_cache():
+    # आकार सीमा से अधिक प्रविष्टियाँ हों तो सबसे कम हाल में उपयोग की गई हटाएं
+    excess = await _run(file_cache_collection.estimated_document_count) - Config.FILE_ID_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    oldest = await _run(
+        lambda: [doc["_id"] for doc in file_cache_collection.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)],
+        op="file_cache.find_oldest",
+    )
+    if oldest:
+        result = await _run(file_cache_collection.delete_many, {"_id": {"$in": oldest}})
+        file_cache_stats["trimmed"] += result.deleted_count
+        logger.info(f"file_id कैश से {result.deleted_count} पुरानी प्रविष्टियाँ हटाई गईं।")
+
+# --- बातचीत स्थिति (Mongo बैकएंड) ---
+# TTL इंडेक्स देर से चलता है, इसलिए पढ़ते समय भी expires_at जाँचा जाता है
+
+async def get_user_state(user_id: int) -> str | None:
+    await _ensure_database()
+    doc = await _run(
+        user_states_collection.find_one,
+        {"_id": user_id, "expires_at": {"$gt": datetime.utcnow()}},
+        {"state": 1}
+    )
+    return doc["state"] if doc else None
+
+async def set_user_state(user_id: int, state: str, ttl_seconds: float):
+    await _ensure_database()
+    now = datetime.utcnow()
+    await _run(
+        user_states_collection.update_one,
+        {"_id": user_id},
+        {"$set": {"state": state, "updated_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+        upsert=True
+    )
+
+async def delete_user_state(user_id: int) -> str | None:
+    await _ensure_database()
+    doc = await _run(user_states_collection.find_one_and_delete, {"_id": user_id}, projection={"state": 1})
+    return doc["state"] if doc else None
+
+async def count_user_states() -> dict:
+    await _ensure_database()
+    rows = await _run(lambda: list(user_states_collection.aggregate([
+        {"$match": {"expires_at": {"$gt": datetime.utcnow()}}},
+        {"$group": {"_id": "$state", "count": {"$sum": 1}}},
+    ])), op="user_states.aggregate")
+    return {row["_id"]: row["count"] for row in rows}
+
+async def trim_user_states(max_entries: int) -> int:
+    # आकार सीमा से अधिक हों तो सबसे पहले अपडेट हुई स्थितियाँ हटाएं (LRU)
+    await _ensure_database()
+    excess = await _run(user_states_collection.estimated_document_count) - max_entries
+    if excess <= 0:
+        return 0
+    oldest = await _run(
+        lambda: [doc["_id"] for doc in user_states_collection.find({}, {"_id": 1}).sort("updated_at", 1).limit(excess)],
+        op="user_states.find_oldest",
+    )
+    result = await _run(user_states_collection.delete_many, {"_id": {"$in": oldest}})
+    return result.deleted_count
+
+# --- स्थायी विलंबित जॉब ---
+# lease_until भविष्य में हो तो जॉब किसी पोलर के पास है; लीज़ समाप्त होने पर (जैसे प्रक्रिया क्रैश)
+# वह फिर से लेने योग्य हो जाता है। host वाले जॉब (स्थानीय फ़ाइल) पहले उसी होस्ट को मिलते हैं।
+_NO_LEASE = datetime(1970, 1, 1)
+
+async def schedule_job(kind: str, due_at: datetime, payload: dict, *, job_id: str | None = None, host: str | None = None):
+    await _ensure_database()
+    doc = {
+        "kind": kind,
+        "due_at": due_at,
+        "payload": payload,
+        "host": host,
+        "lease_until": _NO_LEASE,
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+    }
+    if job_id is None:
+        await _run(scheduled_jobs_collection.insert_one, doc, retry=False)
+    else:
+        # स्थिर job_id: दोबारा शेड्यूल करने पर पुराना जॉब बदल जाता है (idempotent)
+        await _run(scheduled_jobs_collection.replace_one, {"_id": job_id}, doc, upsert=True)
+
+async def cancel_job(job_id: str) -> bool:
+    await _ensure_database()
+    result = await _run(scheduled_jobs_collection.delete_one, {"_id": job_id})
+    return result.deleted_count > 0
+
+async def cancel_jobs(job_ids: list[str]) -> int:
+    await _ensure_database()
+    result = await _run(scheduled_jobs_collection.delete_many, {"_id": {"$in": job_ids}})
+    return result.deleted_count
+
+async def claim_due_jobs(owner: str, host: str, limit: int, lease_seconds: float,
+                         foreign_grace_seconds: float) -> tuple[str, list[dict]]:
+    # देय जॉब्स का एक बैच लीज़ पर लें। update_many का फ़िल्टर हर दस्तावेज़ पर एटॉमिक है, इसलिए
+    # दो रेप्लिका एक ही जॉब नहीं ले सकतीं; जो जॉब इस lease_token के साथ मिले वही हमारे हैं।
+    await _ensure_database()
+    now = datetime.utcnow()
+    claimable = {
+        "due_at": {"$lte": now},
+        "lease_until": {"$lte": now},
+        "$or": [
+            {"host": None},
+            {"host": host},
+            {"due_at": {"$lte": now - timedelta(seconds=foreign_grace_seconds)}}, # होस्ट शायद अब मौजूद नहीं
+        ],
+    }
+    candidate_ids = await _run(
+        lambda: [doc["_id"] for doc in scheduled_jobs_collection.find(claimable, {"_id": 1}).sort("due_at", 1).limit(limit)],
+        op="scheduled_jobs.find_due",
+    )
+    if not candidate_ids:
+        return "", []
+    token = uuid.uuid4().hex
+    await _run(
+        scheduled_jobs_collection.update_many,
+        dict(claimable, _id={"$in": candidate_ids}),
+        {
+            "$set": {"lease_until": now + timedelta(seconds=lease_seconds), "lease_owner": owner, "lease_token": token},
+            "$inc": {"attempts": 1},
+        },
+        retry=False,
+    )
+    jobs = await _run(
+        lambda: list(scheduled_jobs_collection.find({"_id": {"$in": candidate_ids}, "lease_token": token})),
+        op="scheduled_jobs.find_claimed",
+    )
+    return token, jobs
+
+async def complete_jobs(job_ids: list, token: str) -> int:
+    await _ensure_database()
+    result = await _run(scheduled_jobs_collection.delete_many, {"_id": {"$in": job_ids}, "lease_token": token})
+    return result.deleted_count
+
+async def retry_job(job_id, token: str, retry_at: datetime, error: str):
+    await _ensure_database()
+    await _run(
+        scheduled_jobs_collection.update_one,
+        {"_id": job_id, "lease_token": token},
+        {"$set": {"due_at": retry_at, "lease_until": _NO_LEASE, "last_error": error[:500]}},
+    )
+
+# --- UTR भुगतान ---
+# status: pending -> approved/rejected। digested_at: किस समय भुगतान एडमिन डाइजेस्ट में गया
+# (None = अभी भेजना बाकी)। digest_lease_until: डाइजेस्ट भेज रही रेप्लिका का अस्थायी दावा।
+
+async def submit_payment(user_id: int, utr: str) -> tuple[bool, dict]:
+    # idempotent: (True, नया भुगतान) या (False, उसी UTR का पहले से मौजूद भुगतान)
+    await _ensure_database()
+    doc = {
+        "utr": utr,
+        "user_id": user_id,
+        "status": "pending",
+        "submitted_at": datetime.utcnow(),
+        "digested_at": None,
+        "digest_lease_until": _NO_LEASE,
+    }
+    try:
+        await _run(payments_collection.insert_one, doc, retry=False)
+        return True, doc
+    except DuplicateKeyError:
+        existing = await _run(payments_collection.find_one, {"utr": utr})
+        return False, existing or doc
+
+async def claim_undigested_payments(limit: int, lease_seconds: float) -> tuple[str, list[dict]]:
+    # claim_due_jobs जैसा: एक ही भुगतान दो रेप्लिका के डाइजेस्ट में नहीं जाता
+    await _ensure_database()
+    now = datetime.utcnow()
+    claimable = {"status": "pending", "digested_at": None, "digest_lease_until": {"$lte": now}}
+    candidate_ids = await _run(
+        lambda: [doc["_id"] for doc in payments_collection.find(claimable, {"_id": 1}).sort("submitted_at", 1).limit(limit)],
+        op="payments.find_undigested",
+    )
+    if not candidate_ids:
+        return "", []
+    token = uuid.uuid4().hex
+    await _run(
+        payments_collection.update_many,
+        dict(claimable, _id={"$in": candidate_ids}),
+        {"$set": {"digest_lease_until": now + timedelta(seconds=lease_seconds), "digest_token": token}},
+        retry=False,
+    )
+    payments = await _run(
+        lambda: list(payments_collection.find({"_id": {"$in": candidate_ids}, "digest_token": token}).sort("submitted_at", 1)),
+        op="payments.find_claimed",
+    )
+    return token, payments
+
+async def mark_payments_digested(payment_ids: list, token: str) -> int:
+    await _ensure_database()
+    result = await _run(
+        payments_collection.update_many,
+        {"_id": {"$in": payment_ids}, "digest_token": token},
+        {"$set": {"digested_at": datetime.utcnow()}},
+    )
+    return result.modified_count
+
+async def count_pending_payments() -> int:
+    await _ensure_database()
+    return await _run(payments_collection.count_documents, {"status": "pending"})
+
+async def resolve_payment(utr: str, status: str, admin_id: int, count: int = 0) -> dict | None:
+    # केवल लंबित भुगतान बदलता है, इसलिए दो बार दबाया गया बटन दूसरी बार None लौटाता है
+    await _ensure_database()
+    return await _run(
+        payments_collection.find_one_and_update,
+        {"utr": utr, "status": "pending"},
+        {"$set": {"status": status, "resolved_by": admin_id, "resolved_at": datetime.utcnow(), "premium_count": count}},
+        return_document=ReturnDocument.AFTER,
+        retry=False,
+    )
+
+async def reopen_payment(utr: str):
+    # अनुमोदन के बाद प्रीमियम जोड़ना विफल हो तो भुगतान फिर से लंबित करें
+    await _ensure_database()
+    await _run(
+        payments_collection.update_one,
+        {"utr": utr},
+        {"$set": {"status": "pending"}, "$unset": {"resolved_by": "", "resolved_at": "", "premium_count": ""}},
+    )
+
+# --- प्रसारण ---
+# उपयोगकर्ता _id क्रम में पन्नों में पढ़े जाते हैं (केवल _id प्रोजेक्शन); हर पन्ने के बाद अंतिम _id
+# चेकपॉइंट होता है। blocked_at वाले उपयोगकर्ता (बॉट ब्लॉक/खाता हटाया) छोड़े जाते हैं।
+
+async def create_broadcast(doc: dict):
+    await _ensure_database()
+    doc = dict(doc, status="running", created_at=datetime.utcnow(), last_user_id=None,
+               sent=0, blocked=0, failed=0, lease_until=_NO_LEASE)
+    result = await _run(broadcasts_collection.insert_one, doc, retry=False)
+    return result.inserted_id
+
+async def claim_broadcast(owner: str, lease_seconds: float) -> dict | None:
+    # सबसे पुराना चालू प्रसारण जिसकी लीज़ खाली/समाप्त है (रीस्टार्ट के बाद फिर से शुरू करने के लिए भी)
+    await _ensure_database()
+    now = datetime.utcnow()
+    return await _run(
+        broadcasts_collection.find_one_and_update,
+        {"status": "running", "lease_until": {"$lte": now}},
+        {"$set": {"lease_until": now + timedelta(seconds=lease_seconds), "lease_owner": owner}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+        retry=False,
+    )
+
+async def checkpoint_broadcast(broadcast_id, owner: str, last_user_id, sent: int, blocked: int, failed: int,
+                               lease_seconds: float) -> dict | None:
+    # प्रगति सहेजें और लीज़ बढ़ाएं। None = लीज़ किसी और के पास चली गई (यह रनर रुक जाए)
+    await _ensure_database()
+    return await _run(
+        broadcasts_collection.find_one_and_update,
+        {"_id": broadcast_id, "lease_owner": owner},
+        {
+            "$set": {"last_user_id": last_user_id, "lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            "$inc": {"sent": sent, "blocked": blocked, "failed": failed},
+        },
+        return_document=ReturnDocument.AFTER,
+        retry=False,
+    )
+
+async def finish_broadcast(broadcast_id, owner: str, status: str):
+    await _ensure_database()
+    await _run(
+        broadcasts_collection.update_one,
+        {"_id": broadcast_id, "lease_owner": owner, "status": "running"},
+        {"$set": {"status": status, "finished_at": datetime.utcnow(), "lease_until": _NO_LEASE}},
+    )
+
+async def release_broadcasts(owner: str):
+    # शटडाउन पर: अगली प्रक्रिया लीज़ समाप्त होने की प्रतीक्षा किए बिना तुरंत आगे बढ़ सके
+    await _ensure_database()
+    await _run(
+        broadcasts_collection.update_many,
+        {"lease_owner": owner, "status": "running"},
+        {"$set": {"lease_until": _NO_LEASE}},
+    )
+
+async def cancel_broadcasts() -> int:
+    # चल रहा रनर अगले चेकपॉइंट पर status देखकर रुक जाता है
+    await _ensure_database()
+    result = await _run(
+        broadcasts_collection.update_many,
+        {"status": "running"},
+        {"$set": {"status": "cancelled", "finished_at": datetime.utcnow()}},
+    )
+    return result.modified_count
+
+async def fetch_broadcast_recipients(after_user_id, limit: int) -> list[int]:
+    await _ensure_database()
+    query = {"blocked_at": None}
+    if after_user_id is not None:
+        query["_id"] = {"$gt": after_user_id}
+    return await _run(
+        lambda: [doc["_id"] for doc in users_collection.find(query, {"_id": 1}).sort("_id", 1).limit(limit).batch_size(limit)],
+        op="users.find_recipients",
+    )
+
+async def count_broadcast_recipients() -> int:
+    await _ensure_database()
+    return await _run(users_collection.count_documents, {"blocked_at": None})
+
+async def mark_users_blocked(user_ids: list[int]) -> int:
+    await _ensure_database()
+    result = await _run(
+        users_collection.update_many,
+        {"_id": {"$in": user_ids}},
+        {"$set": {"blocked_at": datetime.utcnow()}},
+    )
+    for user_id in user_ids:
+        user_cache.pop(user_id)
+    return result.modified_count
+
+# --- उपयोग विश्लेषण रोलअप ---
+
+def _rollup_id(period: str, start: datetime) -> str:
+    return f"{period}:{start.strftime('%Y-%m-%dT%H' if period == 'hour' else '%Y-%m-%d')}"
+
+async def apply_rollup_increments(increments: dict) -> int:
+    # increments: {(period, start): {field: n}} -> हर रोलअप दस्तावेज़ पर एक $inc upsert, सब एक bulk_write में
+    await _ensure_database()
+    if not increments:
+        return 0
+    requests = []
+    for (period, start), fields in increments.items():
+        on_insert = {"period": period, "start": start}
+        if period == "hour":
+            on_insert["expires_at"] = start + timedelta(days=Config.ANALYTICS_HOURLY_RETENTION_DAYS)
+        requests.append(UpdateOne(
+            {"_id": _rollup_id(period, start)},
+            {"$inc": {f"counts.{field}": value for field, value in fields.items()}, "$setOnInsert": on_insert},
+            upsert=True,
+        ))
+    await _run(analytics_collection.bulk_write, requests, ordered=False, retry=False)
+    return len(requests)
+
+async def get_rollups(period: str, since: datetime) -> list[dict]:
+    await _ensure_database()
+    return await _run(
+        lambda: list(analytics_collection.find({"period": period, "start": {"$gte": since}}, {"start": 1, "counts": 1}).sort("start", 1)),
+        op="analytics_rollups.find",
+    )
+
+def close_database():
+    # शटडाउन पर थ्रेड पूल और कनेक्शन पूल बंद करें
+    global client, db, users_collection, file_cache_collection, user_states_collection, scheduled_jobs_collection, payments_collection, broadcasts_collection, analytics_collection, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if client is not None:
+        client.close()
+        logger.info("MongoDB कनेक्शन बंद किया गया।")
+    client = db = users_collection = file_cache_collection = user_states_collection = scheduled_jobs_collection = payments_collection = broadcasts_collection = analytics_collection = None
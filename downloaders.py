@@ -1,53 +1,517 @@
+import asyncio
+import hashlib
+import itertools
+import json
 import logging
 import os
-import time # time मॉड्यूल इम्पोर्ट किया गया, जो आपके टेराबॉक्स डमी में उपयोग हो रहा था
-import requests # भविष्य में वास्तविक टेराबॉक्स डाउनलोड के लिए आवश्यक हो सकता है
-import re # भविष्य में टेराबॉक्स लिंक पार्सिंग के लिए आवश्यक हो सकता है
+import random
+import time # फ़ाइल नामों और थ्रूपुट माप के लिए
+import re # टेराबॉक्स लिंक पार्सिंग के लिए
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+
+from config import Config
+import metrics
+from resolver import ResolveError, link_resolver
+from spool import CHECKPOINT_SUFFIX, PARTIAL_SUFFIX, SpoolManager, SpoolFullError, download_spool
 
 logger = logging.getLogger(__name__)
 
 # डाउनलोड की गई फ़ाइलों को अस्थायी रूप से सहेजने के लिए निर्देशिका
-DOWNLOAD_DIR = "downloads"
+DOWNLOAD_DIR = Config.DOWNLOAD_DIR
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
-# --- Terabox Downloader ---
-async def download_terabox(url: str) -> str | None:
-    # Terabox डाउनलोडिंग अत्यधिक गतिशील और परिवर्तनों के अधीन है।
-    # यहाँ असली Terabox डायरेक्ट लिंक एक्सट्रैक्शन लॉजिक की आवश्यकता है।
-    # प्रदर्शन के लिए एक डमी फ़ाइल का उपयोग किया गया है। वास्तविक डाउनलोड लॉजिक से बदलें।
-    # वास्तविक Terabox के लिए, एक विश्वसनीय API या मजबूत लाइब्रेरी का उपयोग करने पर विचार करें।
-    # ध्यान दें: यह फ़ंक्शन अभी भी एक डमी फ़ाइल बनाता है।
-    # आपको इसे एक वास्तविक Terabox डाउनलोड समाधान से बदलना होगा।
 
+class DownloadError(Exception):
+    pass
+
+
+class DownloadTooLargeError(DownloadError):
+    pass
+
+
+class TransientDownloadError(DownloadError):
+    # 5xx/429 या बीच में टूटी स्ट्रीम: पुनः प्रयास योग्य
+    pass
+
+
+_RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, TransientDownloadError)
+
+
+@dataclass
+class DownloadStats:
+    bytes_downloaded: int
+    total_bytes: int | None
+    seconds: float
+    segments: int
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_downloaded / self.seconds if self.seconds > 0 else 0.0
+
+
+# सेगमेंट संख्या ट्यून करने के लिए संचयी थ्रूपुट आँकड़े
+throughput_stats = {"downloads": 0, "bytes": 0, "seconds": 0.0, "segments": 0, "retries": 0, "resumed_bytes": 0}
+
+
+# --- लिंक सामान्यीकरण और सामग्री हैश (file_id कैश की कुंजियाँ) ---
+
+# Terabox के ज्ञात मिरर डोमेन; किसी भी उप-डोमेन (www., m. आदि) के साथ मान्य
+TERABOX_DOMAINS = (
+    "terabox.com", "terabox.app", "terabox.fun", "teraboxapp.com", "1024tera.com", "1024terabox.com",
+    "4funbox.com", "mirrobox.com", "nephobox.com", "freeterabox.com", "momerybox.com", "tibibox.com",
+    "teraboxlink.com", "terasharelink.com", "teraboxshare.com", "terafileshare.com", "gibibox.com",
+)
+# सभी मिरर शेयर को एक ही रूप में डाउनलोड करते हैं
+CANONICAL_SHARE_URL = "https://www.terabox.com/s/1{}"
+
+# संदेश में कहीं भी मिरर डोमेन वाला लिंक (स्कीम वैकल्पिक); समूह 1: होस्ट के बाद का पथ और क्वेरी
+_TERABOX_LINK_RE = re.compile(
+    r"(?<![\w.-])(?:https?://)?(?:[a-z0-9-]+\.)*(?:"
+    + "|".join(re.escape(domain) for domain in TERABOX_DOMAINS)
+    + r")(?![\w-])(?::\d+)?(/[^\s<>\"']*)?",
+    re.IGNORECASE,
+)
+# Terabox शेयर लिंक: .../s/1<id> या ...?surl=<id> (surl में आगे का "1" नहीं होता)
+_SHARE_PATH_RE = re.compile(r"/s/1([A-Za-z0-9_-]{5,64})(?![A-Za-z0-9_-])")
+_SHARE_QUERY_RE = re.compile(r"[?&]surl=([A-Za-z0-9_-]{5,64})(?![A-Za-z0-9_-])")
+
+
+@dataclass(frozen=True)
+class ShareLink:
+    share_id: str
+
+    @property
+    def key(self) -> str:
+        # file_id कैश और resume_key की कुंजी, normalize_share_id जैसी
+        return f"terabox:{self.share_id}"
+
+    @property
+    def url(self) -> str:
+        return CANONICAL_SHARE_URL.format(self.share_id)
+
+
+def _share_id_from_path(path: str) -> str | None:
+    match = _SHARE_PATH_RE.search(path) or _SHARE_QUERY_RE.search(path)
+    return match.group(1) if match else None
+
+def extract_share_links(text: str) -> list[ShareLink]:
+    # संदेश से सभी Terabox शेयर लिंक, क्रम में और दोहराव के बिना (ट्रैकिंग पैरामीटर अनदेखे)।
+    # केवल पहले से संकलित पैटर्न; कोई नेटवर्क या DB कॉल नहीं
+    links = {}
+    for match in _TERABOX_LINK_RE.finditer(text):
+        share_id = _share_id_from_path(match.group(1) or "")
+        if share_id:
+            links.setdefault(share_id, ShareLink(share_id))
+    return list(links.values())
+
+def normalize_share_id(url: str) -> str:
+    # एक ही शेयर के अलग-अलग रूपों को एक कैश कुंजी में बदलें
+    url = url.strip()
+    share_id = _share_id_from_path(url)
+    if share_id:
+        return f"terabox:{share_id}"
+    parsed = urlparse(url)
+    return f"url:{parsed.netloc.lower()}{parsed.path}"
+
+_FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+def content_fingerprint(file_path: str) -> str:
+    # आकार + पहले और अंतिम 1 MiB का SHA-256: बड़ी फ़ाइलों को पूरा पढ़े बिना सामग्री पहचान।
+    # ब्लॉकिंग है; asyncio.to_thread से बुलाएं।
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(file_path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_SAMPLE_BYTES))
+        if size > _FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(size - _FINGERPRINT_SAMPLE_BYTES, _FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read(_FINGERPRINT_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+# --- एसिंक स्ट्रीमिंग, मल्टी-कनेक्शन डाउनलोड इंजन ---
+
+def _new_session(connections: int) -> aiohttp.ClientSession:
+    timeout = aiohttp.ClientTimeout(
+        total=None, # बड़ी फ़ाइलों के लिए कुल सीमा नहीं, केवल कनेक्ट/रीड टाइमआउट
+        sock_connect=Config.DOWNLOAD_CONNECT_TIMEOUT_SECONDS,
+        sock_read=Config.DOWNLOAD_READ_TIMEOUT_SECONDS,
+    )
+    return aiohttp.ClientSession(
+        timeout=timeout,
+        connector=aiohttp.TCPConnector(limit=max(connections, 1)),
+        auto_decompress=False, # बाइट्स जैसे हैं वैसे लिखें; Range ऑफ़सेट कच्चे बाइट्स पर होते हैं
+    )
+
+def _raise_for_status(response: aiohttp.ClientResponse, expected: tuple, what: str):
+    if response.status in expected:
+        return
+    if response.status >= 500 or response.status == 429:
+        raise TransientDownloadError(f"{what}: सर्वर ने स्थिति {response.status} लौटाई")
+    raise DownloadError(f"{what}: सर्वर ने स्थिति {response.status} लौटाई")
+
+async def _probe(session: aiohttp.ClientSession, url: str) -> tuple[int | None, bool, str | None, str | None]:
+    # Range: bytes=0-0 से आकार और Range समर्थन पता करें (कई साइन किए गए लिंक HEAD को सही नहीं संभालते)।
+    # validator (ETag/Last-Modified) से पता चलता है कि अधूरी फ़ाइल अब भी उसी सामग्री की है।
+    async with session.get(url, headers={"Range": "bytes=0-0"}, allow_redirects=True) as response:
+        _raise_for_status(response, (200, 206), "जाँच")
+        content_type = response.headers.get("Content-Type", "")
+        if content_type.startswith("text/html"):
+            raise DownloadError("लिंक एक वेबपेज है, सीधी फ़ाइल नहीं")
+        file_name = _file_name_from_response(response)
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        if response.status == 206:
+            content_range = response.headers.get("Content-Range", "")
+            match = re.match(r"bytes \d+-\d+/(\d+)", content_range)
+            return (int(match.group(1)) if match else None), bool(match), file_name, validator
+        return response.content_length, False, file_name, validator
+
+def _file_name_from_response(response: aiohttp.ClientResponse) -> str | None:
+    disposition = response.headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+    if match:
+        return unquote(match.group(1))
+    name = os.path.basename(unquote(urlparse(str(response.url)).path))
+    return name or None
+
+def _safe_file_name(name: str | None) -> str:
+    # पथ घटक और असुरक्षित वर्ण हटाएं; हर डाउनलोड के लिए अद्वितीय नाम बनाएं
+    stem, ext = os.path.splitext(os.path.basename(name or ""))
+    stem = re.sub(r"[^\w.\-]+", "_", stem).strip("._")[:80] or "terabox_video"
+    ext = re.sub(r"[^\w.]+", "", ext)[:10] or ".mp4"
+    return f"{stem}_{int(time.time() * 1000)}{ext}"
+
+@dataclass
+class _Segment:
+    # [start, end] (दोनों सम्मिलित); done = start से लगातार डिस्क पर लिखे गए बाइट्स
+    start: int
+    end: int
+    done: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start + 1 - self.done
+
+def _plan_segments(total_bytes: int, segments: int) -> list[_Segment]:
+    # छोटी फ़ाइलों के लिए कम सेगमेंट
+    count = max(1, min(segments, total_bytes // max(Config.DOWNLOAD_MIN_SEGMENT_BYTES, 1)))
+    size = -(-total_bytes // count) # ceil
+    return [_Segment(start, min(start + size, total_bytes) - 1) for start in range(0, total_bytes, size)]
+
+async def _stream_to_fd(response: aiohttp.ClientResponse, fd: int, offset: int, chunk_size: int,
+                        limit: int | None, counter: list, progress: _Segment | None = None,
+                        report: Callable[[], None] | None = None) -> int:
+    # प्रतिक्रिया को बड़े ब्लॉकों में जोड़कर os.pwrite से सही ऑफ़सेट पर लिखें (डिस्क I/O थ्रेड में)।
+    # progress.done केवल लिखे जा चुके बाइट्स गिनता है, इसलिए चेकपॉइंट कभी आगे नहीं भागता।
+    # report() हर लिखे गए ब्लॉक के बाद (उपयोगकर्ता को प्रगति; throttling कॉलर की ज़िम्मेदारी)।
+    buffer = bytearray()
+    written = 0
+
+    async def write():
+        nonlocal written
+        await asyncio.to_thread(os.pwrite, fd, bytes(buffer), offset + written)
+        written += len(buffer)
+        counter[0] += len(buffer)
+        if progress is not None:
+            progress.done += len(buffer)
+        buffer.clear()
+        if report is not None:
+            report()
+
+    try:
+        async for data in response.content.iter_chunked(chunk_size):
+            buffer += data
+            if limit is not None and written + len(buffer) > limit:
+                raise DownloadTooLargeError(f"फ़ाइल अधिकतम आकार {limit} बाइट्स से बड़ी है")
+            if len(buffer) >= chunk_size:
+                await write()
+    except _RETRYABLE_ERRORS:
+        if buffer and progress is not None:
+            await write() # कनेक्शन टूटा: जो बाइट्स आ चुके हैं उन्हें भी रखें
+        raise
+    if buffer:
+        await write()
+    return written
+
+def _backoff_delay(attempt: int) -> float:
+    # full jitter: एक साथ टूटे कई सेगमेंट/डाउनलोड एक ही पल में सर्वर पर वापस न लौटें
+    cap = min(Config.DOWNLOAD_RETRY_MAX_DELAY_SECONDS, Config.DOWNLOAD_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+async def _with_retries(operation, description: str):
+    # operation() हर प्रयास पर नए सिरे से बुलाया जाता है (सेगमेंट अपनी प्रगति से आगे Range माँगते हैं)
+    for attempt in itertools.count():
+        try:
+            return await operation()
+        except _RETRYABLE_ERRORS as e:
+            if attempt >= Config.DOWNLOAD_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            throughput_stats["retries"] += 1
+            metrics.download_retries.inc()
+            logger.warning(
+                f"{description} विफल ({type(e).__name__}: {e}), {delay:.1f}s बाद पुनः प्रयास "
+                f"({attempt + 1}/{Config.DOWNLOAD_MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+
+async def _fetch_segment(session, url: str, fd: int, segment: _Segment, chunk_size: int, counter: list,
+                         report: Callable[[], None] | None = None):
+    async def attempt():
+        if segment.remaining <= 0:
+            return
+        start = segment.start + segment.done
+        async with session.get(url, headers={"Range": f"bytes={start}-{segment.end}"}) as response:
+            _raise_for_status(response, (206,), f"सेगमेंट {start}-{segment.end}")
+            await _stream_to_fd(response, fd, start, chunk_size, segment.remaining, counter, segment, report)
+        if segment.remaining:
+            raise TransientDownloadError(f"सेगमेंट {segment.start}-{segment.end} अधूरा रहा ({segment.remaining} बाइट्स शेष)")
+
+    await _with_retries(attempt, f"सेगमेंट {segment.start}-{segment.end}")
+
+# --- अधूरे डाउनलोड का चेकपॉइंट ---
+# DOWNLOAD_DIR/.partial/<कुंजी>.part में डेटा और <कुंजी>.part.json में हर सेगमेंट की प्रगति।
+# एक ही कुंजी (सामान्यीकृत शेयर ID) का अगला अनुरोध वहीं से जारी रहता है, बशर्ते आकार और
+# validator (ETag/Last-Modified) न बदले हों।
+
+_active_partials = set() # अभी डाउनलोड हो रही कुंजियाँ: एक ही .part पर दो डाउनलोड न लिखें
+
+def _partial_path(directory: str, resume_key: str) -> str:
+    digest = hashlib.sha1(resume_key.encode()).hexdigest()
+    return os.path.join(directory, ".partial", digest + PARTIAL_SUFFIX)
+
+def _load_checkpoint(part_path: str, total_bytes: int, validator: str | None) -> list[_Segment] | None:
+    try:
+        with open(part_path + CHECKPOINT_SUFFIX) as f:
+            checkpoint = json.load(f)
+        if not os.path.exists(part_path):
+            return None
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("total_bytes") != total_bytes or checkpoint.get("validator") != validator:
+        return None # स्रोत फ़ाइल बदल गई है
+    return [_Segment(*segment) for segment in checkpoint.get("segments", [])]
+
+def _save_checkpoint(part_path: str, fd: int, total_bytes: int, validator: str | None, plan: list[_Segment]):
+    # पहले डेटा डिस्क पर, फिर चेकपॉइंट (os.replace से एटॉमिक); ब्लॉकिंग है, थ्रेड में बुलाएं
+    os.fdatasync(fd)
+    checkpoint = {
+        "total_bytes": total_bytes,
+        "validator": validator,
+        "segments": [[segment.start, segment.end, segment.done] for segment in plan],
+        "saved_at": time.time(),
+    }
+    tmp_path = part_path + CHECKPOINT_SUFFIX + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, part_path + CHECKPOINT_SUFFIX)
+
+def _discard_partial(part_path: str):
+    for path in (part_path, part_path + CHECKPOINT_SUFFIX):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+async def _checkpoint_loop(part_path: str, fd: int, total_bytes: int, validator: str | None, plan: list[_Segment]):
+    while True:
+        await asyncio.sleep(Config.DOWNLOAD_CHECKPOINT_INTERVAL_SECONDS)
+        save = asyncio.ensure_future(asyncio.to_thread(_save_checkpoint, part_path, fd, total_bytes, validator, plan))
+        try:
+            await asyncio.shield(save)
+        except asyncio.CancelledError:
+            # fd बंद होने से पहले चल रहा लेखन पूरा होने दें
+            await asyncio.gather(save, return_exceptions=True)
+            raise
+        except OSError as e:
+            logger.warning(f"डाउनलोड चेकपॉइंट {part_path} सहेजने में त्रुटि: {e}")
+
+async def _stop_checkpointer(task: asyncio.Task | None):
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+async def download_file(url: str, directory: str, *, file_name: str | None = None,
+                        segments: int | None = None, chunk_size: int | None = None,
+                        max_bytes: int | None = None,
+                        spool: SpoolManager | None = None,
+                        resume_key: str | None = None,
+                        progress: Callable[[int, int | None], None] | None = None) -> tuple[str, DownloadStats]:
+    # फ़ाइल को HTTP Range सेगमेंट्स में समानांतर डाउनलोड करें; सर्वर Range न दे तो एकल स्ट्रीम।
+    # file_name न दिया जाए तो सर्वर के Content-Disposition/URL से बनाया जाता है।
+    # spool दिया जाए तो लिखने से पहले डिस्क स्थान आरक्षित होता है और फ़ाइल उसमें पंजीकृत होती है।
+    # टूटे कनेक्शन/5xx पर हर सेगमेंट अपनी प्रगति से आगे jittered backoff के साथ फिर से माँगा जाता है।
+    # resume_key दिया जाए (और सर्वर Range दे) तो विफलता पर अधूरी फ़ाइल चेकपॉइंट के साथ रखी जाती है
+    # और उसी कुंजी का अगला डाउनलोड वहीं से जारी रहता है; अन्यथा अधूरी फ़ाइल हटा दी जाती है।
+    # progress(डिस्क पर बाइट्स, कुल बाइट्स या None) हर लिखे गए ब्लॉक पर बुलाया जाता है।
+    # (फ़ाइल पथ, आँकड़े) लौटाता है।
+    segments = segments or Config.DOWNLOAD_SEGMENTS
+    chunk_size = chunk_size or Config.DOWNLOAD_CHUNK_SIZE_BYTES
+    max_bytes = Config.MAX_DOWNLOAD_SIZE_BYTES if max_bytes is None else max_bytes
+    counter = [0] # इस प्रक्रिया में सभी सेगमेंट्स द्वारा लिखे गए कुल बाइट्स
+
+    started = time.perf_counter()
+    async with _new_session(segments) as session:
+        total_bytes, accepts_ranges, remote_name, validator = await _with_retries(
+            lambda: _probe(session, url), "डाउनलोड जाँच"
+        )
+        file_path = os.path.join(directory, file_name or _safe_file_name(remote_name))
+        if total_bytes is not None and max_bytes and total_bytes > max_bytes:
+            raise DownloadTooLargeError(f"फ़ाइल ({total_bytes} बाइट्स) अधिकतम आकार {max_bytes} बाइट्स से बड़ी है")
+
+        resumable = bool(resume_key and accepts_ranges and total_bytes and resume_key not in _active_partials)
+        plan = None
+        resumed_bytes = 0
+        if resumable:
+            _active_partials.add(resume_key)
+            write_path = _partial_path(directory, resume_key)
+            os.makedirs(os.path.dirname(write_path), exist_ok=True)
+            if spool is not None:
+                spool.take(write_path) # रुकी हुई अधूरी फ़ाइल अब फिर से इस डाउनलोड की है
+            plan = _load_checkpoint(write_path, total_bytes, validator)
+            if plan is None:
+                _discard_partial(write_path)
+            else:
+                resumed_bytes = sum(segment.done for segment in plan)
+                logger.info(f"{url} का डाउनलोड {resumed_bytes}/{total_bytes} बाइट्स से फिर से शुरू हो रहा है।")
+        else:
+            write_path = file_path
+
+        report = (lambda: progress(resumed_bytes + counter[0], total_bytes)) if progress is not None else None
+
+        reservation = None
+        fd = None
+        checkpointer = None
+        try:
+            reservation = spool.reserve(total_bytes or 0) if spool is not None else None
+            flags = os.O_WRONLY | os.O_CREAT | (0 if plan else os.O_TRUNC)
+            fd = os.open(write_path, flags, 0o644)
+            if accepts_ranges and total_bytes:
+                plan = plan or _plan_segments(total_bytes, segments)
+                # आउटपुट फ़ाइल पहले से पूरे आकार की बनाएं ताकि सेगमेंट सीधे अपने ऑफ़सेट पर लिखें
+                await asyncio.to_thread(os.ftruncate, fd, total_bytes)
+                if resumable:
+                    checkpointer = asyncio.create_task(_checkpoint_loop(write_path, fd, total_bytes, validator, plan))
+                tasks = [
+                    asyncio.create_task(_fetch_segment(session, url, fd, segment, chunk_size, counter, report))
+                    for segment in plan if segment.remaining > 0
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+            else:
+                plan = [_Segment(0, (total_bytes or 0) - 1)]
+
+                async def attempt():
+                    # Range के बिना बीच से जारी नहीं रखा जा सकता: हर प्रयास शुरू से
+                    counter[0] = 0
+                    await asyncio.to_thread(os.ftruncate, fd, 0)
+                    async with session.get(url) as response:
+                        _raise_for_status(response, (200,), "डाउनलोड")
+                        await _stream_to_fd(response, fd, 0, chunk_size, max_bytes or None, counter, report=report)
+                    if total_bytes is not None and counter[0] != total_bytes:
+                        raise TransientDownloadError(f"डाउनलोड अधूरा रहा ({counter[0]}/{total_bytes} बाइट्स)")
+
+                await _with_retries(attempt, "डाउनलोड")
+        except BaseException as e:
+            await _stop_checkpointer(checkpointer)
+            checkpointer = None
+            keep = resumable and fd is not None and not isinstance(e, DownloadTooLargeError) \
+                and any(segment.done for segment in plan or ())
+            if keep:
+                try:
+                    await asyncio.shield(asyncio.to_thread(_save_checkpoint, write_path, fd, total_bytes, validator, plan))
+                except (OSError, asyncio.CancelledError) as save_error:
+                    logger.warning(f"डाउनलोड चेकपॉइंट {write_path} सहेजने में त्रुटि: {save_error}")
+                    keep = False
+            if fd is not None:
+                os.close(fd)
+                fd = None
+            if reservation is not None:
+                spool.release(reservation)
+            if keep:
+                if spool is not None:
+                    spool.keep_partial(write_path)
+                logger.info(f"अधूरा डाउनलोड {write_path} रखा गया ({sum(s.done for s in plan)}/{total_bytes} बाइट्स)।")
+            elif resumable:
+                _discard_partial(write_path)
+            else:
+                try:
+                    os.remove(write_path)
+                except OSError:
+                    pass
+            raise
+        finally:
+            await _stop_checkpointer(checkpointer)
+            if fd is not None:
+                os.close(fd)
+            if resumable:
+                _active_partials.discard(resume_key)
+        if resumable:
+            os.replace(write_path, file_path)
+            _discard_partial(write_path) # बचा हुआ चेकपॉइंट
+        if spool is not None:
+            spool.add_file(file_path, reservation)
+
+    stats = DownloadStats(
+        bytes_downloaded=counter[0],
+        total_bytes=total_bytes,
+        seconds=time.perf_counter() - started,
+        segments=len(plan),
+    )
+    throughput_stats["downloads"] += 1
+    throughput_stats["bytes"] += stats.bytes_downloaded
+    throughput_stats["seconds"] += stats.seconds
+    throughput_stats["segments"] += stats.segments
+    throughput_stats["resumed_bytes"] += resumed_bytes
+    logger.info(
+        f"{file_path} डाउनलोड हुआ: {stats.bytes_downloaded} बाइट्स, {stats.segments} सेगमेंट, "
+        f"{stats.seconds:.2f}s, {stats.bytes_per_second / (1024 * 1024):.2f} MB/s"
+        + (f" ({resumed_bytes} बाइट्स पिछले प्रयास से)" if resumed_bytes else "")
+    )
+    return file_path, stats
+
+# --- Terabox Downloader ---
+async def download_terabox(url: str, progress: Callable[[int, int | None], None] | None = None) -> str | None:
     logger.info(f"Terabox डाउनलोड करने का प्रयास कर रहा है: {url}")
+    share_key = normalize_share_id(url)
     try:
-        # Placeholder: This part requires the actual Terabox direct link extraction logic.
-        # Example using a dummy file for demonstration. Replace with actual download logic.
-        # For real Terabox, consider using a reliable API or robust library.
-        file_name = f"terabox_video_{int(time.time())}.mp4"
-        file_path = os.path.join(DOWNLOAD_DIR, file_name)
-        
-        # उदाहरण: डमी URL से डाउनलोड का अनुकरण (वास्तविक Terabox लॉजिक से बदलें)
-        # response = requests.get(direct_link, stream=True)
-        # if response.status_code == 200:
-        #    with open(file_path, 'wb') as f:
-        #        for chunk in response.iter_content(chunk_size=8192):
-        #            f.write(chunk)
-        #    logger.info(f"Terabox वीडियो {file_path} पर डाउनलोड किया गया")
-        #    return file_path
-        # else:
-        #    logger.error(f"डायरेक्ट लिंक से Terabox वीडियो डाउनलोड करने में विफल रहा। स्थिति: {response.status_code}")
-        #    return None
-        
-        # एक पूर्ण, चलाने योग्य कोड प्रदान करने के उद्देश्य से,
-        # मैं एक डमी फ़ाइल निर्माण जोड़ूंगा। इसे वास्तविक TERABOX डाउनलोड से बदलें।
-        with open(file_path, 'w') as f:
-            f.write("यह एक डमी Terabox वीडियो फ़ाइल है।")
-        logger.warning(f"डमी Terabox फ़ाइल बनाई गई: {file_path}. वास्तविक डाउनलोड लॉजिक से बदलें।")
+        # दो चरण: शेयर लिंक -> डायरेक्ट लिंक (कैश/साझा, resolver.py), फिर बाइट ट्रांसफ़र
+        direct = await link_resolver.resolve(share_key, url)
+        # resume_key: उसी शेयर का अगला अनुरोध पिछली अधूरी फ़ाइल से जारी रहता है
+        file_path, stats = await download_file(direct.url, DOWNLOAD_DIR,
+                                               file_name=_safe_file_name(direct.file_name) if direct.file_name else None,
+                                               spool=download_spool, resume_key=share_key, progress=progress)
+        logger.info(f"Terabox वीडियो {file_path} पर डाउनलोड किया गया")
+        metrics.downloads.labels("ok").inc()
+        metrics.download_bytes.inc(stats.bytes_downloaded)
+        metrics.download_duration.observe(stats.seconds)
+        metrics.download_throughput.observe(stats.bytes_per_second)
         return file_path
 
+    except ResolveError as e:
+        logger.warning(f"Terabox लिंक {url} रिज़ॉल्व नहीं हुआ: {e}")
+        metrics.downloads.labels("resolve_error").inc()
+        return None
+    except DownloadTooLargeError as e:
+        logger.warning(f"Terabox वीडियो {url} बहुत बड़ा है: {e}")
+        metrics.downloads.labels("too_large").inc()
+        return None
+    except SpoolFullError as e:
+        logger.warning(f"Terabox वीडियो {url} के लिए डिस्क स्थान उपलब्ध नहीं: {e}")
+        metrics.downloads.labels("spool_full").inc()
+        return None
     except Exception as e:
         logger.error(f"Terabox वीडियो {url} डाउनलोड करने में त्रुटि: {e}")
+        metrics.downloads.labels("error").inc()
+        link_resolver.invalidate(share_key) # हस्ताक्षरित लिंक अस्वीकार हुआ हो सकता है; अगली बार नया लें
         return None
 
 # YouTube Downloader कार्यक्षमता हटा दी गई है
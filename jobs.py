@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from pymongo.errors import PyMongoError
+
+from config import Config
+from database import claim_due_jobs, complete_jobs, retry_job, schedule_job
+import metrics
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Any, dict], Awaitable[None]] # (bot, payload)
+
+
+class JobPoller:
+    # Mongo में रखे विलंबित जॉब्स का एकल पोलर (प्रति प्रक्रिया)। जॉब रीस्टार्ट/डिप्लॉय के बाद भी बचे रहते हैं।
+    # हर चक्र में देय जॉब्स का बैच लीज़ पर लेता है, उन्हें समानांतर चलाता है और सफल जॉब एक ही
+    # delete_many से हटाता है। बैच भरा हो (पुराना बकाया, जैसे स्टार्टअप पर) तो बिना रुके अगला बैच।
+    def __init__(self, batch_size: int, lease_seconds: float, poll_interval_seconds: float, max_attempts: int,
+                 retry_backoff_seconds: float, concurrency: int, foreign_grace_seconds: float):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.concurrency = concurrency
+        self.foreign_grace_seconds = foreign_grace_seconds
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._handlers = {} # {kind: JobHandler}
+        self._bot = None
+        self._task = None
+        self._wakeup = None
+        self._next_poll_at = None
+        # काउंटर
+        self.polls = 0
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.max_lag_seconds = 0.0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def schedule(self, kind: str, delay_seconds: float, payload: dict, *,
+                       job_id: str | None = None, local: bool = False):
+        # local=True: जॉब इस होस्ट की स्थानीय फ़ाइल से जुड़ा है, इसलिए पहले यही होस्ट उसे लेगा
+        due_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        await schedule_job(kind, due_at, payload, job_id=job_id, host=self.host if local else None)
+        loop = asyncio.get_running_loop()
+        if self._wakeup is not None and self._next_poll_at is not None and loop.time() + delay_seconds < self._next_poll_at:
+            # अगले पोल से पहले देय: पोलर को उस समय तक सोने दें जितनी देर बाद यह देय है
+            self._next_poll_at = loop.time() + delay_seconds
+            self._wakeup.set()
+
+    # --- पोलिंग ---
+
+    async def poll_once(self) -> int:
+        self.polls += 1
+        token, jobs = await claim_due_jobs(
+            self.owner, self.host, self.batch_size, self.lease_seconds, self.foreign_grace_seconds
+        )
+        if not jobs:
+            return 0
+        self.claimed += len(jobs)
+        now = datetime.utcnow()
+        for job in jobs:
+            lag = (now - job["due_at"]).total_seconds()
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+            metrics.scheduled_job_lag.observe(max(lag, 0.0))
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def execute(job: dict) -> bool:
+            async with slots:
+                return await self._execute(job, token)
+
+        results = await asyncio.gather(*(execute(job) for job in jobs))
+        finished = [job["_id"] for job, done in zip(jobs, results) if done]
+        if finished:
+            await complete_jobs(finished, token)
+        return len(jobs)
+
+    async def _execute(self, job: dict, token: str) -> bool:
+        # True = जॉब हटाएं (सफल या छोड़ा गया), False = बाद में पुनः प्रयास के लिए रखा गया
+        kind = job.get("kind")
+        handler = self._handlers.get(kind)
+        if handler is None:
+            logger.error(f"अज्ञात जॉब प्रकार '{kind}' ({job['_id']}), हटाया जा रहा है।")
+            self.dropped += 1
+            metrics.scheduled_jobs.labels(str(kind), "dropped").inc()
+            return True
+        try:
+            await handler(self._bot, job.get("payload") or {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if job.get("attempts", 1) >= self.max_attempts:
+                logger.error(f"जॉब {job['_id']} ({kind}) {self.max_attempts} प्रयासों के बाद छोड़ा गया: {e}")
+                self.dropped += 1
+                metrics.scheduled_jobs.labels(kind, "dropped").inc()
+                return True
+            delay = self.retry_backoff_seconds * (2 ** (job.get("attempts", 1) - 1))
+            logger.warning(f"जॉब {job['_id']} ({kind}) विफल, {delay:.0f}s बाद पुनः प्रयास: {e}")
+            try:
+                await retry_job(job["_id"], token, datetime.utcnow() + timedelta(seconds=delay), str(e))
+            except PyMongoError as db_error: # लीज़ समाप्त होने पर जॉब वैसे भी फिर से लिया जाएगा
+                logger.error(f"जॉब {job['_id']} का पुनः प्रयास शेड्यूल करने में त्रुटि: {db_error}")
+            self.retried += 1
+            metrics.scheduled_jobs.labels(kind, "retried").inc()
+            return False
+        self.completed += 1
+        metrics.scheduled_jobs.labels(kind, "completed").inc()
+        return True
+
+    async def _run_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                claimed = await self.poll_once()
+            except PyMongoError as e:
+                logger.error(f"विलंबित जॉब्स पोल करने में त्रुटि: {e}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue # बकाया: अगला बैच तुरंत
+            self._next_poll_at = loop.time() + self.poll_interval_seconds
+            while True:
+                self._wakeup.clear()
+                delay = self._next_poll_at - loop.time()
+                if delay <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    break
+
+    def start(self, bot):
+        # स्टार्टअप पर पहला पोल तुरंत होता है, इसलिए डाउनटाइम के दौरान देय हुए जॉब तुरंत निकलते हैं
+        if self._task is None:
+            self._bot = bot
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run_loop(), name="job-poller")
+
+    async def stop(self):
+        # अधूरे जॉब की लीज़ समाप्त होने पर कोई और रेप्लिका (या अगली प्रक्रिया) उन्हें ले लेगी
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "polls": self.polls,
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+
+job_poller = JobPoller(
+    batch_size=Config.JOB_BATCH_SIZE,
+    lease_seconds=Config.JOB_LEASE_SECONDS,
+    poll_interval_seconds=Config.JOB_POLL_INTERVAL_SECONDS,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    retry_backoff_seconds=Config.JOB_RETRY_BACKOFF_SECONDS,
+    concurrency=Config.JOB_CONCURRENCY,
+    foreign_grace_seconds=Config.JOB_FOREIGN_HOST_GRACE_SECONDS,
+)
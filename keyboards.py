@@ -1,4 +1,5 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import Config
 
 def channel_check_keyboard():
     keyboard = [
@@ -24,3 +25,27 @@ def premium_keyboard():
     ]
     return InlineKeyboardMarkup(keyboard)
 
+
+def payment_digest_keyboard(payments):
+    # हर लंबित भुगतान की एक पंक्ति: हर प्रीमियम पैक के लिए अनुमोदन बटन और एक अस्वीकार बटन
+    # callback_data: "pay:<पैक या x>:<utr>" (Telegram सीमा 64 बाइट)
+    keyboard = []
+    for payment in payments:
+        utr = payment["utr"]
+        row = [
+            InlineKeyboardButton(f"✅ …{utr[-4:]} +{pack}", callback_data=f"pay:{pack}:{utr}")
+            for pack in Config.PREMIUM_PRICES["terabox"]
+        ]
+        row.append(InlineKeyboardButton("❌", callback_data=f"pay:x:{utr}"))
+        keyboard.append(row)
+    return InlineKeyboardMarkup(keyboard)
+
+def without_payment_row(reply_markup, utr):
+    # निपटाए गए भुगतान के बटन डाइजेस्ट से हटाएं; कोई पंक्ति न बचे तो None
+    if reply_markup is None:
+        return None
+    keyboard = [
+        row for row in reply_markup.inline_keyboard
+        if not any((button.callback_data or "").endswith(f":{utr}") for button in row)
+    ]
+    return InlineKeyboardMarkup(keyboard) if keyboard else None
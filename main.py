@@ -1,10 +1,13 @@
 import logging
 import os
+import re
 import time
 import asyncio
 from datetime import datetime, timedelta
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import Forbidden, TelegramError
+from telegram.request import BaseRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -18,18 +21,51 @@ from pymongo.errors import PyMongoError
 from config import Config
 from database import (
     initialize_database,
+    close_database,
+    activity_buffer,
     get_user_data,
     update_user_activity,
-    increment_user_downloads,
+    QuotaReservation,
+    reserve_download,
+    commit_download,
+    refund_download,
     add_premium_downloads,
+    add_premium_downloads_bulk,
     get_platform_premium_limit,
+    get_cached_file,
+    get_cached_file_by_hash,
+    save_cached_file,
+    delete_cached_file,
+    file_cache_hit_rate,
+    cancel_job,
+    cancel_jobs,
+    submit_payment,
+    resolve_payment,
+    reopen_payment,
+    cancel_broadcasts,
 )
-from downloaders import download_terabox # केवल Terabox डाउनलोडर रखें
+from membership import is_channel_member
+from scheduler import download_scheduler, QueueFullError
+from spool import download_spool
+from resolver import link_resolver
+from progress import create_progress_reporter
+from jobs import job_poller
+from payments import payment_digest
+from broadcast import broadcaster
+from analytics import analytics, build_stats_report
+from update_processor import PerUserUpdateProcessor
+from rate_limiter import outbound_limiter
+from uploader import upload_backend
+from state_store import create_state_store
+from webhook import run_webhook
+import metrics
+from downloaders import download_terabox, extract_share_links, normalize_share_id, content_fingerprint # केवल Terabox डाउनलोडर रखें
 from keyboards import (
 #    start_keyboard,
     main_menu_keyboard,
     premium_keyboard,
     channel_check_keyboard,
+    without_payment_row,
 )
 
 # लॉगिंग कॉन्फ़िगर करें
@@ -40,22 +76,79 @@ logger = logging.getLogger(__name__)
 
 # --- उपयोगकर्ता की वर्तमान कार्रवाई को ट्रैक करने के लिए वैश्विक स्थिति ---
 # यह जानने में मदद करता है कि बॉट किसी विशिष्ट प्लेटफ़ॉर्म के लिए लिंक की उम्मीद कर रहा है या नहीं
-user_state = {} # {'user_id': 'platform_key'} जैसे: {123: 'terabox'}
+# TTL और आकार सीमा वाला स्टोर (Config.STATE_STORE_BACKEND: memory या mongo), मान जैसे: 'terabox'
+user_state = create_state_store()
 
-# --- फ़ाइल हटाने के लिए सहायक फ़ंक्शन ---
-async def delete_file_after_delay(file_path, delay_minutes, context: ContextTypes.DEFAULT_TYPE, chat_id, message_id):
-    await asyncio.sleep(delay_minutes * 60)
+# बॉट केवल यही अपडेट प्रकार संभालता है; बाकी Telegram से मँगाए ही नहीं जाते
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# --- स्थायी विलंबित जॉब ---
+# जॉब Mongo में रहते हैं (jobs.job_poller), इसलिए डिप्लॉय/क्रैश के बाद भी सूचनाएँ और रिमाइंडर नहीं छूटते।
+# हैंडलर (bot, payload) लेते हैं; अपवाद उठाने पर जॉब बाद में फिर से चलाया जाता है।
+
+async def run_delete_file_job(bot, payload: dict) -> None:
+    # स्थानीय प्रति (यदि अब भी है) हटाएं और उपयोगकर्ता को सूचित करें
+    if payload.get("path"):
+        download_spool.remove(payload["path"])
+    try:
+        await bot.send_message(
+            chat_id=payload["chat_id"],
+            text=f"⚠️ आपकी पिछली डाउनलोड की गई फ़ाइल (मैसेज ID: {payload['message_id']}) सर्वर से डिलीट कर दी गई है।"
+        )
+    except Forbidden: # उपयोगकर्ता ने बॉट ब्लॉक कर दिया; पुनः प्रयास व्यर्थ है
+        pass
+
+async def run_quota_reminder_job(bot, payload: dict) -> None:
+    # मुफ़्त सीमा समाप्त होने के कुछ समय बाद प्रीमियम की याद दिलाएं (यदि तब तक प्रीमियम नहीं लिया)
+    platform = payload.get("platform", "terabox")
+    user_data = await get_user_data(payload["user_id"])
+    if user_data.get(platform, {}).get("premium_count", 0) > 0:
+        return
+    try:
+        await bot.send_message(
+            chat_id=payload["chat_id"],
+            text=(
+                "👋 आपकी मुफ़्त डाउनलोड सीमा समाप्त हो चुकी है।\n"
+                "और फाइलें डाउनलोड करने के लिए हमारा **प्रीमियम वर्जन** लें।"
+            ),
+            reply_markup=premium_keyboard(),
+            parse_mode='Markdown'
+        )
+    except Forbidden:
+        pass
+
+async def schedule_file_deletion(bot, file_path: str, chat_id: int, message_id: int) -> None:
+    delay = Config.FILE_DELETE_DELAY_MINUTES * 60 # मिनट को सेकंड में बदलें
+    payload = {"path": file_path, "chat_id": chat_id, "message_id": message_id}
+    # स्पूल स्थानीय फ़ाइल ठीक समय पर हटाता है (और डिस्क बजट के लिए जल्दी भी); सूचना स्थायी जॉब से जाती है
+    download_spool.schedule_expiry(file_path, delay)
     try:
-        os.remove(file_path)
-        logger.info(f"फ़ाइल हटाई गई: {file_path}")
-        await context.bot.send_message(chat_id=chat_id, text=f"⚠️ आपकी पिछली डाउनलोड की गई फ़ाइल (मैसेज ID: {message_id}) सर्वर से डिलीट कर दी गई है।")
-    except OSError as e:
-        logger.error(f"फ़ाइल {file_path} हटाने में त्रुटि: {e}")
-        await context.bot.send_message(chat_id=chat_id, text=f"⚠️ फ़ाइल डिलीट करने में समस्या हुई: {e}")
+        await job_poller.schedule("delete_file", delay, payload, local=True)
+    except PyMongoError as e:
+        # DB उपलब्ध नहीं: कम से कम इस प्रक्रिया के रहते सूचना भेजें
+        logger.error(f"फ़ाइल हटाने का जॉब सहेजने में त्रुटि, इन-मेमोरी सूचना का उपयोग: {e}")
+        download_spool.schedule_expiry(file_path, delay, on_expire=lambda path: run_delete_file_job(bot, payload))
+
+def quota_reminder_job_id(user_id: int, platform: str) -> str:
+    return f"quota_reminder:{user_id}:{platform}"
 
+async def schedule_quota_reminder(reservation: QuotaReservation) -> None:
+    if (Config.QUOTA_REMINDER_DELAY_HOURS <= 0 or reservation.credit != "free"
+            or reservation.free_remaining > 0 or reservation.premium_remaining > 0):
+        return
+    try:
+        await job_poller.schedule(
+            "quota_reminder",
+            Config.QUOTA_REMINDER_DELAY_HOURS * 3600,
+            {"user_id": reservation.user_id, "chat_id": reservation.user_id, "platform": reservation.platform},
+            job_id=quota_reminder_job_id(reservation.user_id, reservation.platform), # प्रति उपयोगकर्ता एक ही रिमाइंडर
+        )
+    except PyMongoError as e:
+        logger.error(f"उपयोगकर्ता {reservation.user_id} का कोटा रिमाइंडर शेड्यूल करने में त्रुटि: {e}")
 
 # --- कमांड हैंडलर्स ---
 
+@metrics.track_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     user_name = update.effective_user.full_name
@@ -66,8 +159,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # चैनल जॉइन चेक
     if Config.REQUIRED_CHANNEL_ID:
         try:
-            member = await context.bot.get_chat_member(Config.REQUIRED_CHANNEL_ID, user_id)
-            if member.status in ["member", "administrator", "creator"]:
+            if await is_channel_member(context.bot, user_id):
                 await show_main_menu(update, context)
             else:
                 await update.message.reply_text(
@@ -111,6 +203,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             parse_mode='Markdown'
         )
 
+@metrics.track_handler("handle_callback_query")
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
@@ -122,8 +215,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     if data == "check_channel":
         if Config.REQUIRED_CHANNEL_ID:
             try:
-                member = await context.bot.get_chat_member(Config.REQUIRED_CHANNEL_ID, user_id)
-                if member.status in ["member", "administrator", "creator"]:
+                if await is_channel_member(context.bot, user_id):
                     await show_main_menu(update, context)
                 else:
                     await query.edit_message_text(
@@ -152,7 +244,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(help_text, reply_markup=main_menu_keyboard(), parse_mode='Markdown')
 
     elif data == "terabox_download":
-        user_state[user_id] = "terabox"
+        await user_state.set(user_id, "terabox")
         await query.edit_message_text(
             "📥 **Terabox Video Download:**\nअब आप Terabox लिंक भेज सकते हैं।",
             reply_markup=main_menu_keyboard() # आसान नेविगेशन के लिए मुख्य मेनू रखें
@@ -200,17 +292,103 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             )
 
     elif data == "i_have_paid":
-        user_state[user_id] = "awaiting_utr"
+        await user_state.set(user_id, "awaiting_utr")
         await query.edit_message_text(
             "कृपया अपना UTR (Unique Transaction Reference) नंबर दर्ज करें। "
             "आपकी Telegram ID स्वतः प्राप्त कर ली जाएगी।",
             reply_markup=main_menu_keyboard() # उपयोगकर्ता को मुख्य मेनू पर वापस जाने की अनुमति दें
         )
     elif data == "back_to_menu":
-        user_state.pop(user_id, None) # उपयोगकर्ता की स्थिति साफ़ करें
+        await user_state.pop(user_id) # उपयोगकर्ता की स्थिति साफ़ करें
         await show_main_menu(update, context)
 
 
+@metrics.track_handler("handle_payment_callback")
+async def handle_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # डाइजेस्ट के बटन: "pay:<पैक>:<utr>" अनुमोदन, "pay:x:<utr>" अस्वीकार
+    query = update.callback_query
+    admin_id = query.from_user.id
+    if str(admin_id) != Config.ADMIN_ID:
+        await query.answer("आपको इस कार्रवाई की अनुमति नहीं है।", show_alert=True)
+        logger.warning(f"उपयोगकर्ता {admin_id} द्वारा भुगतान अनुमोदन का अनाधिकृत प्रयास")
+        return
+
+    try:
+        _, action, utr = query.data.split(":", 2)
+        approve = action != "x"
+        files_count = int(action) if approve else 0
+        if approve and files_count <= 0:
+            raise ValueError(f"अमान्य पैक {action}")
+    except ValueError as e: # पुराना या बिगड़ा हुआ बटन डेटा
+        logger.warning(f"अमान्य भुगतान बटन डेटा {query.data!r}: {e}")
+        await query.answer("यह बटन अमान्य है।", show_alert=True)
+        return
+    limit_type = "terabox"
+    try:
+        payment = await resolve_payment(utr, "approved" if approve else "rejected", admin_id, files_count)
+    except PyMongoError as e:
+        logger.error(f"भुगतान {utr} अपडेट करने में डेटाबेस त्रुटि: {e}")
+        await query.answer(f"डेटाबेस त्रुटि: {e}", show_alert=True)
+        return
+    if payment is None: # दूसरी बार दबाया गया बटन, या किसी और ने पहले ही निपटा दिया
+        await query.answer("यह भुगतान पहले ही निपटाया जा चुका है।", show_alert=True)
+    else:
+        user_id = payment["user_id"]
+        if approve:
+            try:
+                await add_premium_downloads(user_id, limit_type, files_count)
+            except PyMongoError as e:
+                logger.error(f"भुगतान {utr} के लिए प्रीमियम जोड़ने में त्रुटि: {e}")
+                try:
+                    await reopen_payment(utr)
+                except PyMongoError as reopen_error:
+                    logger.error(f"भुगतान {utr} फिर से लंबित करने में त्रुटि: {reopen_error}")
+                await query.answer(f"प्रीमियम नहीं जोड़ा जा सका: {e}", show_alert=True)
+                return
+            try:
+                await cancel_job(quota_reminder_job_id(user_id, limit_type)) # अब रिमाइंडर की ज़रूरत नहीं
+            except PyMongoError as e: # रिमाइंडर स्वयं प्रीमियम जाँचकर रुक जाएगा
+                logger.error(f"उपयोगकर्ता {user_id} का कोटा रिमाइंडर रद्द करने में त्रुटि: {e}")
+            metrics.payments.labels("approved").inc()
+            analytics.record("payments.approved")
+            analytics.record_grant(files_count, "payment")
+            logger.info(f"एडमिन {admin_id} ने UTR {utr} स्वीकृत किया: उपयोगकर्ता {user_id} को {files_count} प्रीमियम {limit_type} डाउनलोड")
+            await query.answer(f"✅ UTR {utr}: यूज़र {user_id} को {files_count} प्रीमियम डाउनलोड जोड़े गए।")
+            try:
+                total_premium_for_platform = await get_platform_premium_limit(user_id, limit_type)
+                await context.bot.send_message(
+                    chat_id=user_id,
+                    text=(
+                        f"🎉 **बधाई हो!** आपका प्रीमियम ({files_count} {limit_type} डाउनलोड) अब सक्रिय हो गया है।\n"
+                        f"आपके पास अब कुल {total_premium_for_platform} {limit_type} प्रीमियम डाउनलोड शेष हैं। "
+                        "आप अब और डाउनलोड का आनंद ले सकते हैं!"
+                    ),
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                logger.error(f"उपयोगकर्ता {user_id} को प्रीमियम सक्रियण संदेश नहीं भेज सका: {e}")
+        else:
+            metrics.payments.labels("rejected").inc()
+            analytics.record("payments.rejected")
+            logger.info(f"एडमिन {admin_id} ने UTR {utr} (उपयोगकर्ता {user_id}) अस्वीकार किया")
+            await query.answer(f"❌ UTR {utr} अस्वीकार किया गया।")
+            try:
+                await context.bot.send_message(
+                    chat_id=user_id,
+                    text=f"आपका UTR `{utr}` सत्यापित नहीं हो सका। कृपया सही UTR भेजें या एडमिन से संपर्क करें।",
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                logger.error(f"उपयोगकर्ता {user_id} को अस्वीकृति संदेश नहीं भेज सका: {e}")
+
+    # निपटाए गए भुगतान के बटन डाइजेस्ट से हटाएं
+    try:
+        await query.edit_message_reply_markup(reply_markup=without_payment_row(query.message.reply_markup, utr))
+    except TelegramError as e:
+        logger.warning(f"भुगतान डाइजेस्ट के बटन अपडेट करने में त्रुटि: {e}")
+
+
+@metrics.track_handler("handle_message")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     message_text = update.message.text
@@ -218,49 +396,53 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     await update_user_activity(user_id) # TTL के लिए अंतिम गतिविधि अपडेट करें
 
-    if user_state.get(user_id) == "awaiting_utr":
+    current_state = await user_state.get(user_id)
+
+    if current_state == "awaiting_utr":
         utr_number = message_text.strip()
-        if not utr_number.isdigit() or len(utr_number) < 6: # मूल UTR सत्यापन
+        if not utr_number.isdigit() or not 6 <= len(utr_number) <= 30: # मूल UTR सत्यापन
             await update.message.reply_text(
                 "अमान्य UTR नंबर। कृपया सही UTR नंबर दर्ज करें।",
                 reply_markup=main_menu_keyboard()
             )
             return
 
-        # UTR को एडमिन चैनल पर भेजें
-        if Config.ADMIN_CHANNEL_ID:
-            try:
-                await context.bot.send_message(
-                    chat_id=Config.ADMIN_CHANNEL_ID,
-                    text=(
-                        f"🚨 **नई प्रीमियम रिक्वेस्ट!** 🚨\n"
-                        f"**यूज़र Telegram ID:** `{user_id}`\n"
-                        f"**UTR नंबर:** `{utr_number}`\n"
-                        f"**यूज़र लिंक:** tg://user?id={user_id}"
-                    ),
-                    parse_mode='Markdown'
-                )
-                logger.info(f"उपयोगकर्ता {user_id} से UTR {utr_number} एडमिन चैनल पर भेजा गया।")
-                await update.message.reply_text(
-                    "आपका UTR नंबर प्राप्त हो गया है। हमारी टीम जल्द ही इसकी पुष्टि करेगी और आपका प्रीमियम सक्रिय कर देगी। धन्यवाद!",
-                    reply_markup=main_menu_keyboard()
-                )
-            except Exception as e:
-                logger.error(f"UTR को एडमिन चैनल पर भेजने में त्रुटि: {e}")
-                await update.message.reply_text(
-                    "UTR नंबर भेजने में त्रुटि हुई। कृपया थोड़ी देर बाद पुनः प्रयास करें या एडमिन से संपर्क करें।",
-                    reply_markup=main_menu_keyboard()
-                )
-        else:
+        # UTR सहेजें: utr पर अद्वितीय इंडेक्स दोहराए/रीप्ले किए गए UTR को रोकता है।
+        # एडमिन चैनल पर अलग संदेश नहीं, भुगतान अगले डाइजेस्ट (payments.payment_digest) में जाता है
+        try:
+            created, payment = await submit_payment(user_id, utr_number)
+        except PyMongoError as e:
+            logger.error(f"UTR {utr_number} सहेजने में त्रुटि: {e}")
             await update.message.reply_text(
-                "UTR नंबर प्राप्त हो गया है, लेकिन एडमिन चैनल कॉन्फ़िगर नहीं है। कृपया एडमिन से संपर्क करें।",
+                "UTR नंबर भेजने में त्रुटि हुई। कृपया थोड़ी देर बाद पुनः प्रयास करें या एडमिन से संपर्क करें।",
                 reply_markup=main_menu_keyboard()
             )
-        user_state.pop(user_id, None) # UTR सबमिशन के बाद स्थिति साफ़ करें
+            return # स्थिति बनी रहती है ताकि उपयोगकर्ता फिर से भेज सके
+
+        if created:
+            metrics.payments.labels("submitted").inc()
+            analytics.record("payments.submitted")
+            logger.info(f"उपयोगकर्ता {user_id} से UTR {utr_number} प्राप्त हुआ।")
+            if Config.ADMIN_CHANNEL_ID:
+                reply = "आपका UTR नंबर प्राप्त हो गया है। हमारी टीम जल्द ही इसकी पुष्टि करेगी और आपका प्रीमियम सक्रिय कर देगी। धन्यवाद!"
+            else:
+                reply = "UTR नंबर प्राप्त हो गया है, लेकिन एडमिन चैनल कॉन्फ़िगर नहीं है। कृपया एडमिन से संपर्क करें।"
+        elif payment.get("user_id") == user_id:
+            metrics.payments.labels("resubmitted").inc()
+            reply = {
+                "approved": "यह UTR पहले ही स्वीकृत हो चुका है और आपका प्रीमियम सक्रिय है।",
+                "rejected": "यह UTR पहले ही अस्वीकार किया जा चुका है। किसी समस्या के लिए एडमिन से संपर्क करें।",
+            }.get(payment.get("status"), "यह UTR पहले ही प्राप्त हो चुका है और पुष्टि की प्रतीक्षा में है। कृपया प्रतीक्षा करें।")
+        else:
+            metrics.payments.labels("duplicate").inc()
+            logger.warning(f"उपयोगकर्ता {user_id} ने किसी और का UTR {utr_number} भेजा (मूल: {payment.get('user_id')})")
+            reply = "यह UTR नंबर पहले ही किसी अन्य अनुरोध में उपयोग हो चुका है। कृपया अपना सही UTR नंबर भेजें।"
+        await update.message.reply_text(reply, reply_markup=main_menu_keyboard())
+        await user_state.pop(user_id) # UTR सबमिशन के बाद स्थिति साफ़ करें
         return
 
     # उपयोगकर्ता की स्थिति के आधार पर डाउनलोड लिंक को हैंडल करें
-    platform = user_state.get(user_id)
+    platform = current_state
 
     # अब केवल Terabox ही समर्थित प्लेटफ़ॉर्म है
     if platform != "terabox":
@@ -268,15 +450,70 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "क्षमा करें, मैं इस समय केवल Terabox लिंक स्वीकार करता हूँ। कृपया '📥 Terabox Video Download' बटन चुनें।",
             reply_markup=main_menu_keyboard()
         )
-        user_state.pop(user_id, None) # Invalid state, clear it
+        await user_state.pop(user_id) # Invalid state, clear it
         return
 
-    user_data = await get_user_data(user_id)
-    free_count = user_data.get(platform, {}).get('free_count', 0)
-    premium_count = user_data.get(platform, {}).get('premium_count', 0)
+    # लिंक पहचानें: अमान्य संदेश किसी नेटवर्क/DB कॉल (सदस्यता, कोटा, कैश) से पहले ही लौटा दिया जाता है
+    links = extract_share_links(message_text)
+    if not links:
+        metrics.link_messages.labels("invalid").inc()
+        await update.message.reply_text(
+            "यह कोई मान्य Terabox लिंक नहीं है। कृपया `https://terabox.com/s/1...` जैसा शेयर लिंक भेजें।",
+            reply_markup=main_menu_keyboard(),
+            parse_mode='Markdown'
+        )
+        return # स्थिति बनी रहती है ताकि उपयोगकर्ता सही लिंक भेज सके
+    found = len(links)
+    metrics.link_messages.labels("single" if found == 1 else "multiple").inc()
+    dropped_over_limit = max(0, len(links) - Config.MAX_LINKS_PER_MESSAGE)
+    links = links[:Config.MAX_LINKS_PER_MESSAGE]
+
+    # रिज़ॉल्वर के बिना हर डाउनलोड विफल होता (शेयर पेज HTML है): कोटा आरक्षित करने से पहले ही बताएं
+    if not link_resolver.configured:
+        metrics.link_messages.labels("unconfigured").inc()
+        await update.message.reply_text(
+            "क्षमा करें, डाउनलोड अभी उपलब्ध नहीं हैं (सर्वर कॉन्फ़िगर नहीं है)। कृपया बाद में पुनः प्रयास करें या एडमिन से संपर्क करें।",
+            reply_markup=main_menu_keyboard()
+        )
+        return
+
+    # डाउनलोड से पहले चैनल जॉइन चेक (कैश किए गए परिणाम से, अतिरिक्त API कॉल के बिना)
+    try:
+        if not await is_channel_member(context.bot, user_id):
+            await update.message.reply_text(
+                "डाउनलोड करने के लिए, कृपया पहले हमारे चैनल को जॉइन करें और फिर 'मैंने जॉइन कर लिया है' पर क्लिक करें।",
+                reply_markup=channel_check_keyboard()
+            )
+            return
+    except Exception as e:
+        # /start की तरह, जाँच विफल होने पर उपयोगकर्ता को रोका नहीं जाता
+        logger.error(f"उपयोगकर्ता {user_id} के लिए डाउनलोड से पहले चैनल सदस्यता की जाँच में त्रुटि: {e}")
+
+    # कतार में जितनी जगह है उतने ही लिंक लें, ताकि कोई क्रेडिट बिना जॉब के आरक्षित न हो
+    slots = download_scheduler.free_slots(user_id)
+    if not slots:
+        await update.message.reply_text(
+            "आपके पहले से कई डाउनलोड कतार में हैं। कृपया उनके पूरे होने की प्रतीक्षा करें।",
+            reply_markup=main_menu_keyboard()
+        )
+        return
+    dropped_for_queue = max(0, len(links) - slots)
+    links = links[:slots]
 
-    # सीमाएँ जांचें
-    if free_count >= Config.FREE_LIMITS.get(platform, 0) and premium_count <= 0:
+    # सीमा जांच और क्रेडिट की खपत हर लिंक के लिए एक एटॉमिक ऑपरेशन में; डाउनलोड के दौरान क्रेडिट रोका रहता है
+    reservations = []
+    try:
+        for _ in links:
+            reservation = await reserve_download(user_id, platform)
+            if reservation is None:
+                break
+            reservations.append(reservation)
+    except Exception:
+        for reservation in reservations:
+            await refund_download(reservation)
+        raise
+    if not reservations:
+        analytics.record("denied")
         await update.message.reply_text(
             f"**आपकी मुफ़्त डाउनलोड सीमा ({Config.FREE_LIMITS.get(platform, 0)} फाइलें) समाप्त हो गई है!** "
             "इस प्लेटफ़ॉर्म पर और फाइलें डाउनलोड करने के लिए, कृपया हमारा प्रीमियम वर्जन खरीदें। "
@@ -285,13 +522,170 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             parse_mode='Markdown'
         )
         return
+    dropped_for_quota = len(links) - len(reservations)
+    if dropped_for_quota:
+        analytics.record("denied")
+
+    # डाउनलोड को कतार में डालें; हैंडलर तुरंत लौट जाता है और शेड्यूलर जॉब चलाता है
+    await user_state.pop(user_id) # लिंक मिल गया, उपयोगकर्ता की स्थिति साफ़ करें
+
+    queued_jobs = []
+    from_cache = 0
+    for index, (link, reservation) in enumerate(zip(links, reservations)):
+        # लोकप्रिय लिंक: पहले अपलोड हुआ file_id तुरंत भेजें, कतार/डाउनलोड/अपलोड के बिना
+        try:
+            if await send_cached_file(update, reservation, link.key):
+                from_cache += 1
+                continue
+        except Exception:
+            for pending in reservations[index:]:
+                await refund_download(pending)
+            raise
 
-    await update.message.reply_text(f"लिंक पहचान रहा हूँ और डाउनलोड शुरू कर रहा हूँ... कृपया प्रतीक्षा करें।")
+        try:
+            job = download_scheduler.submit(
+                user_id,
+                chat_id,
+                lambda reservation=reservation, url=link.url: process_download(update, context, reservation, url),
+                premium=reservation.credit == "premium" or reservation.premium_count > 0,
+                on_cancel=lambda reservation=reservation: refund_download(reservation), # कतार में रद्द होने पर क्रेडिट वापस
+            )
+        except QueueFullError:
+            for pending in reservations[index:]:
+                await refund_download(pending)
+            dropped_for_queue += len(reservations) - index
+            break
+        queued_jobs.append(job)
+
+    if found == 1:
+        if not queued_jobs and not from_cache:
+            await update.message.reply_text(
+                "आपके पहले से कई डाउनलोड कतार में हैं। कृपया उनके पूरे होने की प्रतीक्षा करें।",
+                reply_markup=main_menu_keyboard()
+            )
+            return
+        position = download_scheduler.position(queued_jobs[0]) if queued_jobs else 0
+        if position:
+            await update.message.reply_text(
+                f"⏳ आपका डाउनलोड कतार में है। कतार में स्थान: **{position}**\n"
+                "रद्द करने के लिए /cancel भेजें।",
+                parse_mode='Markdown'
+            )
+        return
+
+    # कई लिंक: हर लिंक का अलग जॉब; एक ही सारांश संदेश
+    lines = [f"🔗 **{found}** Terabox लिंक मिले।"]
+    if queued_jobs:
+        lines.append(f"⏳ कतार में: **{len(queued_jobs)}**")
+    if from_cache:
+        lines.append(f"⚡ तुरंत भेजे गए: **{from_cache}**")
+    if dropped_for_quota:
+        lines.append(f"🚫 डाउनलोड सीमा समाप्त होने से छोड़े गए: **{dropped_for_quota}**")
+    if dropped_for_queue:
+        lines.append(f"🚫 कतार भरी होने से छोड़े गए: **{dropped_for_queue}**")
+    if dropped_over_limit:
+        lines.append(f"🚫 एक संदेश में अधिकतम {Config.MAX_LINKS_PER_MESSAGE} लिंक, छोड़े गए: **{dropped_over_limit}**")
+    if queued_jobs:
+        lines.append("रद्द करने के लिए /cancel भेजें।")
+    await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+
+
+async def send_quota_status(message, reservation: QuotaReservation) -> None:
+    # सफल डाउनलोड के बाद शेष सीमा बताएं (गणना reserve_download से लौटी है)
+    if reservation.credit == "free":
+        await message.reply_text(
+            f"इस प्लेटफ़ॉर्म पर आपके **{reservation.free_remaining}** मुफ़्त डाउनलोड शेष हैं।",
+            reply_markup=main_menu_keyboard(),
+            parse_mode='Markdown'
+        )
+    elif reservation.premium_remaining > 0:
+        await message.reply_text(
+            f"इस प्लेटफ़ॉर्म पर आपके **{reservation.premium_remaining}** प्रीमियम डाउनलोड शेष हैं।",
+            reply_markup=main_menu_keyboard(),
+            parse_mode='Markdown'
+        )
+    else:
+        await message.reply_text(
+            f"इस प्लेटफ़ॉर्म पर आपकी सभी प्रीमियम लिमिट्स भी समाप्त हो गई हैं। कृपया अधिक डाउनलोड के लिए फिर से प्रीमियम खरीदें।",
+            reply_markup=main_menu_keyboard(),
+            parse_mode='Markdown'
+        )
+
+
+def _file_id_from_message(message) -> tuple[str, str] | None:
+    # अपलोड किए गए संदेश से (मीडिया प्रकार, file_id) निकालें
+    if message.video:
+        return "video", message.video.file_id
+    if message.audio:
+        return "audio", message.audio.file_id
+    if message.document:
+        return "document", message.document.file_id
+    if message.photo:
+        return "photo", message.photo[-1].file_id
+    return None
+
+async def _reply_with_file_id(message, media_type: str, file_id: str, caption: str):
+    # पहले से Telegram पर मौजूद फ़ाइल को file_id से दोबारा भेजें (कोई अपलोड नहीं)
+    if media_type == "video":
+        return await message.reply_video(video=file_id, caption=caption, parse_mode='Markdown')
+    if media_type == "photo":
+        return await message.reply_photo(photo=file_id, caption=caption, parse_mode='Markdown')
+    if media_type == "audio":
+        return await message.reply_audio(audio=file_id, caption=caption, parse_mode='Markdown')
+    return await message.reply_document(document=file_id, caption=caption, parse_mode='Markdown')
+
+async def _upload_file(message, file_path: str, progress=None) -> list:
+    # डाउनलोड की गई फ़ाइल अपलोड बैकएंड (क्लाउड या स्थानीय Bot API) से भेजें; बड़ी फ़ाइल कई भागों में
+    caption = (
+        f"📥 **डाउनलोड सफल!**\n"
+        f"फ़ाइल: {os.path.basename(file_path)}\n\n"
+        f"⚠️ **महत्वपूर्ण:** यह फ़ाइल {Config.FILE_DELETE_DELAY_MINUTES} मिनट में सर्वर से डिलीट हो जाएगी। "
+        "कृपया इसे तुरंत कहीं और फॉरवर्ड कर लें!"
+    )
+    return await upload_backend.send(message, file_path, caption, progress=progress)
+
+
+async def send_cached_file(update: Update, reservation: QuotaReservation, share_key: str) -> bool:
+    # file_id कैश हिट होने पर फ़ाइल तुरंत भेजें और क्रेडिट खर्च करें; अन्यथा False
+    try:
+        entry = await get_cached_file(share_key)
+    except PyMongoError as e:
+        logger.error(f"file_id कैश लुकअप में त्रुटि ({share_key}): {e}")
+        return False
+    if not entry:
+        return False
+    caption = f"📥 **डाउनलोड सफल!**\nफ़ाइल: {entry.get('file_name', '')}"
+    try:
+        await _reply_with_file_id(update.message, entry["media_type"], entry["file_id"], caption)
+    except TelegramError as e:
+        # file_id अब मान्य नहीं है: प्रविष्टि हटाएं और सामान्य डाउनलोड पर लौटें
+        logger.warning(f"कैश किया गया file_id ({share_key}) भेजा नहीं जा सका, प्रविष्टि हटाई जा रही है: {e}")
+        await delete_cached_file(share_key)
+        return False
+    await commit_download(reservation)
+    analytics.record_download(reservation, "cache")
+    logger.info(f"उपयोगकर्ता {reservation.user_id} को {share_key} कैश से भेजा गया। हिट दर: {file_cache_hit_rate():.1%}")
+    await send_quota_status(update.message, reservation)
+    await schedule_quota_reminder(reservation)
+    return True
+
+
+async def process_download(update: Update, context: ContextTypes.DEFAULT_TYPE, reservation: QuotaReservation, url: str) -> None:
+    # शेड्यूलर द्वारा चलाया गया जॉब: डाउनलोड, अपलोड और क्रेडिट का निपटारा
+    user_id = reservation.user_id
+    platform = reservation.platform
+    chat_id = update.effective_chat.id
+    share_key = normalize_share_id(url)
+
+    # एक ही स्टेटस संदेश डाउनलोड/अपलोड की प्रगति दिखाता है (संपादन throttled, progress.py)
+    status_message = await update.message.reply_text(f"लिंक पहचान रहा हूँ और डाउनलोड शुरू कर रहा हूँ... कृपया प्रतीक्षा करें।")
+    progress = create_progress_reporter(status_message)
 
     file_path = None
+    sent_message = None
     try:
         if platform == "terabox":
-            file_path = await download_terabox(message_text)
+            file_path = await download_terabox(url, progress=progress.download)
         # YouTube और Instagram डाउनलोड लॉजिक हटा दिया गया
         # elif platform == "youtube":
         #    file_path = await download_youtube(message_text)
@@ -299,95 +693,48 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         #    file_path = await download_instagram(message_text)
         else:
             await update.message.reply_text("अवैध प्लेटफ़ॉर्म चयन।") # यह लाइन अब शायद ही कभी पहुंचेगी
-            user_state.pop(user_id, None)
             return
 
         if file_path:
-            caption = (
-                f"📥 **डाउनलोड सफल!**\n"
-                f"फ़ाइल: {os.path.basename(file_path)}\n\n"
-                "⚠️ **महत्वपूर्ण:** यह फ़ाइल 3 मिनट में सर्वर से डिलीट हो जाएगी। "
-                "कृपया इसे तुरंत कहीं और फॉरवर्ड कर लें!"
-            )
-            sent_message = None
-            if os.path.getsize(file_path) > 50 * 1024 * 1024: # सीधे भेजने के लिए 50 MB सीमा, बड़े के लिए दस्तावेज़ का उपयोग करें
-                try:
-                    sent_message = await update.message.reply_document(
-                        document=open(file_path, 'rb'),
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                except Exception as e:
-                    logger.warning(f"दस्तावेज़ के रूप में भेजने में विफल रहा, वीडियो/फोटो के रूप में प्रयास कर रहा है: {e}")
-                    if file_path.endswith(('.mp4', '.mov', '.avi', '.mkv')):
-                        sent_message = await update.message.reply_video(
-                            video=open(file_path, 'rb'),
-                            caption=caption,
-                            parse_mode='Markdown'
-                        )
-                    elif file_path.endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                        sent_message = await update.message.reply_photo(
-                            photo=open(file_path, 'rb'),
-                            caption=caption,
-                            parse_mode='Markdown'
-                        )
-                    else:
-                        raise e # अगर फिर भी विफल रहता है, तो पुनः उत्पन्न करें
-            else: # छोटी फ़ाइलों के लिए, पहले विशिष्ट प्रकारों का प्रयास करें
-                if file_path.endswith(('.mp4', '.mov', '.avi', '.mkv')):
-                    sent_message = await update.message.reply_video(
-                        video=open(file_path, 'rb'),
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                elif file_path.endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                    sent_message = await update.message.reply_photo(
-                        photo=open(file_path, 'rb'),
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                elif file_path.endswith(('.mp3', '.wav', '.ogg')):
-                    sent_message = await update.message.reply_audio(
-                        audio=open(file_path, 'rb'),
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                else:
-                    sent_message = await update.message.reply_document( # दूसरों के लिए दस्तावेज़ को डिफ़ॉल्ट करें
-                        document=open(file_path, 'rb'),
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
+            # वही सामग्री किसी दूसरे लिंक से पहले अपलोड हो चुकी हो तो दोबारा अपलोड न करें
+            content_hash = await asyncio.to_thread(content_fingerprint, file_path)
+            try:
+                cached = await get_cached_file_by_hash(content_hash)
+            except PyMongoError as e:
+                logger.error(f"file_id कैश (content_hash) लुकअप में त्रुटि: {e}")
+                cached = None
+            if cached:
+                sent_messages = [await _reply_with_file_id(
+                    update.message,
+                    cached["media_type"],
+                    cached["file_id"],
+                    f"📥 **डाउनलोड सफल!**\nफ़ाइल: {cached.get('file_name', '')}"
+                )]
+                uploaded = False
+            else:
+                progress.phase("upload", os.path.getsize(file_path), detail=os.path.basename(file_path))
+                sent_messages = await _upload_file(update.message, file_path, progress=progress.upload)
+                uploaded = True
+            sent_message = sent_messages[0] if sent_messages else None
 
             if sent_message:
-                # फ़ाइल हटाने का शेड्यूल करें
-                context.job_queue.run_once(
-                    lambda context: asyncio.create_task(
-                        delete_file_after_delay(file_path, Config.FILE_DELETE_DELAY_MINUTES, context, chat_id, sent_message.message_id)
-                    ),
-                    Config.FILE_DELETE_DELAY_MINUTES * 60 # मिनट को सेकंड में बदलें
-                )
-                await increment_user_downloads(user_id, platform)
-                remaining_free = Config.FREE_LIMITS.get(platform, 0) - free_count - 1
-                remaining_premium = premium_count - 1
-                if remaining_free >= 0:
-                    await update.message.reply_text(
-                        f"इस प्लेटफ़ॉर्म पर आपके **{remaining_free}** मुफ़्त डाउनलोड शेष हैं।",
-                        reply_markup=main_menu_keyboard(),
-                        parse_mode='Markdown'
-                    )
-                elif remaining_premium > 0:
-                    await update.message.reply_text(
-                        f"इस प्लेटफ़ॉर्म पर आपके **{remaining_premium}** प्रीमियम डाउनलोड शेष हैं।",
-                        reply_markup=main_menu_keyboard(),
-                        parse_mode='Markdown'
-                    )
+                # कई भागों में भेजी गई फ़ाइल का कोई एक file_id नहीं होता, इसलिए उसे कैश न करें
+                media = _file_id_from_message(sent_message) if len(sent_messages) == 1 else None
+                if media:
+                    try:
+                        await save_cached_file(share_key, content_hash, media[1], media[0], os.path.basename(file_path))
+                    except PyMongoError as e:
+                        logger.error(f"file_id कैश सहेजने में त्रुटि ({share_key}): {e}")
+                if uploaded:
+                    # फ़ाइल हटाने का शेड्यूल करें (ठीक FILE_DELETE_DELAY_MINUTES बाद)
+                    await schedule_file_deletion(context.bot, file_path, chat_id, sent_message.message_id)
                 else:
-                    await update.message.reply_text(
-                        f"इस प्लेटफ़ॉर्म पर आपकी सभी प्रीमियम लिमिट्स भी समाप्त हो गई हैं। कृपया अधिक डाउनलोड के लिए फिर से प्रीमियम खरीदें।",
-                        reply_markup=main_menu_keyboard(),
-                        parse_mode='Markdown'
-                    )
+                    download_spool.remove(file_path) # सर्वर पर रखने की ज़रूरत नहीं, Telegram पर पहले से मौजूद
+                await commit_download(reservation)
+                analytics.record_download(reservation, "upload" if uploaded else "hash")
+                await progress.finish("✅ डाउनलोड पूरा हुआ")
+                await send_quota_status(update.message, reservation)
+                await schedule_quota_reminder(reservation)
 
             else:
                 raise Exception("टेलीग्राम को फ़ाइल नहीं भेज सका।")
@@ -403,17 +750,39 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             reply_markup=main_menu_keyboard()
         )
     finally:
-        # यदि file_path मौजूद है और शेड्यूल द्वारा सफलतापूर्वक भेजा/हटाया नहीं गया था, तो साफ़ करने का प्रयास करें
-        if file_path and os.path.exists(file_path) and 'sent_message' not in locals():
+        if sent_message is None:
+            await progress.finish("❌ डाउनलोड पूरा नहीं हुआ")
+        else:
+            await progress.close()
+        # डाउनलोड या भेजना विफल रहा: रोका गया क्रेडिट वापस करें
+        if reservation.state == "held":
             try:
-                os.remove(file_path)
-                logger.info(f"बिना भेजी गई फ़ाइल साफ़ की गई: {file_path}")
-            except OSError as e:
-                logger.error(f"बिना भेजी गई फ़ाइल {file_path} साफ़ करने में त्रुटि: {e}")
-        user_state.pop(user_id, None) # डाउनलोड का प्रयास करने के बाद उपयोगकर्ता की स्थिति साफ़ करें
+                await refund_download(reservation)
+                analytics.record("refunds")
+            except PyMongoError as e:
+                logger.error(f"उपयोगकर्ता {user_id} का क्रेडिट वापस करने में त्रुटि: {e}")
+        # यदि file_path मौजूद है और शेड्यूल द्वारा सफलतापूर्वक भेजा/हटाया नहीं गया था, तो साफ़ करने का प्रयास करें
+        if file_path and sent_message is None:
+            download_spool.remove(file_path)
+            logger.info(f"बिना भेजी गई फ़ाइल साफ़ की गई: {file_path}")
+
+
+@metrics.track_handler("cancel_command")
+async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+    cancelled = await download_scheduler.cancel_user(user_id)
+    await user_state.pop(user_id)
+    if cancelled:
+        await update.message.reply_text(
+            f"आपके {cancelled} डाउनलोड रद्द कर दिए गए हैं। उपयोग न हुए क्रेडिट वापस कर दिए गए हैं।",
+            reply_markup=main_menu_keyboard()
+        )
+    else:
+        await update.message.reply_text("रद्द करने के लिए कोई डाउनलोड नहीं है।", reply_markup=main_menu_keyboard())
 
 
 # --- एडमिन कमांड हैंडलर ---
+@metrics.track_handler("add_premium_command")
 async def add_premium_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     admin_id = update.effective_user.id
 
@@ -445,6 +814,11 @@ async def add_premium_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
 
         await add_premium_downloads(user_id_to_add_premium, limit_type, files_count)
+        analytics.record_grant(files_count, "manual")
+        try:
+            await cancel_job(quota_reminder_job_id(user_id_to_add_premium, limit_type)) # अब रिमाइंडर की ज़रूरत नहीं
+        except PyMongoError as e: # रिमाइंडर स्वयं प्रीमियम जाँचकर रुक जाएगा
+            logger.error(f"उपयोगकर्ता {user_id_to_add_premium} का कोटा रिमाइंडर रद्द करने में त्रुटि: {e}")
 
         await update.message.reply_text(
             f"यूज़र `{user_id_to_add_premium}` को `{limit_type}` के लिए `{files_count}` प्रीमियम डाउनलोड सफलतापूर्वक जोड़े गए हैं।",
@@ -477,6 +851,316 @@ async def add_premium_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text(f"कमांड निष्पादित करते समय एक अज्ञात त्रुटि हुई: {e}")
 
 
+_BULK_LINE_SEPARATOR = re.compile(r"[\s,;]+")
+BULK_REPORT_MAX_FAILURES = 30
+
+
+def parse_premium_grants(text: str) -> tuple[list[tuple[int, str, int]], list[str]]:
+    # पंक्तियाँ: "user_id platform count" (स्पेस, कॉमा या ; से अलग)। खाली पंक्तियाँ, # टिप्पणियाँ
+    # और CSV हेडर छोड़े जाते हैं; एक ही (user_id, platform) की कई पंक्तियाँ जोड़ दी जाती हैं।
+    totals = {}
+    failures = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if line.startswith("/"): # कमांड स्वयं, जैसे "/add_premium_bulk 123 terabox 5"
+            line = line.partition(" ")[2].strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = [field for field in _BULK_LINE_SEPARATOR.split(line) if field]
+        if len(fields) != 3:
+            failures.append(f"पंक्ति {line_number}: 3 मान अपेक्षित, {len(fields)} मिले")
+            continue
+        try:
+            user_id = int(fields[0])
+        except ValueError:
+            if line_number == 1: # CSV हेडर, जैसे "user_id,platform,count"
+                continue
+            failures.append(f"पंक्ति {line_number}: अमान्य Telegram ID '{fields[0]}'")
+            continue
+        platform = fields[1].lower()
+        if platform != "terabox":
+            failures.append(f"पंक्ति {line_number}: अमान्य प्लेटफ़ॉर्म '{fields[1]}'")
+            continue
+        try:
+            count = int(fields[2])
+        except ValueError:
+            count = 0
+        if count <= 0:
+            failures.append(f"पंक्ति {line_number}: फाइलों की संख्या धनात्मक होनी चाहिए")
+            continue
+        totals[(user_id, platform)] = totals.get((user_id, platform), 0) + count
+    grants = [(user_id, platform, count) for (user_id, platform), count in totals.items()]
+    return grants, failures
+
+
+async def notify_premium_grants(bot, grants: list[tuple[int, str, int]], counts: dict) -> tuple[int, list[str]]:
+    # सूचनाएँ समानांतर भेजी जाती हैं; Telegram की वैश्विक/प्रति-चैट सीमाएँ outbound_limiter संभालता है
+    slots = asyncio.Semaphore(Config.BULK_NOTIFY_CONCURRENCY)
+
+    async def notify(index: int, user_id: int, platform: str, count: int) -> str | None:
+        async with slots:
+            try:
+                await bot.send_message(
+                    chat_id=user_id,
+                    text=(
+                        f"🎉 **बधाई हो!** आपका प्रीमियम ({count} {platform} डाउनलोड) अब सक्रिय हो गया है।\n"
+                        f"आपके पास अब कुल {counts[index]} {platform} प्रीमियम डाउनलोड शेष हैं। "
+                        "आप अब और डाउनलोड का आनंद ले सकते हैं!"
+                    ),
+                    parse_mode='Markdown'
+                )
+            except Forbidden:
+                return f"{user_id}: सूचना नहीं भेजी जा सकी (बॉट ब्लॉक है)"
+            except TelegramError as e:
+                return f"{user_id}: सूचना नहीं भेजी जा सकी ({e})"
+            return None
+
+    results = await asyncio.gather(*(
+        notify(index, user_id, platform, count)
+        for index, (user_id, platform, count) in enumerate(grants)
+        if index in counts
+    ))
+    failures = [result for result in results if result is not None]
+    return len(results) - len(failures), failures
+
+
+@metrics.track_handler("add_premium_bulk_command")
+async def add_premium_bulk_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # /add_premium_bulk के बाद बहु-पंक्ति सूची, या कैप्शन "/add_premium_bulk" वाली CSV फ़ाइल
+    message = update.message
+    admin_id = update.effective_user.id
+
+    if str(admin_id) != Config.ADMIN_ID:
+        await message.reply_text("आपको इस कमांड का उपयोग करने की अनुमति नहीं है।")
+        logger.warning(f"उपयोगकर्ता {admin_id} द्वारा /add_premium_bulk का उपयोग करने का अनाधिकृत प्रयास")
+        return
+
+    try:
+        if message.document:
+            data = await (await message.document.get_file()).download_as_bytearray()
+            text = data.decode("utf-8-sig", errors="replace")
+        else:
+            text = message.text or ""
+    except TelegramError as e:
+        logger.error(f"बल्क प्रीमियम फ़ाइल डाउनलोड करने में त्रुटि: {e}")
+        await message.reply_text(f"फ़ाइल पढ़ी नहीं जा सकी: {e}")
+        return
+
+    grants, failures = parse_premium_grants(text)
+    if not grants and not failures:
+        await message.reply_text(
+            "सही उपयोग: हर पंक्ति में `<user_telegram_id> <limit_type> <files_count>`\n"
+            "उदाहरण:\n`/add_premium_bulk\n123456789 terabox 50\n987654321 terabox 20`\n"
+            "या कैप्शन `/add_premium_bulk` के साथ CSV फ़ाइल भेजें।",
+            parse_mode='Markdown'
+        )
+        return
+    if len(grants) > Config.BULK_PREMIUM_MAX_LINES:
+        await message.reply_text(f"एक बार में अधिकतम {Config.BULK_PREMIUM_MAX_LINES} उपयोगकर्ता जोड़े जा सकते हैं।")
+        return
+
+    try:
+        counts, write_errors = await add_premium_downloads_bulk(grants)
+    except PyMongoError as e:
+        logger.error(f"add_premium_bulk_command में डेटाबेस त्रुटि: {e}")
+        await message.reply_text(f"डेटाबेस त्रुटि: {e}")
+        return
+    for index, error in write_errors.items():
+        failures.append(f"{grants[index][0]}: डेटाबेस त्रुटि ({error})")
+    for index in counts:
+        analytics.record_grant(grants[index][2], "bulk")
+
+    try:
+        await cancel_jobs([
+            quota_reminder_job_id(user_id, platform)
+            for index, (user_id, platform, _) in enumerate(grants)
+            if index in counts
+        ])
+    except PyMongoError as e: # रिमाइंडर स्वयं प्रीमियम जाँचकर रुक जाएगा
+        logger.error(f"बल्क प्रीमियम के कोटा रिमाइंडर रद्द करने में त्रुटि: {e}")
+    logger.info(f"एडमिन {admin_id} ने {len(counts)} उपयोगकर्ताओं को एक साथ प्रीमियम डाउनलोड जोड़े")
+
+    status = await message.reply_text(f"✅ {len(counts)} उपयोगकर्ताओं को प्रीमियम जोड़ा गया। सूचनाएँ भेजी जा रही हैं...")
+    notified, notify_failures = await notify_premium_grants(context.bot, grants, counts)
+
+    lines = [
+        "📋 बल्क प्रीमियम रिपोर्ट",
+        f"✅ प्रीमियम जोड़ा गया: {len(counts)}",
+        f"📨 सूचना भेजी गई: {notified}",
+        f"⚠️ विफल: {len(failures)} पंक्तियाँ, {len(notify_failures)} सूचनाएँ",
+    ]
+    all_failures = failures + notify_failures
+    if all_failures:
+        lines.append("")
+        lines.extend(all_failures[:BULK_REPORT_MAX_FAILURES])
+        if len(all_failures) > BULK_REPORT_MAX_FAILURES:
+            lines.append(f"...और {len(all_failures) - BULK_REPORT_MAX_FAILURES} अन्य")
+    # सादा पाठ: त्रुटि संदेशों में _ या * Markdown तोड़ सकते हैं
+    await status.edit_text("\n".join(lines))
+
+
+@metrics.track_handler("broadcast_command")
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # किसी संदेश के जवाब में /broadcast: वही संदेश (मीडिया/फ़ॉर्मेटिंग सहित) सभी को कॉपी होता है;
+    # या /broadcast <पाठ>: सादा पाठ
+    message = update.message
+    admin_id = update.effective_user.id
+
+    if str(admin_id) != Config.ADMIN_ID:
+        await message.reply_text("आपको इस कमांड का उपयोग करने की अनुमति नहीं है।")
+        logger.warning(f"उपयोगकर्ता {admin_id} द्वारा /broadcast का उपयोग करने का अनाधिकृत प्रयास")
+        return
+
+    source = message.reply_to_message
+    parts = (message.text or "").split(None, 1)
+    text = parts[1].strip() if len(parts) > 1 else ""
+    if source is None and not text:
+        await message.reply_text(
+            "सही उपयोग: जिस संदेश को भेजना है उसके जवाब में `/broadcast` लिखें, या `/broadcast <संदेश>`।\n"
+            "चल रहा प्रसारण रोकने के लिए: `/broadcast_cancel`",
+            parse_mode='Markdown'
+        )
+        return
+
+    status = await message.reply_text("📣 प्रसारण शुरू हो रहा है...")
+    try:
+        if source is not None:
+            broadcast_id = await broadcaster.create(
+                admin_id, status.chat_id, status.message_id, from_chat_id=source.chat_id, message_id=source.message_id
+            )
+        else:
+            broadcast_id = await broadcaster.create(admin_id, status.chat_id, status.message_id, text=text)
+    except PyMongoError as e:
+        logger.error(f"broadcast_command में डेटाबेस त्रुटि: {e}")
+        await status.edit_text(f"डेटाबेस त्रुटि: {e}")
+        return
+    logger.info(f"एडमिन {admin_id} ने प्रसारण {broadcast_id} शुरू किया")
+
+
+@metrics.track_handler("broadcast_cancel_command")
+async def broadcast_cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    admin_id = update.effective_user.id
+    if str(admin_id) != Config.ADMIN_ID:
+        await update.message.reply_text("आपको इस कमांड का उपयोग करने की अनुमति नहीं है।")
+        return
+    try:
+        cancelled = await cancel_broadcasts()
+    except PyMongoError as e:
+        logger.error(f"broadcast_cancel_command में डेटाबेस त्रुटि: {e}")
+        await update.message.reply_text(f"डेटाबेस त्रुटि: {e}")
+        return
+    if cancelled:
+        await update.message.reply_text(f"🛑 {cancelled} प्रसारण रद्द किए गए। चल रहा पन्ना पूरा होते ही भेजना रुक जाएगा।")
+    else:
+        await update.message.reply_text("कोई प्रसारण नहीं चल रहा है।")
+
+
+@metrics.track_handler("stats_command")
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # केवल रोलअप दस्तावेज़ पढ़ता है (अधिकतम 7 दैनिक + 24 घंटेवार), users कलेक्शन को कभी स्कैन नहीं करता
+    admin_id = update.effective_user.id
+    if str(admin_id) != Config.ADMIN_ID:
+        await update.message.reply_text("आपको इस कमांड का उपयोग करने की अनुमति नहीं है।")
+        logger.warning(f"उपयोगकर्ता {admin_id} द्वारा /stats का उपयोग करने का अनाधिकृत प्रयास")
+        return
+    try:
+        report = await build_stats_report()
+    except PyMongoError as e:
+        logger.error(f"stats_command में डेटाबेस त्रुटि: {e}")
+        await update.message.reply_text(f"डेटाबेस त्रुटि: {e}")
+        return
+    await update.message.reply_text(report, parse_mode='Markdown')
+
+
+async def post_init(application: Application) -> None:
+    # पृष्ठभूमि सेवाएँ इवेंट लूप शुरू होने के बाद आरंभ करें
+    activity_buffer.start()
+    analytics.start()
+    download_spool.start() # पिछली प्रक्रिया की अनाथ फ़ाइलें हटाता है और स्वीपर शुरू करता है
+    job_poller.register("delete_file", run_delete_file_job)
+    job_poller.register("quota_reminder", run_quota_reminder_job)
+    job_poller.start(application.bot) # पहला पोल तुरंत: डाउनटाइम में देय हुए जॉब बैचों में निकलते हैं
+    payment_digest.start(application.bot) # ADMIN_CHANNEL_ID न हो तो कुछ नहीं करता
+    broadcaster.start(application.bot) # रीस्टार्ट से पहले अधूरा रहा प्रसारण चेकपॉइंट से आगे बढ़ता है
+    if not link_resolver.configured:
+        logger.error("RESOLVER_API_URL सेट नहीं है: Terabox डाउनलोड बंद रहेंगे (शेयर लिंक डायरेक्ट फ़ाइल नहीं है)।")
+
+    # गेज स्क्रेप के समय सीधे सेवाओं की स्थिति से पढ़े जाते हैं
+    metrics.user_states.set_function(lambda: user_state.stats().get("size")) # mongo बैकएंड: उपलब्ध नहीं
+    metrics.download_queue_depth.set_function(lambda: download_scheduler.queue_depth)
+    metrics.download_jobs_running.set_function(lambda: download_scheduler.running)
+    metrics.download_dir_bytes.set_function(lambda: {
+        ("used",): download_spool.stats()["used_bytes"],
+        ("reserved",): download_spool.stats()["reserved_bytes"],
+        ("budget",): download_spool.budget_bytes,
+    })
+    metrics.download_dir_files.set_function(lambda: download_spool.stats()["files"])
+    metrics.resolver_cache_entries.set_function(lambda: link_resolver.stats()["cache"]["size"])
+    metrics.updates_in_flight.set_function(lambda: getattr(application.update_processor, "in_flight", None))
+    metrics.outbound_queue_depth.set_function(lambda: outbound_limiter.queue_depth)
+    if Config.METRICS_ENABLED:
+        try:
+            await metrics.metrics_server.start()
+        except OSError as e: # पोर्ट व्यस्त: बॉट फिर भी चले
+            logger.error(f"मेट्रिक्स सर्वर शुरू नहीं हो सका: {e}")
+
+
+async def post_shutdown(application: Application) -> None:
+    # चल रहे डाउनलोड रद्द करें (क्रेडिट वापस), बफ़र किए गए लेखन फ़्लश करें,
+    # फिर DB थ्रेड पूल और कनेक्शन साफ़ करें
+    await metrics.metrics_server.stop()
+    await download_scheduler.stop()
+    await job_poller.stop()
+    await payment_digest.stop()
+    await broadcaster.stop()
+    await download_spool.stop()
+    await link_resolver.stop()
+    await activity_buffer.stop()
+    await analytics.stop()
+    close_database()
+
+
+def build_application(token: str, request: BaseRequest | None = None) -> Application:
+    # request: Bot API का वैकल्पिक HTTP बैकएंड (बेंचमार्क नकली Telegram सर्वर देते हैं)
+    # 'Updater' को हटाकर 'Application' सीधे बिल्ड करें
+    # त्रुटि संदेश को देखते हुए, यह सुनिश्चित करना महत्वपूर्ण है कि `Updater` का उपयोग यहाँ न हो।
+    builder = Application.builder().token(token)
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    if Config.BOT_API_BASE_URL:
+        # स्थानीय Bot API सर्वर: फ़ाइलें पथ से भेजी जाती हैं (2000 MB तक)
+        builder = builder.base_url(Config.BOT_API_BASE_URL).local_mode(Config.BOT_API_LOCAL_MODE)
+        if Config.BOT_API_BASE_FILE_URL:
+            builder = builder.base_file_url(Config.BOT_API_BASE_FILE_URL)
+    application = (
+        builder
+        # अलग-अलग उपयोगकर्ताओं के अपडेट समानांतर, एक ही उपयोगकर्ता के क्रम में
+        .concurrent_updates(PerUserUpdateProcessor(Config.MAX_CONCURRENT_UPDATES))
+        # सभी आउटबाउंड कॉल्स वैश्विक/प्रति-चैट दर सीमा और retry_after से होकर जाती हैं
+        .rate_limiter(outbound_limiter)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+
+    # --- हैंडलर्स ---
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("cancel", cancel_command))
+    application.add_handler(CallbackQueryHandler(handle_payment_callback, pattern=r"^pay:")) # एडमिन डाइजेस्ट बटन
+    application.add_handler(CallbackQueryHandler(handle_callback_query))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(CommandHandler("add_premium", add_premium_command)) # एडमिन कमांड
+    application.add_handler(CommandHandler("add_premium_bulk", add_premium_bulk_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("broadcast_cancel", broadcast_cancel_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/add_premium_bulk\b"), add_premium_bulk_command
+    ))
+
+    return application
+
+
 def main() -> None:
     # कॉन्फ़िग से टेलीग्राम बॉट टोकन प्राप्त करें
     token = Config.TELEGRAM_BOT_TOKEN
@@ -493,20 +1177,21 @@ def main() -> None:
         logger.critical(f"MongoDB डेटाबेस प्रारंभ करने में विफल रहा: {e}")
         exit(1) # यदि डेटाबेस कनेक्शन विफल रहता है तो बाहर निकलें
 
-    # 'Updater' को हटाकर 'Application' सीधे बिल्ड करें
-    # त्रुटि संदेश को देखते हुए, यह सुनिश्चित करना महत्वपूर्ण है कि `Updater` का उपयोग यहाँ न हो।
-    application = Application.builder().token(token).build()
-
-    # --- हैंडलर्स ---
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CallbackQueryHandler(handle_callback_query))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    application.add_handler(CommandHandler("add_premium", add_premium_command)) # एडमिन कमांड
+    application = build_application(token)
 
     # बॉट चलाएं
-    logger.info("बॉट पोलिंग शुरू हो गया है...")
-    # सुनिश्चित करें कि `Updater` का कोई जिक्र नहीं है, केवल `application` पर सीधे `run_polling` कॉल करें।
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if Config.BOT_MODE == "webhook":
+        if not Config.WEBHOOK_URL:
+            logger.error("वेबहुक मोड के लिए WEBHOOK_URL सेट नहीं है।")
+            exit(1)
+        if not Config.WEBHOOK_SECRET_TOKEN:
+            logger.warning("WEBHOOK_SECRET_TOKEN सेट नहीं है; वेबहुक अनुरोधों का स्रोत सत्यापित नहीं होगा।")
+        logger.info("बॉट वेबहुक मोड में शुरू हो रहा है...")
+        asyncio.run(run_webhook(application, ALLOWED_UPDATES))
+    else:
+        logger.info("बॉट पोलिंग शुरू हो गया है...")
+        # सुनिश्चित करें कि `Updater` का कोई जिक्र नहीं है, केवल `application` पर सीधे `run_polling` कॉल करें।
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
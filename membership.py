@@ -0,0 +1,34 @@
+import logging
+
+from config import Config
+from cache import LRUTTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# REQUIRED_CHANNEL_ID सदस्यता के लिए मान्य स्थितियाँ
+MEMBER_STATUSES = ("member", "administrator", "creator")
+
+# सकारात्मक परिणाम लंबे समय तक, नकारात्मक परिणाम थोड़े समय के लिए कैश होते हैं
+# ताकि "मैंने जॉइन कर लिया है" दबाने पर जल्द ही दोबारा जाँच हो सके
+membership_cache = LRUTTLCache(
+    max_size=Config.MEMBERSHIP_CACHE_MAX_SIZE,
+    ttl_seconds=Config.MEMBERSHIP_POSITIVE_TTL_SECONDS,
+)
+_lookups = SingleFlight()
+
+async def _fetch_membership(bot, user_id: int) -> bool:
+    member = await bot.get_chat_member(Config.REQUIRED_CHANNEL_ID, user_id)
+    is_member = member.status in MEMBER_STATUSES
+    ttl = Config.MEMBERSHIP_POSITIVE_TTL_SECONDS if is_member else Config.MEMBERSHIP_NEGATIVE_TTL_SECONDS
+    membership_cache.set(user_id, is_member, ttl_seconds=ttl)
+    return is_member
+
+async def is_channel_member(bot, user_id: int) -> bool:
+    # चैनल कॉन्फ़िगर नहीं है तो सभी को अनुमति है। API त्रुटियाँ कैश नहीं होतीं और कॉलर तक पहुँचती हैं।
+    if not Config.REQUIRED_CHANNEL_ID:
+        return True
+    cached = membership_cache.get(user_id)
+    if cached is not None:
+        return cached
+    # एक ही उपयोगकर्ता के समानांतर लुकअप एक ही get_chat_member कॉल साझा करते हैं
+    return await _lookups.do(user_id, lambda: _fetch_membership(bot, user_id))
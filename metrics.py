@@ -0,0 +1,296 @@
+import bisect
+import functools
+import logging
+import time
+from typing import Callable
+
+from aiohttp import web
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# --- हल्का Prometheus-शैली मेट्रिक्स सबसिस्टम ---
+# रिकॉर्डिंग केवल एक dict लुकअप और कुछ जोड़ है (सब कुछ इवेंट लूप थ्रेड में चलता है, कोई लॉक नहीं),
+# इसलिए हॉट पाथ में हमेशा चालू रखा जा सकता है। /metrics पर text exposition format 0.0.4।
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {} # {लेबल मानों का tuple: child}
+        _registry.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} को {len(self.labelnames)} लेबल चाहिए, {len(values)} मिले")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        # (सफ़िक्स, लेबल मान, अतिरिक्त लेबल, मान)
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    # मान सीधे set() करें, या set_function() दें जो स्क्रेप के समय पढ़ा जाए
+    # (लेबल वाले गेज के लिए फ़ंक्शन {लेबल मानों का tuple: मान} लौटाता है)
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable):
+        self._function = function
+
+    def _samples(self):
+        if self._function is None:
+            yield from super()._samples()
+            return
+        try:
+            result = self._function()
+        except Exception as e:
+            logger.error(f"गेज {self.name} पढ़ने में त्रुटि: {e}")
+            return
+        if result is None:
+            return
+        if not isinstance(result, dict):
+            result = {(): result}
+        for values, value in result.items():
+            yield "", values, "", value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # अंतिम स्लॉट +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{_format_value(float(bound))}"', cumulative
+            yield "_sum", values, "", child.sum
+            yield "_count", values, "", child.count
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- बॉट के मेट्रिक्स ---
+
+handler_duration = Histogram("bot_handler_duration_seconds", "Telegram हैंडलर का कुल समय", ("handler",))
+handler_errors = Counter("bot_handler_errors_total", "हैंडलर से बाहर निकले अपवाद", ("handler",))
+
+mongo_duration = Histogram("mongo_operation_duration_seconds", "MongoDB ऑपरेशन का समय (पुनः प्रयास सहित)", ("operation",))
+mongo_errors = Counter("mongo_operation_errors_total", "विफल MongoDB ऑपरेशन", ("operation", "error"))
+mongo_retries = Counter("mongo_operation_retries_total", "नेटवर्क त्रुटि पर MongoDB पुनः प्रयास", ("operation",))
+
+downloads = Counter("downloads_total", "Terabox डाउनलोड परिणाम", ("result",))
+link_messages = Counter("link_messages_total", "लिंक संदेशों का पार्सिंग परिणाम", ("result",))
+download_bytes = Counter("download_bytes_total", "डाउनलोड किए गए बाइट्स")
+download_retries = Counter("download_retries_total", "टूटे कनेक्शन/5xx के बाद डाउनलोड पुनः प्रयास")
+download_duration = Histogram(
+    "download_duration_seconds", "एक फ़ाइल डाउनलोड का समय",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+download_throughput = Histogram(
+    "download_throughput_bytes_per_second", "प्रति फ़ाइल डाउनलोड गति",
+    buckets=tuple(mb * 1024 * 1024 for mb in (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100)),
+)
+
+resolver_lookups = Counter("resolver_lookups_total", "डायरेक्ट लिंक कैश लुकअप", ("result",))
+resolver_duration = Histogram(
+    "resolver_duration_seconds", "शेयर लिंक से डायरेक्ट लिंक रिज़ॉल्व का समय (प्रतीक्षा सहित)", ("result",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+resolver_wait = Histogram(
+    "resolver_wait_seconds", "रिज़ॉल्वर समवर्तिता सीमा पर प्रतीक्षा",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+upload_duration = Histogram(
+    "upload_duration_seconds", "Telegram पर अपलोड का समय", ("media_type",),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+upload_bytes = Counter("upload_bytes_total", "Telegram पर अपलोड किए गए बाइट्स", ("media_type",))
+progress_edits = Counter("progress_edits_total", "स्टेटस संदेश के प्रगति संपादन", ("result",))
+
+scheduled_jobs = Counter("scheduled_jobs_total", "विलंबित जॉब परिणाम", ("kind", "result"))
+scheduled_job_lag = Histogram(
+    "scheduled_job_lag_seconds", "due_at से जॉब लिए जाने तक की देरी",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0, 3600.0),
+)
+
+payments = Counter("payments_total", "UTR भुगतान घटनाएँ", ("event",))
+broadcast_messages = Counter("broadcast_messages_total", "प्रसारण संदेशों के परिणाम", ("result",))
+payment_digests = Counter("payment_digests_total", "एडमिन चैनल पर भेजे गए भुगतान डाइजेस्ट")
+
+user_states = Gauge("bot_user_states", "बातचीत स्थिति स्टोर में प्रविष्टियाँ")
+download_queue_depth = Gauge("download_queue_depth", "कतार में प्रतीक्षारत डाउनलोड जॉब")
+download_jobs_running = Gauge("download_jobs_running", "चल रहे डाउनलोड जॉब")
+download_dir_bytes = Gauge("download_dir_bytes", "DOWNLOAD_DIR में उपयोग/आरक्षित बाइट्स", ("kind",))
+download_dir_files = Gauge("download_dir_files", "DOWNLOAD_DIR में ट्रैक की गई फ़ाइलें")
+updates_in_flight = Gauge("bot_updates_in_flight", "अभी प्रोसेस हो रहे अपडेट")
+resolver_cache_entries = Gauge("resolver_cache_entries", "कैश किए गए डायरेक्ट लिंक")
+outbound_queue_depth = Gauge("telegram_outbound_queue_depth", "दर सीमा के कारण प्रतीक्षारत Telegram API कॉल")
+
+
+def track_handler(name: str):
+    # हैंडलर डेकोरेटर: समय और अपवाद गिनें (लेबल child पहले से हल, ताकि हर कॉल सस्ती रहे)
+    duration = handler_duration.labels(name)
+    errors = handler_errors.labels(name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+# --- HTTP एंडपॉइंट ---
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+class MetricsServer:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"मेट्रिक्स http://{self.host}:{self.port}/metrics पर उपलब्ध हैं।")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics_server = MetricsServer(Config.METRICS_LISTEN, Config.METRICS_PORT)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo.errors import PyMongoError
+from telegram.error import TelegramError
+
+from config import Config
+from database import claim_undigested_payments, count_pending_payments, mark_payments_digested
+from keyboards import payment_digest_keyboard
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def format_digest(payments: list[dict], pending_total: int) -> str:
+    lines = [f"🧾 **लंबित प्रीमियम भुगतान** ({len(payments)} नए, कुल लंबित {pending_total})", ""]
+    for number, payment in enumerate(payments, start=1):
+        age_minutes = int((datetime.utcnow() - payment["submitted_at"]).total_seconds() // 60)
+        lines.append(
+            f"{number}. UTR `{payment['utr']}` — यूज़र `{payment['user_id']}` "
+            f"([प्रोफ़ाइल](tg://user?id={payment['user_id']})) — {age_minutes} मिनट पहले"
+        )
+    lines.append("")
+    lines.append("बैंक स्टेटमेंट से मिलान करके पैक चुनें (✅) या अस्वीकार करें (❌)।")
+    return "\n".join(lines)
+
+
+class PaymentDigest:
+    # हर UTR पर अलग संदेश के बजाय: नए लंबित भुगतान हर interval_seconds पर एक संदेश में एडमिन
+    # चैनल पर जाते हैं, अनुमोदन बटनों के साथ। भेजना विफल हो तो भुगतान अगले चक्र में फिर आते हैं
+    # (दावे की लीज़ समाप्त होने पर), इसलिए कोई UTR छूटता नहीं।
+    def __init__(self, chat_id, interval_seconds: float, max_items: int, lease_seconds: float):
+        self.chat_id = chat_id
+        self.interval_seconds = interval_seconds
+        self.max_items = max_items
+        self.lease_seconds = lease_seconds
+        self._bot = None
+        self._task = None
+        # काउंटर
+        self.digests_sent = 0
+        self.payments_sent = 0
+        self.send_failures = 0
+
+    async def send_once(self) -> int:
+        token, payments = await claim_undigested_payments(self.max_items, self.lease_seconds)
+        if not payments:
+            return 0
+        pending_total = await count_pending_payments()
+        try:
+            await self._bot.send_message(
+                chat_id=self.chat_id,
+                text=format_digest(payments, pending_total),
+                reply_markup=payment_digest_keyboard(payments),
+                parse_mode='Markdown',
+                disable_web_page_preview=True,
+            )
+        except TelegramError as e:
+            self.send_failures += 1
+            logger.error(f"भुगतान डाइजेस्ट भेजने में त्रुटि ({len(payments)} भुगतान अगले चक्र में): {e}")
+            return 0
+        await mark_payments_digested([payment["_id"] for payment in payments], token)
+        self.digests_sent += 1
+        self.payments_sent += len(payments)
+        metrics.payment_digests.inc()
+        logger.info(f"{len(payments)} लंबित भुगतान एडमिन डाइजेस्ट में भेजे गए।")
+        return len(payments)
+
+    async def _run_loop(self):
+        while True:
+            try:
+                sent = await self.send_once()
+            except PyMongoError as e:
+                logger.error(f"भुगतान डाइजेस्ट के लिए DB त्रुटि: {e}")
+                sent = 0
+            if sent >= self.max_items:
+                continue # बकाया: अगला डाइजेस्ट तुरंत (दर सीमा outbound_limiter संभालता है)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, bot):
+        if self._task is None and self.chat_id:
+            self._bot = bot
+            self._task = asyncio.create_task(self._run_loop(), name="payment-digest")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "digests_sent": self.digests_sent,
+            "payments_sent": self.payments_sent,
+            "send_failures": self.send_failures,
+        }
+
+
+payment_digest = PaymentDigest(
+    chat_id=Config.ADMIN_CHANNEL_ID,
+    interval_seconds=Config.PAYMENT_DIGEST_INTERVAL_SECONDS,
+    max_items=Config.PAYMENT_DIGEST_MAX_ITEMS,
+    lease_seconds=Config.PAYMENT_DIGEST_LEASE_SECONDS,
+)
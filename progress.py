@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, TelegramError
+
+from config import Config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- डाउनलोड/अपलोड की लाइव प्रगति ---
+# एक ही स्टेटस संदेश संपादित होता है। update() डाउनलोड के हर लिखे गए ब्लॉक पर बुलाया जाता है और
+# ज़्यादातर तुरंत लौट जाता है: संपादन अधिकतम हर PROGRESS_UPDATE_INTERVAL_SECONDS पर, केवल तब जब
+# प्रतिशत कम से कम PROGRESS_MIN_STEP_PERCENT बदला हो, और एक समय में केवल एक संपादन चलता है।
+
+_PHASE_LABELS = {
+    "download": "📥 डाउनलोड हो रहा है...",
+    "upload": "📤 Telegram पर भेजा जा रहा है...",
+}
+_BAR_WIDTH = 10
+
+
+def _format_bytes(count: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.1f} {unit}" if unit != "B" else f"{int(count)} B"
+        count /= 1024
+    return f"{count:.2f} GB"
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+def format_progress(phase: str, done: int, total: int | None, speed: float, detail: str = "") -> str:
+    lines = [_PHASE_LABELS.get(phase, phase)]
+    if total:
+        percent = min(100.0, done * 100 / total)
+        filled = int(percent / 100 * _BAR_WIDTH)
+        lines.append(f"[{'█' * filled}{'░' * (_BAR_WIDTH - filled)}] {percent:.0f}%")
+        lines.append(f"{_format_bytes(done)} / {_format_bytes(total)}")
+    elif done:
+        lines.append(_format_bytes(done))
+    if speed > 0:
+        speed_line = f"⚡ {_format_bytes(speed)}/s"
+        if total and done < total:
+            speed_line += f" • शेष ~{_format_duration((total - done) / speed)}"
+        lines.append(speed_line)
+    if detail:
+        lines.append(detail)
+    return "\n".join(lines)
+
+
+class ProgressReporter:
+    def __init__(self, message, interval_seconds: float, min_step_percent: float):
+        self.message = message # संपादित होने वाला स्टेटस संदेश
+        self.interval_seconds = interval_seconds
+        self.min_step_percent = min_step_percent
+        self._phase = None
+        self._started = time.monotonic()
+        # पहला संपादन एक अंतराल बाद: छोटे डाउनलोड में कोई अतिरिक्त संपादन नहीं
+        self._next_edit_at = self._started + interval_seconds
+        self._last_text = None
+        self._last_percent = None
+        self._sample = None # (समय, बाइट्स) पिछले संपादन पर, गति के लिए
+        self._speed = 0.0
+        self._edit_task = None
+        self._disabled = False
+
+    # --- हॉट पाथ: हर ब्लॉक पर, ज़्यादातर बिना किसी काम के लौटता है ---
+
+    def download(self, done: int, total: int | None):
+        self.update("download", done, total)
+
+    def upload(self, done: int, total: int | None):
+        self.update("upload", done, total)
+
+    def update(self, phase: str, done: int, total: int | None, detail: str = ""):
+        now = time.monotonic()
+        if self._disabled:
+            return
+        if phase != self._phase:
+            # चरण की पहली कॉल केवल गति का आधार है (फिर से शुरू हुए डाउनलोड के पुराने बाइट्स गति में न गिनें)
+            self._phase = phase
+            self._sample = (now, done)
+            self._speed = 0.0
+            self._last_percent = None
+            return
+        if now < self._next_edit_at or self._edit_task is not None:
+            return
+        if total and self._last_percent is not None \
+                and done * 100 / total - self._last_percent < self.min_step_percent:
+            metrics.progress_edits.labels("skipped").inc()
+            self._next_edit_at = now + self.interval_seconds # अगली जाँच अगले अंतराल पर
+            return
+        # गति: पिछले संपादन से अब तक की, हल्की स्मूदिंग के साथ
+        sample_time, sample_done = self._sample
+        if now > sample_time and done > sample_done:
+            window_speed = (done - sample_done) / (now - sample_time)
+            self._speed = window_speed if not self._speed else 0.5 * self._speed + 0.5 * window_speed
+        self._sample = (now, done)
+        self._last_percent = done * 100 / total if total else None
+        self._next_edit_at = now + self.interval_seconds
+        self._edit(format_progress(phase, done, total, self._speed, detail))
+
+    # --- चरण बदलना और अंत: हमेशा दिखते हैं ---
+
+    def phase(self, phase: str, total: int | None = None, detail: str = ""):
+        # नया चरण अंतराल की प्रतीक्षा के बिना दिखाएं (जैसे अपलोड शुरू होना)। कॉलर प्रतीक्षा नहीं करता:
+        # संपादन चल रहे संपादन के बाद कतार में लगता है, ताकि अपलोड उसके पीछे न रुके
+        self._phase = phase
+        self._sample = (time.monotonic(), 0)
+        self._speed = 0.0
+        self._last_percent = 0.0 if total else None
+        self._next_edit_at = time.monotonic() + self.interval_seconds
+        # शुरुआत में केवल आकार; भागों वाले अपलोड में आगे update() से प्रतिशत आता है
+        lines = [_PHASE_LABELS.get(phase, phase), _format_bytes(total) if total else "", detail]
+        self._edit("\n".join(line for line in lines if line))
+
+    async def finish(self, text: str):
+        elapsed = _format_duration(time.monotonic() - self._started)
+        self._edit(f"{text} ({elapsed})")
+        await self._wait_for_edit()
+        self._disabled = True
+
+    # --- संपादन ---
+
+    def _edit(self, text: str):
+        if self._disabled or text == self._last_text:
+            return
+        self._last_text = text
+        self._edit_task = asyncio.create_task(self._send_edit(text, self._edit_task))
+
+    async def _send_edit(self, text: str, previous: asyncio.Task | None):
+        try:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True) # संपादन क्रम में
+            if self._disabled:
+                return
+            await self.message.edit_text(text)
+            metrics.progress_edits.labels("sent").inc()
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                # संदेश हटा दिया गया या संपादन योग्य नहीं: आगे संपादन न करें
+                logger.debug(f"प्रगति संदेश अपडेट नहीं हो सका, रिपोर्टिंग बंद: {e}")
+                metrics.progress_edits.labels("failed").inc()
+                self._disabled = True
+        except TelegramError as e:
+            logger.debug(f"प्रगति संदेश अपडेट नहीं हो सका: {e}")
+            metrics.progress_edits.labels("failed").inc()
+        finally:
+            if self._edit_task is asyncio.current_task():
+                self._edit_task = None
+
+    async def _wait_for_edit(self):
+        if self._edit_task is not None:
+            await asyncio.gather(self._edit_task, return_exceptions=True)
+
+    async def close(self):
+        # विफलता/रद्द होने पर: चल रहा संपादन पूरा होने दें, आगे कोई संपादन नहीं
+        self._disabled = True
+        await self._wait_for_edit()
+
+
+def create_progress_reporter(message) -> ProgressReporter:
+    return ProgressReporter(
+        message,
+        interval_seconds=Config.PROGRESS_UPDATE_INTERVAL_SECONDS,
+        min_step_percent=Config.PROGRESS_MIN_STEP_PERCENT,
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from cache import LRUTTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# चैट में संदेश डालने वाले एंडपॉइंट्स ही Telegram की फ़्लड सीमाओं में गिने जाते हैं;
+# answerCallbackQuery, getChatMember आदि बिना देरी के जाते हैं (फिर भी retry_after विराम मानते हैं)
+_THROTTLED_PREFIXES = ("send", "edit", "copy", "forward")
+
+
+class TokenBucket:
+    # आरक्षण आधारित बकेट: टोकन ऋणात्मक हो सकते हैं, और हर कॉलर को उतनी प्रतीक्षा मिलती है
+    # जितने में उसका टोकन भर जाएगा। इससे प्रतीक्षा करने वाले आने के क्रम में निकलते हैं।
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class OutboundRateLimiter(BaseRateLimiter):
+    # बॉट की हर आउटबाउंड API कॉल यहाँ से गुज़रती है (Application.builder().rate_limiter(...)),
+    # इसलिए हैंडलर्स reply_text/send_photo/edit_message_text पहले की तरह सीधे बुला सकते हैं।
+    # - वैश्विक बकेट: पूरे बॉट के लिए संदेश/सेकंड
+    # - प्रति-चैट बकेट: निजी चैट और समूहों की अलग दरें
+    # - RetryAfter (429): सभी थ्रॉटल किए गए अनुरोध retry_after तक रुकते हैं, फिर दोबारा प्रयास
+    # - एक ही संदेश के प्रतीक्षारत संपादन: केवल सबसे नया भेजा जाता है, पुराने True लौटाते हैं
+    def __init__(self, global_rate: float, private_chat_rate: float, private_chat_burst: float,
+                 group_rate: float, group_burst: float, max_retries: int, max_chats: int):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_chat_rate = private_chat_rate
+        self.private_chat_burst = private_chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        # निष्क्रिय चैट्स के बकेट अपने आप हट जाते हैं (तब तक वे वैसे भी पूरे भर चुके होते हैं)
+        self._chat_buckets = LRUTTLCache(max_chats, ttl_seconds=max(60.0, group_burst / group_rate))
+        self._paused_until = 0.0
+        self._edit_seq = 0
+        self._latest_edit = {} # {(chat_id, message_id): सबसे नए संपादन का क्रमांक}
+        # गेज / काउंटर
+        self.queue_depth = 0
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.retry_after_hits = 0
+        self.merged_edits = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id) -> TokenBucket | None:
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            return None # @channel_username: केवल वैश्विक सीमा
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_chat_rate, self.private_chat_burst)
+        self._chat_buckets.set(chat_id, bucket) # TTL अंतिम उपयोग से गिना जाता है
+        return bucket
+
+    async def _wait(self, delay: float):
+        if delay > 0:
+            self.throttled += 1
+            self.throttled_seconds += delay
+            await asyncio.sleep(delay)
+
+    async def _wait_for_pause(self):
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await self._wait(delay)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Any],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        self.requests += 1
+        throttled = endpoint.startswith(_THROTTLED_PREFIXES)
+        edit_key = None
+        if endpoint == "editMessageText" and data.get("message_id") is not None:
+            edit_key = (data.get("chat_id"), data["message_id"])
+            self._edit_seq += 1
+            seq = self._latest_edit[edit_key] = self._edit_seq
+
+        self.queue_depth += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_pause()
+                if throttled:
+                    bucket = self._chat_bucket(data.get("chat_id"))
+                    if bucket is not None:
+                        await self._wait(bucket.reserve())
+                    if edit_key is not None and self._latest_edit.get(edit_key) != seq:
+                        # प्रतीक्षा के दौरान इसी संदेश का नया संपादन आ गया; यह वाला बेकार है
+                        self.merged_edits += 1
+                        return True
+                    await self._wait(self.global_bucket.reserve())
+                try:
+                    return await callback(*args, **kwargs)
+                except RetryAfter as e:
+                    self.retry_after_hits += 1
+                    retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after + 0.1)
+                    logger.warning(f"Telegram फ़्लड सीमा ({endpoint}): {retry_after} सेकंड के लिए आउटबाउंड अनुरोध रोके गए।")
+                    if attempt >= self.max_retries:
+                        raise
+        finally:
+            self.queue_depth -= 1
+            if edit_key is not None and self._latest_edit.get(edit_key) == seq:
+                del self._latest_edit[edit_key]
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "throttled_seconds": self.throttled_seconds,
+            "retry_after_hits": self.retry_after_hits,
+            "merged_edits": self.merged_edits,
+            "paused_for_seconds": max(0.0, self._paused_until - time.monotonic()),
+            "tracked_chats": len(self._chat_buckets),
+        }
+
+
+outbound_limiter = OutboundRateLimiter(
+    global_rate=Config.TG_GLOBAL_MESSAGES_PER_SECOND,
+    private_chat_rate=Config.TG_PRIVATE_CHAT_MESSAGES_PER_SECOND,
+    private_chat_burst=Config.TG_PRIVATE_CHAT_BURST,
+    group_rate=Config.TG_GROUP_MESSAGES_PER_MINUTE / 60,
+    group_burst=Config.TG_GROUP_BURST,
+    max_retries=Config.TG_MAX_RETRIES,
+    max_chats=Config.TG_RATE_LIMIT_MAX_CHATS,
+)
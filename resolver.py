@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+
+from config import Config
+from cache import LRUTTLCache, SingleFlight
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- शेयर लिंक -> हस्ताक्षरित डायरेक्ट लिंक ---
+# रिज़ॉल्व धीमा और दर-सीमित है, इसलिए यह बाइट ट्रांसफ़र (downloaders.download_file) से अलग चरण है।
+# डायरेक्ट लिंक अपनी समाप्ति तक कैश रहता है, एक ही शेयर के समानांतर रिज़ॉल्व एक अनुरोध साझा करते हैं,
+# और समाप्ति के करीब कैश हिट पृष्ठभूमि में नया लिंक ले लेता है (पुराना तब तक उपयोग होता रहता है)।
+
+
+class ResolveError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class DirectLink:
+    url: str
+    expires_at: float | None # epoch सेकंड; None = समाप्त नहीं होता (शेयर लिंक ही डायरेक्ट)
+    file_name: str | None = None
+    size: int | None = None
+
+    def validity(self, now: float | None = None) -> float:
+        # समाप्ति तक बचे सेकंड
+        if self.expires_at is None:
+            return float("inf")
+        return self.expires_at - (time.time() if now is None else now)
+
+
+# हस्ताक्षरित URL में समाप्ति के सामान्य क्वेरी पैरामीटर (epoch सेकंड)
+_EXPIRY_PARAMS = ("expires", "x-expires", "Expires", "e")
+
+def _expiry_from_url(url: str) -> float | None:
+    query = parse_qs(urlparse(url).query)
+    for name in _EXPIRY_PARAMS:
+        for value in query.get(name, ()):
+            if value.isdigit() and int(value) > 1_000_000_000:
+                return float(value)
+    return None
+
+def parse_resolver_response(payload: dict, now: float) -> DirectLink:
+    # जवाब: {"direct_link"|"dlink"|"url": ..., "expires_at"?: epoch, "expires_in"?: सेकंड, "file_name"?, "size"?}
+    url = payload.get("direct_link") or payload.get("dlink") or payload.get("url")
+    if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+        raise ResolveError("रिज़ॉल्वर के जवाब में डायरेक्ट लिंक नहीं है")
+    try:
+        if payload.get("expires_at") is not None:
+            expires_at = float(payload["expires_at"])
+        elif payload.get("expires_in") is not None:
+            expires_at = now + float(payload["expires_in"])
+        else:
+            expires_at = _expiry_from_url(url) or now + Config.RESOLVER_DEFAULT_TTL_SECONDS
+        size = int(payload["size"]) if payload.get("size") is not None else None
+    except (TypeError, ValueError) as e:
+        raise ResolveError(f"रिज़ॉल्वर का जवाब अमान्य है: {e}") from e
+    file_name = payload.get("file_name")
+    return DirectLink(url, expires_at, file_name if isinstance(file_name, str) else None, size)
+
+
+class LinkResolver:
+    def __init__(self, api_url: str, api_key: str, timeout_seconds: float, concurrency: int,
+                 cache_size: int, min_validity_seconds: float, refresh_ahead_seconds: float):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.concurrency = concurrency
+        self.min_validity_seconds = min_validity_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        # हर प्रविष्टि का TTL उसकी समाप्ति से तय होता है (set में ttl_seconds)
+        self._cache = LRUTTLCache(max_size=cache_size, ttl_seconds=0)
+        self._flights = SingleFlight()
+        self._semaphore = None
+        self._session = None
+        self._refreshing = {} # {key: asyncio.Task}
+        # काउंटर
+        self.resolved = 0
+        self.errors = 0
+        self.refreshes = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_url)
+
+    async def resolve(self, key: str, share_url: str) -> DirectLink:
+        # key: normalize_share_id से कैश कुंजी। विफलता पर ResolveError।
+        # सेवा के बिना शेयर लिंक ही लौटता है (केवल तब उपयोगी जब लिंक पहले से डायरेक्ट हो)
+        if not self.api_url:
+            metrics.resolver_lookups.labels("passthrough").inc()
+            return DirectLink(share_url, None)
+        link = self._cache.get(key)
+        if link is not None:
+            metrics.resolver_lookups.labels("hit").inc()
+            if link.validity() < self.refresh_ahead_seconds:
+                self._refresh_in_background(key, share_url)
+            return link
+        metrics.resolver_lookups.labels("miss").inc()
+        return await self._flights.do(key, lambda: self._fetch(key, share_url))
+
+    def invalidate(self, key: str):
+        # डायरेक्ट लिंक अस्वीकार हुआ (जैसे 403): अगला अनुरोध नया लिंक लेगा
+        self._cache.pop(key)
+
+    async def _fetch(self, key: str, share_url: str) -> DirectLink:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        async with self._semaphore:
+            metrics.resolver_wait.observe(time.perf_counter() - started)
+            try:
+                link = await self._request(share_url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ResolveError) as e:
+                self.errors += 1
+                metrics.resolver_duration.labels("error").observe(time.perf_counter() - started)
+                logger.warning(f"{share_url} का डायरेक्ट लिंक रिज़ॉल्व नहीं हो सका: {e}")
+                if isinstance(e, ResolveError):
+                    raise
+                raise ResolveError(f"रिज़ॉल्वर अनुरोध विफल: {e}") from e
+        self.resolved += 1
+        metrics.resolver_duration.labels("ok").observe(time.perf_counter() - started)
+        ttl = link.validity() - self.min_validity_seconds
+        if ttl > 0:
+            self._cache.set(key, link, ttl_seconds=ttl)
+        else:
+            logger.warning(f"{share_url} का डायरेक्ट लिंक {link.validity():.0f}s में समाप्त होगा, कैश नहीं किया गया")
+        return link
+
+    async def _request(self, share_url: str) -> DirectLink:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_seconds))
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+        async with self._session.get(self.api_url, params={"url": share_url}, headers=headers) as response:
+            if response.status != 200:
+                raise ResolveError(f"रिज़ॉल्वर ने स्थिति {response.status} लौटाई")
+            payload = await response.json(content_type=None)
+        if not isinstance(payload, dict):
+            raise ResolveError("रिज़ॉल्वर का जवाब JSON ऑब्जेक्ट नहीं है")
+        return parse_resolver_response(payload, time.time())
+
+    def _refresh_in_background(self, key: str, share_url: str):
+        if key in self._refreshing:
+            return
+        self.refreshes += 1
+        metrics.resolver_lookups.labels("refresh").inc()
+        task = asyncio.create_task(self._refresh(key, share_url), name=f"resolve-refresh-{key}")
+        self._refreshing[key] = task
+
+    async def _refresh(self, key: str, share_url: str):
+        try:
+            await self._flights.do(key, lambda: self._fetch(key, share_url))
+        except ResolveError:
+            pass # पुराना लिंक अपनी समाप्ति तक उपयोग होता रहेगा; त्रुटि लॉग हो चुकी है
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def stop(self):
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        self._refreshing.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "cache": self._cache.stats(),
+            "resolved": self.resolved,
+            "errors": self.errors,
+            "refreshes": self.refreshes,
+            "inflight": len(self._flights),
+            "shared": self._flights.shared,
+        }
+
+
+link_resolver = LinkResolver(
+    api_url=Config.RESOLVER_API_URL,
+    api_key=Config.RESOLVER_API_KEY,
+    timeout_seconds=Config.RESOLVER_TIMEOUT_SECONDS,
+    concurrency=Config.RESOLVER_CONCURRENCY,
+    cache_size=Config.RESOLVER_CACHE_MAX_SIZE,
+    min_validity_seconds=Config.RESOLVER_MIN_VALIDITY_SECONDS,
+    refresh_ahead_seconds=Config.RESOLVER_REFRESH_AHEAD_SECONDS,
+)
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# प्राथमिकता: कम संख्या पहले चलती है
+PRIORITY_PREMIUM = 0
+PRIORITY_FREE = 1
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class DownloadJob:
+    job_id: int
+    user_id: int
+    chat_id: int
+    priority: int
+    run: Callable[[], Awaitable] # कोरूटीन फ़ैक्टरी: वास्तविक डाउनलोड-और-अपलोड
+    on_cancel: Callable[[], Awaitable] | None = None # कतार में रद्द होने पर (जैसे क्रेडिट वापसी)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    state: str = "queued" # queued / running / done / failed / cancelled
+    task: asyncio.Task | None = None
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.priority, self.job_id)
+
+
+class DownloadScheduler:
+    # वैश्विक समवर्ती सीमा, प्रति-उपयोगकर्ता इन-फ़्लाइट सीमा और प्रीमियम-प्रथम प्राथमिकता कतार।
+    # हैंडलर केवल submit() करता है और तुरंत लौट जाता है।
+    def __init__(self, max_concurrent: int, max_per_user: int, max_queued_per_user: int):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self._ids = itertools.count(1)
+        self._heap = [] # [(priority, job_id, job)], रद्द जॉब आलसी ढंग से हटाए जाते हैं
+        self._jobs = {} # {job_id: job} सभी queued/running जॉब
+        self._running_per_user = {}
+        self._queued_per_user = {}
+        self._running = 0
+        self._stopped = False
+        # मेट्रिक्स
+        self.submitted = 0
+        self.started = 0
+        self.finished = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    # --- सबमिट / स्थिति ---
+
+    def free_slots(self, user_id: int) -> int:
+        # उपयोगकर्ता अभी कितने और जॉब सबमिट कर सकता है (एक संदेश में कई लिंक के लिए)
+        if self._stopped:
+            return 0
+        pending = self._queued_per_user.get(user_id, 0) + self._running_per_user.get(user_id, 0)
+        return max(0, self.max_queued_per_user + self.max_per_user - pending)
+
+    def can_accept(self, user_id: int) -> bool:
+        return self.free_slots(user_id) > 0
+
+    def submit(self, user_id: int, chat_id: int, run: Callable[[], Awaitable], *,
+               premium: bool = False, on_cancel: Callable[[], Awaitable] | None = None) -> DownloadJob:
+        if not self.can_accept(user_id):
+            self.rejected += 1
+            raise QueueFullError(f"उपयोगकर्ता {user_id} के पहले से बहुत सारे डाउनलोड कतार में हैं")
+        job = DownloadJob(
+            job_id=next(self._ids),
+            user_id=user_id,
+            chat_id=chat_id,
+            priority=PRIORITY_PREMIUM if premium else PRIORITY_FREE,
+            run=run,
+            on_cancel=on_cancel,
+        )
+        self._jobs[job.job_id] = job
+        heapq.heappush(self._heap, (job.priority, job.job_id, job))
+        self._queued_per_user[user_id] = self._queued_per_user.get(user_id, 0) + 1
+        self.submitted += 1
+        self._dispatch()
+        return job
+
+    def position(self, job: DownloadJob) -> int:
+        # कतार में स्थान (1 = अगला); चल रहे या समाप्त जॉब के लिए 0
+        if job.state != "queued":
+            return 0
+        return 1 + sum(
+            1 for other in self._jobs.values()
+            if other.state == "queued" and other.sort_key < job.sort_key
+        )
+
+    def user_jobs(self, user_id: int) -> list[DownloadJob]:
+        return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    # --- डिस्पैच ---
+
+    def _dispatch(self):
+        skipped = []
+        while self._heap and self._running < self.max_concurrent:
+            _, _, job = heapq.heappop(self._heap)
+            if job.state != "queued":
+                continue # रद्द किया गया
+            if self._running_per_user.get(job.user_id, 0) >= self.max_per_user:
+                skipped.append((job.priority, job.job_id, job)) # इस उपयोगकर्ता का स्लॉट खाली होने तक रुकें
+                continue
+            self._start(job)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+
+    def _start(self, job: DownloadJob):
+        job.state = "running"
+        job.started_at = time.monotonic()
+        wait = job.started_at - job.enqueued_at
+        self.started += 1
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self._queued_per_user[job.user_id] -= 1
+        self._running_per_user[job.user_id] = self._running_per_user.get(job.user_id, 0) + 1
+        self._running += 1
+        job.task = asyncio.create_task(self._execute(job), name=f"download-job-{job.job_id}")
+
+    async def _execute(self, job: DownloadJob):
+        try:
+            await job.run()
+            job.state = "done"
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            self.cancelled += 1
+        except Exception as e:
+            job.state = "failed"
+            self.failed += 1
+            logger.error(f"डाउनलोड जॉब {job.job_id} (उपयोगकर्ता {job.user_id}) में अनपेक्षित त्रुटि: {e}")
+        finally:
+            run_seconds = time.monotonic() - job.started_at
+            self.finished += 1
+            self.total_run_seconds += run_seconds
+            self.max_run_seconds = max(self.max_run_seconds, run_seconds)
+            self._running -= 1
+            self._running_per_user[job.user_id] -= 1
+            if not self._running_per_user[job.user_id]:
+                del self._running_per_user[job.user_id]
+            self._forget(job)
+            if not self._stopped:
+                self._dispatch()
+
+    def _forget(self, job: DownloadJob):
+        self._jobs.pop(job.job_id, None)
+        if not self._queued_per_user.get(job.user_id):
+            self._queued_per_user.pop(job.user_id, None)
+
+    # --- रद्दीकरण ---
+
+    async def cancel(self, job: DownloadJob) -> bool:
+        if job.state == "queued":
+            job.state = "cancelled"
+            self.cancelled += 1
+            self._queued_per_user[job.user_id] -= 1
+            self._forget(job)
+            if job.on_cancel is not None:
+                try:
+                    await job.on_cancel()
+                except Exception as e:
+                    logger.error(f"रद्द किए गए जॉब {job.job_id} की सफ़ाई में त्रुटि: {e}")
+            return True
+        if job.state == "running" and job.task is not None:
+            # चल रहा जॉब CancelledError पर अपनी सफ़ाई (क्रेडिट वापसी, फ़ाइल हटाना) स्वयं करता है
+            job.task.cancel()
+            return True
+        return False
+
+    async def cancel_user(self, user_id: int) -> int:
+        cancelled = 0
+        for job in self.user_jobs(user_id):
+            if await self.cancel(job):
+                cancelled += 1
+        return cancelled
+
+    async def stop(self):
+        # शटडाउन: नए जॉब न लें, कतार और चल रहे जॉब रद्द करें
+        self._stopped = True
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            await self.cancel(job)
+        tasks = [job.task for job in jobs if job.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- मेट्रिक्स ---
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._queued_per_user.values())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "running": self._running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait_seconds / self.started if self.started else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_run_seconds": self.total_run_seconds / self.finished if self.finished else 0.0,
+            "max_run_seconds": self.max_run_seconds,
+        }
+
+
+download_scheduler = DownloadScheduler(
+    max_concurrent=Config.MAX_CONCURRENT_DOWNLOADS,
+    max_per_user=Config.MAX_DOWNLOADS_PER_USER,
+    max_queued_per_user=Config.MAX_QUEUED_DOWNLOADS_PER_USER,
+)
@@ -0,0 +1,276 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# अधूरे (फिर से शुरू होने योग्य) डाउनलोड: DOWNLOAD_DIR/.partial/<कुंजी>.part और साथ में
+# <कुंजी>.part.json चेकपॉइंट (downloaders.download_file लिखता है)
+PARTIAL_DIR_NAME = ".partial"
+PARTIAL_SUFFIX = ".part"
+CHECKPOINT_SUFFIX = ".json"
+
+
+async def _remove_checkpoint(part_path: str):
+    try:
+        os.remove(part_path + CHECKPOINT_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+class SpoolFullError(Exception):
+    pass
+
+
+@dataclass
+class SpoolReservation:
+    nbytes: int
+    released: bool = False
+
+
+@dataclass
+class SpoolFile:
+    path: str
+    size: int
+    added_at: float
+    expires_at: float
+    pinned: bool = True # अपलोड पूरा होने तक बजट के लिए हटाया नहीं जाता
+    on_expire: Callable[[str], Awaitable] | None = None
+
+
+class SpoolManager:
+    # DOWNLOAD_DIR का केंद्रीय प्रबंधक: बाइट बजट, डाउनलोड से पहले स्थान आरक्षण,
+    # और हर फ़ाइल के लिए अलग टाइमर के बजाय एक min-heap आधारित स्वीपर।
+    def __init__(self, root: str, budget_bytes: int, default_ttl_seconds: float, partial_ttl_seconds: float):
+        self.root = root
+        self.partial_dir = os.path.join(root, PARTIAL_DIR_NAME)
+        self.budget_bytes = budget_bytes
+        self.default_ttl_seconds = default_ttl_seconds
+        self.partial_ttl_seconds = partial_ttl_seconds
+        self._files = {} # {path: SpoolFile}
+        self._heap = [] # [(expires_at, seq, path)]; पुरानी प्रविष्टियाँ आलसी ढंग से छोड़ी जाती हैं
+        self._seq = itertools.count()
+        self._reserved_bytes = 0
+        self._used_bytes = 0
+        self._wakeup = None
+        self._task = None
+        # गेज / काउंटर
+        self.expired = 0
+        self.evicted = 0
+        self.orphans_removed = 0
+        self.partials_kept = 0
+        self.rejected = 0
+
+    # --- आरक्षण और पंजीकरण ---
+
+    def reserve(self, nbytes: int) -> SpoolReservation:
+        # डाउनलोड शुरू होने से पहले स्थान आरक्षित करें; ज़रूरत हो तो सबसे पुरानी फ़ाइलें हटाएं
+        nbytes = max(nbytes, 0)
+        if nbytes > self.budget_bytes:
+            self.rejected += 1
+            raise SpoolFullError(f"{nbytes} बाइट्स डाउनलोड बजट {self.budget_bytes} बाइट्स से बड़ा है")
+        self._evict_for(nbytes)
+        if self._used_bytes + self._reserved_bytes + nbytes > self.budget_bytes:
+            self.rejected += 1
+            raise SpoolFullError("डाउनलोड निर्देशिका में अभी पर्याप्त स्थान नहीं है")
+        self._reserved_bytes += nbytes
+        return SpoolReservation(nbytes)
+
+    def release(self, reservation: SpoolReservation):
+        if not reservation.released:
+            reservation.released = True
+            self._reserved_bytes -= reservation.nbytes
+
+    def add_file(self, path: str, reservation: SpoolReservation | None = None):
+        # डाउनलोड पूरा: आरक्षण को वास्तविक आकार से बदलें। फ़ाइल schedule_expiry तक पिन रहती है।
+        if reservation is not None:
+            self.release(reservation)
+        size = os.path.getsize(path)
+        now = time.monotonic()
+        self._forget(path)
+        self._files[path] = SpoolFile(path, size, now, now + self.default_ttl_seconds)
+        self._used_bytes += size
+        self._push(path)
+        if self._used_bytes + self._reserved_bytes > self.budget_bytes:
+            self._evict_for(0)
+
+    def schedule_expiry(self, path: str, delay_seconds: float, on_expire: Callable[[str], Awaitable] | None = None):
+        # फ़ाइल भेज दी गई: delay_seconds बाद हटाएं और on_expire(path) बुलाएं
+        spool_file = self._files.get(path)
+        if spool_file is None:
+            return
+        spool_file.expires_at = time.monotonic() + delay_seconds
+        spool_file.pinned = False
+        spool_file.on_expire = on_expire
+        self._push(path)
+
+    def keep_partial(self, path: str, ttl_seconds: float | None = None):
+        # अधूरी फ़ाइल: बजट में गिनी जाती है पर पिन नहीं (जगह चाहिए तो पहले हटेगी);
+        # हटने पर उसका चेकपॉइंट भी हटता है
+        self.add_file(path)
+        self.schedule_expiry(path, self.partial_ttl_seconds if ttl_seconds is None else ttl_seconds,
+                             on_expire=_remove_checkpoint)
+
+    def take(self, path: str) -> bool:
+        # फ़ाइल को ट्रैकिंग से हटाएं पर डिस्क पर रहने दें (अधूरा डाउनलोड फिर से शुरू हो रहा है)
+        return self._forget(path) is not None
+
+    def remove(self, path: str):
+        # फ़ाइल तुरंत हटाएं (जैसे भेजना विफल रहा), बिना on_expire के
+        self._forget(path)
+        self._delete(path)
+
+    # --- आंतरिक ---
+
+    def _push(self, path: str):
+        heapq.heappush(self._heap, (self._files[path].expires_at, next(self._seq), path))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _forget(self, path: str) -> SpoolFile | None:
+        spool_file = self._files.pop(path, None)
+        if spool_file is not None:
+            self._used_bytes -= spool_file.size
+        return spool_file
+
+    def _delete(self, path: str):
+        try:
+            os.remove(path)
+            logger.info(f"फ़ाइल हटाई गई: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"फ़ाइल {path} हटाने में त्रुटि: {e}")
+
+    def _expire(self, spool_file: SpoolFile):
+        self._delete(spool_file.path)
+        if spool_file.on_expire is not None:
+            asyncio.create_task(self._notify(spool_file))
+
+    async def _notify(self, spool_file: SpoolFile):
+        try:
+            await spool_file.on_expire(spool_file.path)
+        except Exception as e:
+            logger.error(f"फ़ाइल {spool_file.path} हटाने की सूचना भेजने में त्रुटि: {e}")
+
+    def _evict_for(self, nbytes: int):
+        # बजट में nbytes के लिए जगह बनने तक सबसे पुरानी अनपिन फ़ाइलें हटाएं
+        if self._used_bytes + self._reserved_bytes + nbytes <= self.budget_bytes:
+            return
+        for spool_file in sorted(self._files.values(), key=lambda f: f.added_at):
+            if self._used_bytes + self._reserved_bytes + nbytes <= self.budget_bytes:
+                break
+            if spool_file.pinned:
+                continue
+            self._forget(spool_file.path)
+            self.evicted += 1
+            logger.info(f"डिस्क बजट के लिए फ़ाइल जल्दी हटाई जा रही है: {spool_file.path}")
+            self._expire(spool_file)
+
+    def _sweep(self) -> float | None:
+        # देय फ़ाइलें हटाएं; अगली देय फ़ाइल तक का समय लौटाएं
+        now = time.monotonic()
+        while self._heap:
+            expires_at, _, path = self._heap[0]
+            spool_file = self._files.get(path)
+            if spool_file is None or spool_file.expires_at != expires_at:
+                heapq.heappop(self._heap) # पुरानी प्रविष्टि
+                continue
+            if expires_at > now:
+                return expires_at - now
+            heapq.heappop(self._heap)
+            self._forget(path)
+            self.expired += 1
+            self._expire(spool_file)
+        return None
+
+    async def _run_sweeper(self):
+        while True:
+            delay = self._sweep()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def scan_orphans(self):
+        # स्टार्टअप पर: पिछली प्रक्रिया से बची फ़ाइलें (जिनका कोई शेड्यूल नहीं) हटाएं
+        os.makedirs(self.root, exist_ok=True)
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.path not in self._files:
+                self._delete(entry.path)
+                self.orphans_removed += 1
+        if self.orphans_removed:
+            logger.info(f"{self.orphans_removed} अनाथ फ़ाइलें {self.root} से हटाई गईं।")
+        self._scan_partials()
+
+    def _scan_partials(self):
+        # चेकपॉइंट वाली ताज़ा अधूरी फ़ाइलें रखें (उसी लिंक का अगला अनुरोध वहीं से जारी रहेगा),
+        # पुरानी या बिना चेकपॉइंट वाली हटाएं
+        if not os.path.isdir(self.partial_dir):
+            return
+        now = time.time()
+        for entry in os.scandir(self.partial_dir):
+            if not entry.is_file() or entry.path in self._files:
+                continue
+            if entry.name.endswith(PARTIAL_SUFFIX):
+                try:
+                    age = now - entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if age < self.partial_ttl_seconds and os.path.exists(entry.path + CHECKPOINT_SUFFIX):
+                    self.keep_partial(entry.path, self.partial_ttl_seconds - age)
+                    self.partials_kept += 1
+                    continue
+                self._delete(entry.path)
+                self._delete(entry.path + CHECKPOINT_SUFFIX)
+                self.orphans_removed += 1
+            elif not os.path.exists(entry.path.removesuffix(CHECKPOINT_SUFFIX)):
+                self._delete(entry.path) # बिना .part का चेकपॉइंट, या अधूरी लिखी .tmp फ़ाइल
+        if self.partials_kept:
+            logger.info(f"{self.partials_kept} अधूरे डाउनलोड फिर से शुरू करने के लिए रखे गए।")
+
+    def start(self):
+        if self._task is None:
+            self.scan_orphans()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run_sweeper(), name="spool-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- गेज ---
+
+    def stats(self) -> dict:
+        return {
+            "used_bytes": self._used_bytes,
+            "reserved_bytes": self._reserved_bytes,
+            "budget_bytes": self.budget_bytes,
+            "files": len(self._files),
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "orphans_removed": self.orphans_removed,
+            "partials_kept": self.partials_kept,
+            "rejected": self.rejected,
+        }
+
+
+download_spool = SpoolManager(
+    root=Config.DOWNLOAD_DIR,
+    budget_bytes=Config.DOWNLOAD_DIR_BUDGET_BYTES,
+    default_ttl_seconds=Config.SPOOL_MAX_FILE_AGE_SECONDS,
+    partial_ttl_seconds=Config.PARTIAL_DOWNLOAD_MAX_AGE_SECONDS,
+)
@@ -0,0 +1,79 @@
+import logging
+
+from config import Config
+from cache import LRUTTLCache
+from database import (
+    get_user_state,
+    set_user_state,
+    delete_user_state,
+    count_user_states,
+    trim_user_states,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- बातचीत स्थिति स्टोर ---
+# उपयोगकर्ता किस इनपुट की प्रतीक्षा में है ('terabox' लिंक, 'awaiting_utr' UTR)।
+# हर प्रविष्टि TTL के बाद समाप्त होती है और कुल संख्या सीमित रहती है (LRU)।
+# दोनों बैकएंड का इंटरफ़ेस समान है: get / set / pop / counts।
+
+
+class MemoryStateStore:
+    # एकल प्रक्रिया के लिए; रीस्टार्ट पर स्थिति खो जाती है
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = LRUTTLCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get(self, user_id: int) -> str | None:
+        return self._cache.get(user_id)
+
+    async def set(self, user_id: int, state: str):
+        self._cache.set(user_id, state)
+
+    async def pop(self, user_id: int) -> str | None:
+        return self._cache.pop(user_id)
+
+    async def counts(self) -> dict:
+        counts = {}
+        for _, state in self._cache.items():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class MongoStateStore:
+    # कई बॉट रेप्लिका के बीच साझा स्थिति; समाप्ति Mongo TTL इंडेक्स से
+    def __init__(self, max_entries: int, ttl_seconds: float, trim_every: int = 100):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.trim_every = trim_every
+        self._writes = 0
+        self.trimmed = 0
+
+    async def get(self, user_id: int) -> str | None:
+        return await get_user_state(user_id)
+
+    async def set(self, user_id: int, state: str):
+        await set_user_state(user_id, state, self.ttl_seconds)
+        self._writes += 1
+        if self._writes % self.trim_every == 0: # हर लेखन पर गिनती न करें
+            self.trimmed += await trim_user_states(self.max_entries)
+
+    async def pop(self, user_id: int) -> str | None:
+        return await delete_user_state(user_id)
+
+    async def counts(self) -> dict:
+        return await count_user_states()
+
+    def stats(self) -> dict:
+        return {"max_size": self.max_entries, "writes": self._writes, "trimmed": self.trimmed}
+
+
+def create_state_store():
+    if Config.STATE_STORE_BACKEND == "mongo":
+        logger.info("बातचीत स्थिति के लिए MongoDB बैकएंड का उपयोग किया जा रहा है।")
+        return MongoStateStore(Config.STATE_MAX_ENTRIES, Config.STATE_TTL_SECONDS)
+    if Config.STATE_STORE_BACKEND != "memory":
+        logger.warning(f"अज्ञात STATE_STORE_BACKEND '{Config.STATE_STORE_BACKEND}', memory का उपयोग किया जा रहा है।")
+    return MemoryStateStore(Config.STATE_MAX_ENTRIES, Config.STATE_TTL_SECONDS)
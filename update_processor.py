@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# BaseUpdateProcessor.process_update अपना सेमाफ़ोर do_process_update से *पहले* लेता है। यदि प्रति-उपयोगकर्ता
+# लॉक के इंतज़ार में वह स्लॉट घिरा रहे तो एक उपयोगकर्ता के ढेर सारे अपडेट सबको रोक देंगे। इसलिए
+# बेस सेमाफ़ोर को व्यावहारिक रूप से असीमित रखते हैं और वास्तविक सीमा लॉक मिलने के बाद लगाते हैं।
+_UNBOUNDED = 2 ** 31 - 1
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    # अलग-अलग उपयोगकर्ताओं के अपडेट समानांतर चलते हैं (अधिकतम max_concurrent),
+    # एक ही उपयोगकर्ता के अपडेट सख्ती से आने के क्रम में, ताकि user_state के बदलाव सही रहें।
+    def __init__(self, max_concurrent: int):
+        super().__init__(_UNBOUNDED)
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent एक धनात्मक पूर्णांक होना चाहिए")
+        self.max_concurrent = max_concurrent
+        self._slots = asyncio.BoundedSemaphore(max_concurrent)
+        self._locks = {} # {user_id: [asyncio.Lock, प्रतीक्षारत/चल रहे अपडेट की संख्या]}
+        self.in_flight = 0
+        self.waiting = 0
+        self.processed = 0
+        self.max_wait_seconds = 0.0
+
+    @staticmethod
+    def _ordering_key(update: object):
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return update.effective_user.id
+            if update.effective_chat is not None:
+                return ("chat", update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+        # asyncio.Lock प्रतीक्षकों को FIFO क्रम में जगाता है और Application अपडेट्स के टास्क
+        # आने के क्रम में बनाता है, इसलिए एक उपयोगकर्ता के अपडेट क्रम में चलते हैं
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.max_wait_seconds = max(self.max_wait_seconds, time.monotonic() - queued_at)
+        self.in_flight += 1
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+            self.processed += 1
+            self._slots.release()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "users_with_pending_updates": len(self._locks),
+            "processed": self.processed,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
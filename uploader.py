@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import logging
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+from telegram import Message
+from telegram.error import RetryAfter, TelegramError
+
+from config import Config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+PHOTO_MAX_BYTES = 10 * 1024 * 1024 # Telegram sendPhoto की सीमा
+
+CLOUD_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+LOCAL_MAX_UPLOAD_BYTES = 2000 * 1024 * 1024
+
+
+def media_kind(file_path: str, size: int) -> str:
+    lower = file_path.lower()
+    if lower.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    if lower.endswith(PHOTO_EXTENSIONS) and size <= PHOTO_MAX_BYTES:
+        return "photo"
+    if lower.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    return "document"
+
+
+async def _reply_media(message, kind: str, media, caption: str, **kwargs) -> Message:
+    if kind == "video":
+        return await message.reply_video(video=media, caption=caption, parse_mode='Markdown', supports_streaming=True, **kwargs)
+    if kind == "photo":
+        return await message.reply_photo(photo=media, caption=caption, parse_mode='Markdown', **kwargs)
+    if kind == "audio":
+        return await message.reply_audio(audio=media, caption=caption, parse_mode='Markdown', **kwargs)
+    return await message.reply_document(document=media, caption=caption, parse_mode='Markdown', **kwargs)
+
+
+def _part_caption(caption: str, file_name: str, index: int, total: int) -> str:
+    if index > 1:
+        return f"भाग {index}/{total}"
+    return (
+        f"{caption}\n\n"
+        f"📦 फ़ाइल बड़ी है, इसलिए {total} भागों में भेजी जा रही है। "
+        f"सभी भाग डाउनलोड करके जोड़ें, जैसे: `cat {file_name}.* > {file_name}`"
+    )
+
+
+class UploadBackend:
+    # डाउनलोड की गई फ़ाइल Telegram पर भेजना। max_upload_bytes तक की फ़ाइल एक संदेश में
+    # (प्रकार के अनुसार वीडियो/फोटो/ऑडियो/दस्तावेज़), उससे बड़ी क्रमबद्ध दस्तावेज़ भागों में।
+    # हर फ़ाइल हैंडल/मैपिंग with-ब्लॉक में खुलती है और भेजने के तुरंत बाद बंद होती है।
+    name = "base"
+
+    def __init__(self, max_upload_bytes: int, part_size_bytes: int, timeout_seconds: float):
+        self.max_upload_bytes = max_upload_bytes
+        self.part_size_bytes = min(part_size_bytes, max_upload_bytes)
+        self.timeouts = {"read_timeout": timeout_seconds, "write_timeout": timeout_seconds}
+        self.uploads = 0
+        self.split_uploads = 0
+        self.parts_sent = 0
+        self.bytes_sent = 0
+
+    def _open(self, file_path: str):
+        # संदर्भ प्रबंधक जो PTB को दिया जाने वाला इनपुट देता है
+        raise NotImplementedError
+
+    async def _send_parts(self, message, file_path: str, size: int, caption: str,
+                          progress: Callable[[int, int], None] | None = None) -> list[Message]:
+        raise NotImplementedError
+
+    async def send(self, message, file_path: str, caption: str,
+                   progress: Callable[[int, int], None] | None = None) -> list[Message]:
+        # progress(भेजे गए बाइट्स, कुल): PTB एक संदेश के भीतर की प्रगति नहीं देता, इसलिए यह
+        # केवल बहु-भाग अपलोड में हर भाग के बाद बुलाया जाता है
+        size = os.path.getsize(file_path)
+        started = time.perf_counter()
+        if size > self.max_upload_bytes:
+            media_type = "parts"
+            sent = await self._send_parts(message, file_path, size, caption, progress)
+            self.split_uploads += 1
+        else:
+            media_type = media_kind(file_path, size)
+            sent = [await self._send_single(message, file_path, size, caption)]
+        metrics.upload_duration.labels(media_type).observe(time.perf_counter() - started)
+        metrics.upload_bytes.labels(media_type).inc(size)
+        self.uploads += 1
+        self.bytes_sent += size
+        return sent
+
+    async def _send_single(self, message, file_path: str, size: int, caption: str) -> Message:
+        kind = media_kind(file_path, size)
+        if kind != "document":
+            try:
+                with self._open(file_path) as media:
+                    return await _reply_media(message, kind, media, caption, **self.timeouts)
+            except RetryAfter:
+                raise # दर सीमक पहले ही पुनः प्रयास कर चुका है
+            except TelegramError as e:
+                logger.warning(f"{kind} के रूप में भेजने में विफल रहा, दस्तावेज़ के रूप में प्रयास कर रहा है: {e}")
+        with self._open(file_path) as media:
+            return await _reply_media(message, "document", media, caption, **self.timeouts)
+
+    def _part_count(self, size: int) -> int:
+        return -(-size // self.part_size_bytes)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "max_upload_bytes": self.max_upload_bytes,
+            "uploads": self.uploads,
+            "split_uploads": self.split_uploads,
+            "parts_sent": self.parts_sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+class CloudUploadBackend(UploadBackend):
+    # api.telegram.org: बाइट्स Python से होकर जाती हैं (सीमा 50 MB)।
+    # बड़ी फ़ाइलें mmap से भाग-दर-भाग पढ़ी जाती हैं, इसलिए स्मृति में एक समय में केवल एक भाग रहता है।
+    name = "cloud"
+
+    def _open(self, file_path: str):
+        return open(file_path, 'rb')
+
+    async def _send_parts(self, message, file_path: str, size: int, caption: str,
+                          progress: Callable[[int, int], None] | None = None) -> list[Message]:
+        file_name = os.path.basename(file_path)
+        total = self._part_count(size)
+        sent = []
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for index in range(1, total + 1):
+                start = (index - 1) * self.part_size_bytes
+                # स्लाइस पेज कैश से सीधे एक बफ़र में कॉपी होता है (कोई मध्यवर्ती read बफ़र नहीं)
+                chunk = await asyncio.to_thread(mapped.__getitem__, slice(start, start + self.part_size_bytes))
+                try:
+                    sent.append(await _reply_media(
+                        message, "document", chunk, _part_caption(caption, file_name, index, total),
+                        filename=f"{file_name}.{index:03d}", **self.timeouts
+                    ))
+                finally:
+                    del chunk # अगला भाग पढ़ने से पहले बफ़र छोड़ें
+                self.parts_sent += 1
+                if progress is not None:
+                    progress(min(start + self.part_size_bytes, size), size)
+        return sent
+
+
+class LocalBotAPIUploadBackend(UploadBackend):
+    # स्थानीय telegram-bot-api सर्वर (--local): PTB केवल file:// पथ भेजता है और सर्वर फ़ाइल
+    # डिस्क से सीधे पढ़ता है, Python बाइट्स को छूता ही नहीं (सीमा 2000 MB)। इसके लिए सर्वर और बॉट
+    # को एक ही फ़ाइल सिस्टम (DOWNLOAD_DIR) देखना चाहिए। इससे बड़ी फ़ाइलों के भाग os.sendfile से
+    # (कर्नेल के भीतर कॉपी) अस्थायी फ़ाइलों में बनते हैं, एक समय में एक।
+    name = "local"
+
+    def _open(self, file_path: str):
+        return contextlib.nullcontext(Path(file_path).absolute())
+
+    @staticmethod
+    def _write_part(file_path: str, part_path: str, offset: int, count: int):
+        with open(file_path, 'rb') as src, open(part_path, 'wb') as dst:
+            while count > 0:
+                written = os.sendfile(dst.fileno(), src.fileno(), offset, count)
+                if written == 0:
+                    break
+                offset += written
+                count -= written
+
+    async def _send_parts(self, message, file_path: str, size: int, caption: str,
+                          progress: Callable[[int, int], None] | None = None) -> list[Message]:
+        file_name = os.path.basename(file_path)
+        total = self._part_count(size)
+        sent = []
+        for index in range(1, total + 1):
+            part_path = f"{file_path}.{index:03d}"
+            start = (index - 1) * self.part_size_bytes
+            try:
+                await asyncio.to_thread(self._write_part, file_path, part_path, start, min(self.part_size_bytes, size - start))
+                with self._open(part_path) as media:
+                    sent.append(await _reply_media(message, "document", media, _part_caption(caption, file_name, index, total), **self.timeouts))
+                self.parts_sent += 1
+                if progress is not None:
+                    progress(min(start + self.part_size_bytes, size), size)
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(part_path)
+        return sent
+
+
+def create_upload_backend() -> UploadBackend:
+    if Config.BOT_API_LOCAL_MODE:
+        max_upload_bytes = LOCAL_MAX_UPLOAD_BYTES
+        backend_class = LocalBotAPIUploadBackend
+    else:
+        max_upload_bytes = CLOUD_MAX_UPLOAD_BYTES
+        backend_class = CloudUploadBackend
+    return backend_class(
+        max_upload_bytes=max_upload_bytes,
+        part_size_bytes=Config.UPLOAD_PART_SIZE_BYTES or max_upload_bytes - 1024 * 1024, # मल्टीपार्ट हेडर के लिए जगह
+        timeout_seconds=Config.UPLOAD_TIMEOUT_SECONDS,
+    )
+
+
+upload_backend = create_upload_backend()
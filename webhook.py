@@ -0,0 +1,107 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# --- वेबहुक मोड ---
+# run_polling के बजाय Telegram अपडेट्स को HTTP POST से भेजता है। हैंडलर केवल सीक्रेट टोकन जाँचता है,
+# अपडेट(स) को application.update_queue में डालता है और तुरंत 200 लौटाता है; प्रोसेसिंग वही
+# हैंडलर्स करते हैं जो पोलिंग में। एक अनुरोध में एकल अपडेट या अपडेट्स की सूची दोनों स्वीकार हैं।
+# allowed_updates वही सूची है जो set_webhook को जाती है; उसके बाहर के प्रकार कतार तक नहीं पहुँचते।
+
+
+def _update_type(item: dict) -> str | None:
+    # अपडेट में update_id के अलावा एक ही कुंजी होती है, जैसे "message" या "callback_query"
+    return next((key for key in item if key != "update_id"), None)
+
+def make_webhook_app(application: Application, path: str, secret_token: str | None,
+                     allowed_updates: list[str] | None = None) -> web.Application:
+    async def handle_updates(request: web.Request) -> web.Response:
+        if secret_token and not hmac.compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ""), secret_token):
+            logger.warning(f"अमान्य सीक्रेट टोकन के साथ वेबहुक अनुरोध {request.remote} से अस्वीकार किया गया।")
+            return web.Response(status=403)
+        try:
+            payload = json.loads(await request.read())
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(payload, (dict, list)):
+            return web.Response(status=400)
+
+        items = payload if isinstance(payload, list) else [payload]
+        accepted = 0
+        for item in items:
+            if not isinstance(item, dict):
+                logger.warning(f"वेबहुक में अमान्य अपडेट (JSON ऑब्जेक्ट नहीं) छोड़ा गया: {type(item).__name__}")
+                continue
+            if allowed_updates and _update_type(item) not in allowed_updates:
+                logger.debug(f"वेबहुक अपडेट प्रकार {_update_type(item)} अनुमत नहीं, छोड़ा गया।")
+                continue
+            try:
+                update = Update.de_json(item, application.bot)
+            except Exception as e: # एक ख़राब अपडेट के कारण पूरे बैच को अस्वीकार न करें
+                logger.error(f"वेबहुक अपडेट पार्स करने में त्रुटि: {e}")
+                continue
+            if update is not None:
+                application.update_queue.put_nowait(update)
+                accepted += 1
+        logger.debug(f"वेबहुक से {accepted} अपडेट कतार में डाले गए।")
+        return web.Response(status=200)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post(path, handle_updates)
+    app.router.add_get("/healthz", health)
+    return app
+
+
+async def run_webhook(application: Application, allowed_updates: list[str]) -> None:
+    # run_polling जैसा जीवनचक्र: initialize → post_init → start → (सर्वर) → stop → shutdown → post_shutdown
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError: # Windows
+            pass
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+
+        path = Config.WEBHOOK_PATH
+        await application.bot.set_webhook(
+            url=Config.WEBHOOK_URL.rstrip("/") + path,
+            secret_token=Config.WEBHOOK_SECRET_TOKEN,
+            allowed_updates=allowed_updates,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+        )
+        await application.start()
+
+        runner = web.AppRunner(make_webhook_app(application, path, Config.WEBHOOK_SECRET_TOKEN, allowed_updates))
+        await runner.setup()
+        site = web.TCPSite(runner, Config.WEBHOOK_LISTEN, Config.PORT)
+        await site.start()
+        logger.info(f"वेबहुक सर्वर {Config.WEBHOOK_LISTEN}:{Config.PORT}{path} पर चल रहा है।")
+        try:
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            await application.stop()
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)